@@ -1,5 +1,5 @@
-from .my_pip_manager_plugin import MyPipManagerPlugin
-
 def classFactory(iface):
     """Instantiates the plugin class."""
-    return MyPipManagerPlugin(iface)
\ No newline at end of file
+    # Imported here so `python -m` (cli.py) never pulls in Qt or qgis.core
+    from .my_pip_manager_plugin import MyPipManagerPlugin
+    return MyPipManagerPlugin(iface)
@@ -0,0 +1,214 @@
+"""
+advisories.py - Offline vulnerability audit against an advisory dump.
+An OSV export (the PyPI ``all.zip`` from osv.dev, a folder of OSV JSON
+files or the PyPA advisory-database checkout) is imported once into a
+compact gzip JSON index: normalized project name -> affected version
+intervals. Auditing a whole inventory is then one dict lookup and a few
+version comparisons per package, with no network access.
+PyPA's YAML files are read only when PyYAML is available.
+"""
+import gzip
+import json
+import os
+import time
+import zipfile
+
+from .name_index import normalize
+from .pep440 import version_key
+
+FORMAT = 1
+
+
+def _load_text(name, text):
+    if name.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            return None
+        return yaml.safe_load(text)
+    if name.endswith(".json"):
+        return json.loads(text)
+    return None
+
+
+def _iter_records(source):
+    """OSV records from a zip, a folder tree or a single JSON file."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for name in zf.namelist():
+                try:
+                    data = _load_text(name, zf.read(name).decode("utf-8"))
+                except ValueError:
+                    continue
+                if data:
+                    yield from (data if isinstance(data, list) else [data])
+        return
+    if os.path.isdir(source):
+        paths = (os.path.join(d, f) for d, _, files in os.walk(source)
+                 for f in files)
+    else:
+        paths = [source]
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = _load_text(path, fh.read())
+        except (OSError, ValueError, UnicodeDecodeError):
+            continue
+        if data:
+            yield from (data if isinstance(data, list) else [data])
+
+
+def _intervals(ranges):
+    """
+    OSV ECOSYSTEM range events -> [introduced, end, end_inclusive]
+    lists; "" means unbounded on that side.
+    """
+    out = []
+    for rng in ranges:
+        if rng.get("type") not in ("ECOSYSTEM", "SEMVER"):
+            continue
+        lo = None
+        for event in rng.get("events", []):
+            if "introduced" in event:
+                lo = "" if event["introduced"] == "0" else event["introduced"]
+            elif lo is not None and "fixed" in event:
+                out.append([lo, event["fixed"], False])
+                lo = None
+            elif lo is not None and "last_affected" in event:
+                out.append([lo, event["last_affected"], True])
+                lo = None
+        if lo is not None:
+            out.append([lo, "", False])
+    return out
+
+
+def build_index(source, dest):
+    """
+    Import the advisories in ``source`` into the index file ``dest``.
+    Returns (advisories, projects) counts.
+    """
+    packages, advisories = {}, {}
+    for rec in _iter_records(source):
+        if not isinstance(rec, dict) or "id" not in rec:
+            continue
+        if rec.get("withdrawn"):
+            continue
+        hit = False
+        for aff in rec.get("affected", []):
+            pkg = aff.get("package", {})
+            if pkg.get("ecosystem") != "PyPI" or not pkg.get("name"):
+                continue
+            spans = _intervals(aff.get("ranges", []))
+            versions = sorted(set(aff.get("versions", []))) if not spans \
+                else []
+            if not spans and not versions:
+                continue
+            packages.setdefault(normalize(pkg["name"]), []).append(
+                [rec["id"], spans, versions])
+            hit = True
+        if hit:
+            fixed = sorted({e["fixed"] for a in rec.get("affected", [])
+                            for r in a.get("ranges", [])
+                            for e in r.get("events", []) if "fixed" in e},
+                           key=version_key)
+            advisories[rec["id"]] = {
+                "summary": (rec.get("summary") or
+                            (rec.get("details") or "").split("\n")[0])[:200],
+                "aliases": rec.get("aliases", []),
+                "fixed": fixed,
+            }
+    index = {"format": FORMAT, "source": os.path.basename(str(source)),
+             "imported": time.time(), "packages": packages,
+             "advisories": advisories}
+    tmp = str(dest) + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        json.dump(index, fh, separators=(",", ":"))
+    os.replace(tmp, str(dest))
+    return len(advisories), len(packages)
+
+
+class AdvisoryIndex:
+    """Read side of the index written by ``build_index``."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._data = None
+        self._mtime = None
+        self._keys = {}  # version string -> version_key
+
+    def available(self):
+        return os.path.isfile(self.path)
+
+    def load(self):
+        """(Re)load the index if the file changed; False if missing."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._data = None
+            return False
+        if self._data is None or mtime != self._mtime:
+            try:
+                with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError, EOFError):
+                return False
+            if data.get("format") != FORMAT:
+                return False
+            self._data, self._mtime = data, mtime
+        return True
+
+    def info(self):
+        if not self.load():
+            return {}
+        return {"source": self._data["source"],
+                "imported": self._data["imported"],
+                "advisories": len(self._data["advisories"]),
+                "projects": len(self._data["packages"])}
+
+    def _key(self, version):
+        key = self._keys.get(version)
+        if key is None:
+            key = self._keys[version] = version_key(version)
+        return key
+
+    def _affected(self, spans, versions, version):
+        if versions:
+            return version in versions
+        key = self._key(version)
+        for lo, hi, inclusive in spans:
+            if lo and key < self._key(lo):
+                continue
+            if not hi or key < self._key(hi) or (
+                    inclusive and key == self._key(hi)):
+                return True
+        return False
+
+    def _check(self, name, version):
+        out, seen = [], set()
+        for adv_id, spans, versions in self._data["packages"].get(
+                normalize(name), []):
+            if adv_id not in seen and self._affected(
+                    spans, versions, version):
+                seen.add(adv_id)
+                adv = dict(self._data["advisories"].get(adv_id, {}))
+                adv["id"] = adv_id
+                out.append(adv)
+        return out
+
+    def check(self, name, version):
+        """Advisories affecting one installed version."""
+        return self._check(name, version) if self.load() else []
+
+    def audit(self, packages):
+        """
+        {normalized name: [advisory, ...]} for the affected entries of
+        ``packages`` (dicts with "name" and "version").
+        """
+        if not self.load():
+            return {}
+        result = {}
+        for p in packages:
+            hits = self._check(p["name"], p["version"])
+            if hits:
+                result[normalize(p["name"])] = hits
+        return result
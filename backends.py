@@ -0,0 +1,137 @@
+"""
+backends.py - Installer backends behind QGISPipManager.
+Every operation is first built as a pip command line; the backend turns
+it into what actually runs. PipBackend runs pip unchanged. UvBackend
+runs the same operation through ``uv pip`` (a pip-compatible installer
+with a much faster resolver and parallel downloads) and keeps the pip
+command as a fallback for anything uv has no equivalent for, so output
+parsing and return shapes stay those of pip.
+"""
+import platform
+import re
+import shutil
+import subprocess
+
+if platform.system() == "Windows":
+    SUBPROCESS_FLAGS = 0x08000000  # CREATE_NO_WINDOW
+else:
+    SUBPROCESS_FLAGS = 0
+
+AUTO = "auto"
+PIP = "pip"
+UV = "uv"
+CHOICES = (AUTO, PIP, UV)
+
+
+class Command(list):
+    """argv plus the plain pip command to run if the backend refuses it."""
+    fallback = None
+
+
+class PipBackend:
+    name = PIP
+
+    def available(self):
+        return True
+
+    def version(self):
+        return ""
+
+    def command(self, pip_cmd):
+        return pip_cmd
+
+    def unsupported(self, output):
+        return False
+
+
+class UvBackend:
+    """
+    ``uv pip`` for the subcommands and options it shares with pip.
+    Commands using anything else are left to pip.
+    """
+    name = UV
+    SUBCOMMANDS = {"install", "uninstall", "freeze", "list", "show", "check"}
+    FLAGS = {"--upgrade", "-U", "--no-deps", "--require-hashes",
+             "--no-index", "--dry-run", "--quiet", "-q", "--outdated",
+             "--format=json"}
+    VALUE_FLAGS = {"-r", "-c", "--find-links", "-f", "--index-url", "-i",
+                   "--extra-index-url", "--format"}
+    RENAMED = {"--force-reinstall": "--reinstall"}
+    DROPPED = {"-y", "--yes"}                 # uv never prompts
+    DROPPED_VALUE = {"--retries", "--timeout"}  # set through UV_* env vars
+    _REFUSED = re.compile(
+        r"error: unexpected argument|error: unrecognized subcommand|"
+        r"is not supported|error: invalid value")
+
+    def __init__(self, executable):
+        self.executable = executable
+        self._version = None
+
+    def version(self):
+        """``uv --version`` output ("" if it does not run)."""
+        if self._version is None:
+            try:
+                r = subprocess.run(
+                    [self.executable, "--version"], capture_output=True,
+                    text=True, timeout=10, creationflags=SUBPROCESS_FLAGS)
+                self._version = r.stdout.strip() if r.returncode == 0 else ""
+            except (OSError, subprocess.SubprocessError):
+                self._version = ""
+        return self._version
+
+    def available(self):
+        return self.version().startswith("uv ")
+
+    def translate(self, args):
+        """pip arguments after ``-m pip`` -> uv arguments, or None."""
+        if not args or args[0] not in self.SUBCOMMANDS:
+            return None
+        out = [args[0]]
+        rest = iter(args[1:])
+        for arg in rest:
+            if arg in self.DROPPED:
+                continue
+            if arg in self.DROPPED_VALUE:
+                next(rest, None)
+                continue
+            if arg in self.RENAMED:
+                out.append(self.RENAMED[arg])
+            elif arg in self.VALUE_FLAGS:
+                out += [arg, next(rest, "")]
+            elif arg in self.FLAGS or not arg.startswith("-"):
+                out.append(arg)
+            else:
+                return None  # --report, --proxy ...
+        return out
+
+    def command(self, pip_cmd):
+        """
+        ``pip_cmd`` ([python, "-m", "pip", ...]) as a uv Command whose
+        fallback is ``pip_cmd``; ``pip_cmd`` itself if uv cannot run it.
+        """
+        args = self.translate(pip_cmd[3:])
+        if args is None:
+            return pip_cmd
+        cmd = Command([self.executable, "pip", args[0],
+                       "--python", pip_cmd[0]] + args[1:])
+        cmd.fallback = pip_cmd
+        return cmd
+
+    def unsupported(self, output):
+        """True if uv rejected the command line rather than failing."""
+        return bool(self._REFUSED.search(output))
+
+
+def select(choice=AUTO, executable=""):
+    """
+    The backend for a Settings ``choice``: uv when asked for (or, with
+    "auto", when found on PATH) and runnable, else pip.
+    """
+    if choice == PIP:
+        return PipBackend()
+    exe = executable or shutil.which("uv")
+    if exe:
+        backend = UvBackend(exe)
+        if backend.available():
+            return backend
+    return PipBackend()
@@ -0,0 +1,262 @@
+"""
+cli.py - Headless command line for QGIS Pip Manager (no Qt, no qgis.core).
+
+    python -m <plugin folder> --python /path/to/python list
+    python -m <plugin folder> install geopandas --version 0.14.4
+
+Every output line is a JSON object with an "event" key:
+"package" (list/outdated/search rows), "requirement" (missing plugin
+dependencies), "advisory" (audit findings), "wheel" (largest wheels in
+pip's cache), "log"
+(streamed pip output) and a final "result" with "ok" and "message".
+
+Exit codes: 0 success, 1 operation failed (or conflicts or
+vulnerable packages found),
+2 usage error, 3 invalid target environment, 4 pip stopped by a timeout
+or cancelled (interrupted changes are rolled back).
+"""
+import argparse
+import json
+import os
+import sys
+
+from . import backends
+from .envlock import OperationCancelled
+from .qpip import QGISPipManager
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_ENV = 3
+EXIT_STOPPED = 4
+
+
+def _emit(event, **fields):
+    fields["event"] = event
+    sys.stdout.write(json.dumps(fields) + "\n")
+    sys.stdout.flush()
+
+
+def _stream(line):
+    _emit("log", line=line)
+
+
+def _result(ok, message):
+    _emit("result", ok=bool(ok), message=message)
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+def _cmd_list(m, args):
+    for p in m.get_installed_packages():
+        _emit("package", **p)
+    return _result(True, "listed")
+
+
+def _cmd_outdated(m, args):
+    pkgs = m.get_outdated_packages()
+    for p in pkgs:
+        _emit("package", **p)
+    return _result(True, "{} outdated".format(len(pkgs)))
+
+
+def _cmd_search(m, args):
+    found = m.search_installed(" ".join(args.query), args.limit)
+    for name, score, fields in found:
+        _emit("package", name=name, score=score, fields=fields)
+    return _result(True, "{} match(es)".format(len(found)))
+
+
+def _cmd_plugins(m, args):
+    rows = m.plugin_requirements(args.plugin_dir or None)
+    for row in rows:
+        _emit("requirement", **row)
+    if not args.install or not rows:
+        return _result(not rows, "{} missing requirement(s)".format(
+            len(rows)))
+    specs = list(dict.fromkeys(
+        r["requirement"] for r in rows
+        if not r["optional"] and r.get("on_index") is not False))
+    return _result(*m.install_packages_list(specs, stream_cb=_stream))
+
+
+def _cmd_cache(m, args):
+    if args.budget is not None:
+        m.pip_cache_budget_mb = args.budget
+    if args.prune:
+        ok, msg = m.prune_pip_cache()
+        if not ok:
+            return _result(False, msg)
+        _emit("log", line=msg)
+    info = m.pip_cache_info(args.top)
+    for wheel in info["wheels"]:
+        _emit("wheel", **wheel)
+    return _result(True, "{}: {:.1f} MB in {} entries".format(
+        info["dir"] or "pip cache disabled", info["size"] / 1e6,
+        info["count"]))
+
+
+def _cmd_install(m, args):
+    return _result(*m.install_package(
+        args.package, args.version, stream_cb=_stream))
+
+
+def _cmd_batch_install(m, args):
+    if args.requirements:
+        return _result(*m.import_requirements(
+            args.requirements, stream_cb=_stream))
+    return _result(*m.install_packages_list(args.specs, stream_cb=_stream))
+
+
+def _cmd_snapshot(m, args):
+    return _result(*m.save_snapshot(args.label, locked=args.locked))
+
+
+def _cmd_restore(m, args):
+    return _result(*m.restore_snapshot(args.path, stream_cb=_stream))
+
+
+def _cmd_check(m, args):
+    return _result(*m.check_conflicts())
+
+
+def _cmd_audit(m, args):
+    if args.import_path:
+        ok, msg = m.import_advisories(args.import_path)
+        if not ok:
+            return _result(False, msg)
+        _stream(msg)
+    if not m.advisories.available():
+        return _result(False, "No advisory database imported "
+                              "(use --import).")
+    if args.snapshot:
+        found = m.audit_snapshot(args.snapshot)
+    else:
+        found = m.audit()
+    for name, hits in sorted(found.items()):
+        for adv in hits:
+            _emit("advisory", package=name, **adv)
+    return _result(not found, "{} vulnerable package(s)".format(len(found)))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="qgis-pip-manager",
+        description="Manage packages of a QGIS Python environment.")
+    parser.add_argument("--python", default=sys.executable,
+                        help="target interpreter (default: this one)")
+    parser.add_argument("--proxy", default="")
+    parser.add_argument("--index-url", default="")
+    parser.add_argument("--extra-index-url", default="")
+    parser.add_argument("--mirror", action="append", default=[],
+                        help="another copy of --index-url; the fastest "
+                             "healthy one is used (repeatable)")
+    parser.add_argument("--snapshots-dir", default="")
+    parser.add_argument("--installer", choices=backends.CHOICES,
+                        default=backends.AUTO,
+                        help="pip, uv, or auto (uv when on PATH)")
+    parser.add_argument("--installer-path", default="",
+                        help="installer executable (default: from PATH)")
+    parser.add_argument("--idle-timeout", type=int, default=600,
+                        metavar="SECONDS",
+                        help="stop installs printing nothing this long "
+                             "(0: no limit)")
+    parser.add_argument("--timeout", type=int, default=3600,
+                        metavar="SECONDS",
+                        help="stop installs running this long (0: no limit)")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    sub.required = True
+
+    sub.add_parser("list", help="installed packages").set_defaults(
+        func=_cmd_list)
+    sub.add_parser("outdated", help="packages with newer releases"
+                   ).set_defaults(func=_cmd_outdated)
+
+    p = sub.add_parser("search", help="full-text search of installed "
+                                      "metadata, e.g. 'license:GPL raster'")
+    p.add_argument("query", nargs="+")
+    p.add_argument("--limit", type=int)
+    p.set_defaults(func=_cmd_search)
+
+    p = sub.add_parser("plugins", help="Python packages installed QGIS "
+                                       "plugins need but lack")
+    p.add_argument("--plugin-dir", action="append", default=[],
+                   help="plugin folder to scan (default: QGIS profiles)")
+    p.add_argument("--install", action="store_true",
+                   help="install the required (non-optional) ones")
+    p.set_defaults(func=_cmd_plugins)
+
+    p = sub.add_parser("cache", help="size of pip's cache and its largest "
+                                     "wheels")
+    p.add_argument("--top", type=int, default=25,
+                   help="largest wheels to list")
+    p.add_argument("--budget", type=int, metavar="MB",
+                   help="size budget for --prune")
+    p.add_argument("--prune", action="store_true",
+                   help="evict least recently used entries down to the "
+                        "budget, keeping wheels pinned by snapshots")
+    p.set_defaults(func=_cmd_cache)
+
+    p = sub.add_parser("install", help="install or upgrade one package")
+    p.add_argument("package")
+    p.add_argument("--version")
+    p.set_defaults(func=_cmd_install)
+
+    p = sub.add_parser("batch-install",
+                       help="install several specs or a requirements file")
+    p.add_argument("specs", nargs="*")
+    p.add_argument("-r", "--requirements")
+    p.set_defaults(func=_cmd_batch_install)
+
+    p = sub.add_parser("snapshot", help="save a snapshot")
+    p.add_argument("--label", default="")
+    p.add_argument("--locked", action="store_true",
+                   help="write a hash lock")
+    p.set_defaults(func=_cmd_snapshot)
+
+    p = sub.add_parser("restore", help="restore a snapshot file")
+    p.add_argument("path")
+    p.set_defaults(func=_cmd_restore)
+
+    sub.add_parser("check", help="run pip check").set_defaults(
+        func=_cmd_check)
+
+    p = sub.add_parser("audit", help="check packages against an offline "
+                                     "advisory database")
+    p.add_argument("--import", dest="import_path", metavar="PATH",
+                   help="first import an OSV zip, folder or JSON file")
+    p.add_argument("--snapshot", help="audit a snapshot file instead")
+    p.set_defaults(func=_cmd_audit)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "batch-install" and not (
+            args.specs or args.requirements):
+        parser.error("batch-install needs specs or --requirements")
+    try:
+        manager = QGISPipManager(
+            args.python, proxy=args.proxy,
+            extra_index_url=args.extra_index_url,
+            index_url=args.index_url, snapshots_dir=args.snapshots_dir)
+    except (ValueError, OSError) as exc:
+        _emit("result", ok=False, message=str(exc))
+        return EXIT_ENV
+    manager.mirrors = " ".join(args.mirror)
+    manager.installer = args.installer
+    manager.installer_path = args.installer_path
+    manager.idle_timeout = args.idle_timeout
+    manager.total_timeout = args.timeout
+    try:
+        return args.func(manager, args)
+    except OperationCancelled as exc:
+        _emit("result", ok=False, message=str(exc))
+        return EXIT_STOPPED
+    except KeyboardInterrupt:
+        _emit("result", ok=False, message="interrupted")
+        return EXIT_FAILED
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); silence the exit-time flush.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_FAILED
@@ -9,19 +9,29 @@ try:
         QLineEdit, QTreeWidget, QTreeWidgetItem, QMessageBox, QComboBox,
         QWidget, QSizePolicy, QApplication, QFileDialog, QTabWidget,
         QLabel, QProgressBar, QCheckBox, QGroupBox, QFormLayout, QInputDialog,
+        QCompleter, QSpinBox,
+    )
+    from PyQt6.QtCore import (
+        QThread, pyqtSignal, QObject, Qt, QTimer, QStringListModel,
+        QFileSystemWatcher,
     )
-    from PyQt6.QtCore import QThread, pyqtSignal, QObject, Qt, QTimer
     from PyQt6.QtGui import QColor, QIcon, QAction  # QAction in QtGui in PyQt6
 
     PYQT_VERSION = 6
     Qt_yellow        = Qt.GlobalColor.yellow
     Qt_SingleSel     = QTreeWidget.SelectionMode.SingleSelection
+    Qt_ExtendedSel   = QTreeWidget.SelectionMode.ExtendedSelection
+    Qt_Descending    = Qt.SortOrder.DescendingOrder
     QMsgBox_Yes      = QMessageBox.StandardButton.Yes
     QMsgBox_No       = QMessageBox.StandardButton.No
     QMsgBox_Ok       = QMessageBox.StandardButton.Ok
     SizePolicy_Fixed = QSizePolicy.Policy.Fixed
     SizePolicy_Pref  = QSizePolicy.Policy.Preferred
     SizePolicy_Exp   = QSizePolicy.Policy.Expanding
+    Completer_Unfiltered = QCompleter.CompletionMode.UnfilteredPopupCompletion
+    Item_ShowIndicator = QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator
+    Qt_Checked       = Qt.CheckState.Checked
+    Qt_Unchecked     = Qt.CheckState.Unchecked
 
 except ImportError:
     # QGIS 3 / PyQt5
@@ -30,17 +40,32 @@ except ImportError:
         QLineEdit, QTreeWidget, QTreeWidgetItem, QMessageBox, QComboBox,
         QWidget, QSizePolicy, QApplication, QFileDialog, QTabWidget,
         QLabel, QProgressBar, QCheckBox, QGroupBox, QFormLayout,
-        QInputDialog, QAction,  # QAction in QtWidgets in PyQt5
+        QInputDialog, QCompleter, QSpinBox,
+        QAction,  # QAction in QtWidgets in PyQt5
+    )
+    from PyQt5.QtCore import (
+        QThread, pyqtSignal, QObject, Qt, QTimer, QStringListModel,
+        QFileSystemWatcher,
     )
-    from PyQt5.QtCore import QThread, pyqtSignal, QObject, Qt, QTimer
     from PyQt5.QtGui import QColor, QIcon  # no QFont needed
 
     PYQT_VERSION = 5
     Qt_yellow        = Qt.yellow
     Qt_SingleSel     = QTreeWidget.SingleSelection
+    Qt_ExtendedSel   = QTreeWidget.ExtendedSelection
+    Qt_Descending    = Qt.DescendingOrder
     QMsgBox_Yes      = QMessageBox.Yes
     QMsgBox_No       = QMessageBox.No
     QMsgBox_Ok       = QMessageBox.Ok
     SizePolicy_Fixed = QSizePolicy.Fixed
     SizePolicy_Pref  = QSizePolicy.Preferred
-    SizePolicy_Exp   = QSizePolicy.Expanding
\ No newline at end of file
+    SizePolicy_Exp   = QSizePolicy.Expanding
+    Completer_Unfiltered = QCompleter.UnfilteredPopupCompletion
+    Item_ShowIndicator = QTreeWidgetItem.ShowIndicator
+    Qt_Checked       = Qt.Checked
+    Qt_Unchecked     = Qt.Unchecked
+
+
+def exec_dialog(dialog):
+    """Run a modal dialog (exec_ was renamed to exec in PyQt6)."""
+    return dialog.exec() if PYQT_VERSION == 6 else dialog.exec_()
@@ -0,0 +1,107 @@
+"""
+conda_meta.py - In-process reader for a conda environment's conda-meta.
+Listing only needs the record file names (name-version-build.json);
+channel details are parsed in parallel and cached by file mtime, so
+no `conda list` subprocess is needed.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .name_index import normalize
+
+_cache = {}  # record path -> (mtime_ns, parsed record)
+_cache_lock = threading.Lock()
+
+
+def find_prefix(python_path):
+    """
+    Return the conda prefix that owns ``python_path``, or "".
+    Handles <prefix>/bin/python and Windows <prefix>/python.exe.
+    """
+    exe = Path(python_path)
+    for candidate in (exe.parent, exe.parent.parent):
+        if (candidate / "conda-meta").is_dir():
+            return str(candidate)
+    return ""
+
+
+def _split_record_name(filename):
+    stem = filename[:-len(".json")]
+    parts = stem.rsplit("-", 2)
+    if len(parts) != 3:
+        return None
+    return {"name": parts[0], "version": parts[1], "build": parts[2]}
+
+
+def _read_record(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _cache_lock:
+        hit = _cache.get(path)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    channel = (data.get("channel") or "").rstrip("/").split("/")
+    if len(channel) > 1 and channel[-1] == data.get("subdir"):
+        channel.pop()
+    record = {
+        "name": data.get("name", ""),
+        "version": data.get("version", ""),
+        "build": data.get("build", ""),
+        "channel": channel[-1],
+    }
+    with _cache_lock:
+        _cache[path] = (mtime, record)
+    return record
+
+
+def list_conda_packages(prefix, details=False, workers=8):
+    """
+    List the packages conda installed into ``prefix``.
+    Without ``details`` only the record file names are read.
+    """
+    meta = os.path.join(prefix, "conda-meta")
+    try:
+        files = [e.name for e in os.scandir(meta)
+                 if e.name.endswith(".json") and e.is_file()]
+    except OSError:
+        return []
+
+    if not details:
+        records = (_split_record_name(f) for f in files)
+    else:
+        paths = [os.path.join(meta, f) for f in files]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            records = list(pool.map(_read_record, paths))
+    return sorted((r for r in records if r),
+                  key=lambda r: r["name"].lower())
+
+
+def merge_inventory(pip_packages, conda_packages):
+    """
+    Merge a `pip list` result with conda records. Every entry gets an
+    ``owner`` of "conda" or "pip"; conda-only packages (C libraries,
+    renamed bindings) are appended so the listing is complete.
+    """
+    conda_by_name = {normalize(r["name"]): r for r in conda_packages}
+    merged, seen = [], set()
+    for p in pip_packages:
+        key = normalize(p["name"])
+        seen.add(key)
+        entry = dict(p)
+        entry["owner"] = "conda" if key in conda_by_name else "pip"
+        merged.append(entry)
+    for key, r in conda_by_name.items():
+        if key not in seen:
+            merged.append({"name": r["name"], "version": r["version"],
+                           "owner": "conda"})
+    return sorted(merged, key=lambda x: x["name"].lower())
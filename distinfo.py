@@ -0,0 +1,326 @@
+"""
+distinfo.py - Qt-free helpers for reading installed distribution metadata
+straight from site-packages (*.dist-info / *.egg-info), without pip.
+"""
+import hashlib
+import os
+import re
+import threading
+
+from .name_index import normalize
+
+META_SUFFIXES = (".dist-info", ".egg-info")
+_REQ_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def metadata_dirs(site_dirs):
+    """Sorted (site_dir, entry_name) pairs for every installed distribution."""
+    found = []
+    for d in site_dirs:
+        try:
+            with os.scandir(d) as it:
+                found.extend((d, e.name) for e in it
+                             if e.name.endswith(META_SUFFIXES))
+        except OSError:
+            continue
+    return sorted(found)
+
+
+def fingerprint(site_dirs):
+    """
+    Cheap identity of an environment's installed set. Metadata folder
+    names embed name and version, so any install, upgrade or removal
+    changes the digest.
+    """
+    h = hashlib.sha1()
+    for d, name in metadata_dirs(site_dirs):
+        h.update(d.encode("utf-8", "replace"))
+        h.update(b"/")
+        h.update(name.encode("utf-8", "replace"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def metadata_file(site_dir, entry):
+    """Path of the METADATA / PKG-INFO file for a metadata entry."""
+    path = os.path.join(site_dir, entry)
+    if entry.endswith(".dist-info"):
+        return os.path.join(path, "METADATA")
+    if os.path.isdir(path):
+        return os.path.join(path, "PKG-INFO")
+    return path  # single-file .egg-info
+
+
+def read_headers(path, fields=("Name", "Version")):
+    """
+    Read selected RFC 822 headers of a METADATA file, stopping at the
+    first blank line so long descriptions are never loaded.
+    """
+    found = {}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                if not line.strip():
+                    break
+                key, sep, value = line.partition(":")
+                if sep and key in fields and key not in found:
+                    found[key] = value.strip()
+    except OSError:
+        pass
+    return found
+
+
+def read_record(site_dir, entry):
+    """Distribution name and version from a metadata entry, or None."""
+    headers = read_headers(metadata_file(site_dir, entry))
+    if not headers.get("Name"):
+        return None
+    return {"name": headers["Name"], "version": headers.get("Version", "")}
+
+
+class InstalledSet:
+    """
+    In-memory view of the installed distributions that can be patched
+    cheaply: ``refresh`` lists the site folders and only reads metadata
+    for entries that appeared since the last call.
+    """
+
+    def __init__(self, site_dirs):
+        self.site_dirs = list(site_dirs)
+        self._entries = {}   # (site_dir, entry) -> record
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Return (added, removed) records since the previous refresh."""
+        with self._lock:
+            current = set(metadata_dirs(self.site_dirs))
+            known = set(self._entries)
+            removed = [self._entries.pop(k) for k in known - current]
+            added = []
+            for key in sorted(current - known):
+                record = read_record(*key)
+                if record:
+                    self._entries[key] = record
+                    added.append(record)
+            return added, [r for r in removed if r]
+
+    def records(self):
+        with self._lock:
+            return list(self._entries.values())
+
+
+def dist_key(entry):
+    """Normalized project name encoded in a metadata folder name."""
+    return normalize(entry.split("-")[0])
+
+
+def find_entry(site_dirs, name):
+    """(site_dir, entry) of the installed distribution ``name``, or None."""
+    key = normalize(name)
+    for site_dir, entry in metadata_dirs(site_dirs):
+        if dist_key(entry) == key:
+            return site_dir, entry
+    return None
+
+
+def record_paths(site_dir, entry):
+    """Relative paths listed in a distribution's RECORD (dist-info only)."""
+    path = os.path.join(site_dir, entry, "RECORD")
+    try:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            return [line.rsplit(",", 2)[0].strip('"')
+                    for line in fh if line.strip()]
+    except OSError:
+        return []
+
+
+def installed_size(site_dir, entry):
+    """Bytes on disk of a distribution's files (RECORD sizes, else stat)."""
+    path = os.path.join(site_dir, entry, "RECORD")
+    total = 0
+    try:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                rel, _, size = line.strip().rpartition(",")
+                rel = rel.rsplit(",", 1)[0].strip('"')
+                if size.isdigit():
+                    total += int(size)
+                elif rel:
+                    try:
+                        total += os.path.getsize(os.path.join(site_dir, rel))
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+    return total
+
+
+def import_names(site_dir, entry):
+    """
+    Top-level importable modules of a distribution: top_level.txt when
+    present, otherwise the first path component of RECORD entries.
+    """
+    path = os.path.join(site_dir, entry, "top_level.txt")
+    try:
+        with open(path, encoding="utf-8") as fh:
+            names = [n.strip() for n in fh if n.strip()]
+    except OSError:
+        names = []
+        for rel in record_paths(site_dir, entry):
+            head = rel.replace("\\", "/").split("/")[0]
+            if head.endswith(".py"):
+                names.append(head[:-3])
+            elif "/" in rel.replace("\\", "/") and not head.endswith(
+                    META_SUFFIXES + (".data",)) and head not in (
+                    "..", "__pycache__", "bin", "Scripts"):
+                names.append(head)
+    return sorted({n.replace("/", ".") for n in names
+                   if n and not n.startswith("_") and n.isidentifier()})
+
+
+def read_requires(site_dir, entry, with_extras=False):
+    """
+    Normalized names a distribution requires (Requires-Dist). Extras
+    are skipped unless ``with_extras``; other markers are kept so the
+    result is a superset of what pip would install.
+    """
+    path = metadata_file(site_dir, entry)
+    names = set()
+    try:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                if not line.strip():
+                    break
+                if not line.startswith("Requires-Dist:"):
+                    continue
+                req = line[len("Requires-Dist:"):]
+                if not with_extras and "extra" in req.partition(";")[2]:
+                    continue
+                m = _REQ_NAME.match(req)
+                if m:
+                    names.add(normalize(m.group(1)))
+    except OSError:
+        pass
+    return names
+
+
+def entries_by_name(site_dirs):
+    """Normalized project name -> (site_dir, entry) for everything installed."""
+    return {dist_key(entry): (site_dir, entry)
+            for site_dir, entry in metadata_dirs(site_dirs)}
+
+
+def requested(site_dirs):
+    """Normalized names of distributions carrying pip's REQUESTED marker."""
+    return {dist_key(entry) for site_dir, entry in metadata_dirs(site_dirs)
+            if os.path.exists(os.path.join(site_dir, entry, "REQUESTED"))}
+
+
+def dependency_closure(site_dirs, names):
+    """Installed distributions ``names`` depend on, including themselves."""
+    index = entries_by_name(site_dirs)
+    todo = [normalize(n) for n in names]
+    seen = set()
+    while todo:
+        key = todo.pop()
+        if key in seen or key not in index:
+            continue
+        seen.add(key)
+        todo.extend(read_requires(*index[key]) - seen)
+    return sorted(seen)
+
+
+class RequirementGraph:
+    """
+    Reverse-dependency index of the installed distributions. As with
+    InstalledSet, ``refresh`` only reads the metadata of entries that
+    appeared since the last call, so it is cheap enough to run on every
+    selection change. Environment markers other than extras are kept,
+    so dependents may include some that only apply on other platforms.
+    """
+
+    def __init__(self, site_dirs):
+        self.site_dirs = list(site_dirs)
+        self._entries = {}   # (site_dir, entry) -> (key, name, requires)
+        self._where = {}     # key -> (site_dir, entry)
+        self._reverse = {}   # key -> keys that require it
+        self._names = {}     # key -> display name
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            current = set(metadata_dirs(self.site_dirs))
+            if current == set(self._entries):
+                return
+            for gone in set(self._entries) - current:
+                del self._entries[gone]
+            for new in current - set(self._entries):
+                name = read_headers(metadata_file(*new), ("Name",)).get(
+                    "Name") or new[1].split("-")[0]
+                self._entries[new] = (normalize(name), name,
+                                      read_requires(*new))
+            reverse, names, where = {}, {}, {}
+            for loc, (key, name, requires) in self._entries.items():
+                names[key] = name
+                where[key] = loc
+                for dep in requires:
+                    reverse.setdefault(dep, set()).add(key)
+            self._reverse = {k: v for k, v in reverse.items() if k in names}
+            self._names = names
+            self._where = where
+
+    def required_by(self, name):
+        """Installed distributions that directly require ``name``."""
+        self.refresh()
+        keys = self._reverse.get(normalize(name), ())
+        return sorted((self._names[k] for k in keys), key=str.lower)
+
+    def impact(self, name):
+        """
+        Every installed distribution that requires ``name`` directly or
+        transitively, as {display name: depth} (1 = direct).
+        """
+        self.refresh()
+        start = normalize(name)
+        depth, frontier = {start: 0}, [start]
+        while frontier:
+            nxt = []
+            for key in frontier:
+                for dep in self._reverse.get(key, ()):
+                    if dep not in depth:
+                        depth[dep] = depth[key] + 1
+                        nxt.append(dep)
+            frontier = nxt
+        del depth[start]
+        return {self._names[k]: d for k, d in depth.items()}
+
+    def orphans(self, keep):
+        """
+        Distributions nothing installed requires any more, skipping the
+        normalized names in ``keep``. Removing a leaf can orphan its own
+        requirements, so leaves are peeled off repeatedly; returns
+        [(name, (site_dir, entry), round, freed_by)] with round 1 =
+        current leaves and ``freed_by`` the earlier-round orphans that
+        required it.
+        """
+        self.refresh()
+        with self._lock:
+            entries = {v[0]: v for v in self._entries.values()}
+            where, reverse = dict(self._where), self._reverse
+        alive = {k: set(reverse.get(k, ())) for k in entries}
+        freed = {}
+        out, rnd = [], 0
+        while True:
+            rnd += 1
+            leaves = [k for k, users in alive.items()
+                      if not users and k not in keep]
+            if not leaves:
+                return out
+            for key in sorted(leaves):
+                out.append((entries[key][1], where[key], rnd,
+                            sorted(freed.get(key, ()))))
+                del alive[key]
+                for dep in entries[key][2]:
+                    if dep in alive:
+                        alive[dep].discard(key)
+                        freed.setdefault(dep, set()).add(entries[key][1])
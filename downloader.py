@@ -0,0 +1,137 @@
+"""
+downloader.py - Parallel, resumable, hash-verified file downloads.
+A resolved plan lists the exact files pip would fetch; downloading them
+concurrently into a local folder and installing with `--no-index
+--find-links` replaces pip's one-after-another downloads.
+Partial files keep a ``.part`` suffix and are resumed with a Range
+request; finished files are only kept when their sha256 matches.
+"""
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+_CHUNK = 1 << 16
+_SCHEMES = ("http", "https", "file")
+
+
+def filename_of(url):
+    return unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+
+
+def downloadable(item):
+    """
+    True if ``item`` (a plan entry) names a wheel URL. An sdist is left
+    to pip: its isolated build fetches setuptools from the index.
+    """
+    url = item.get("url", "")
+    return (urlsplit(url).scheme in _SCHEMES
+            and filename_of(url).endswith(".whl"))
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stream_to(open_url, url, part):
+    """Append the rest of ``url`` to ``part`` (restarts on a full reply)."""
+    have = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Accept-Encoding": "identity"}
+    if have:
+        headers["Range"] = "bytes={}-".format(have)
+    conn, resp = open_url(url, headers=headers, timeout=30)
+    try:
+        if resp.status == 416:  # nothing left to send
+            return
+        if resp.status not in (200, 206):
+            raise RuntimeError("HTTP {} for {}".format(resp.status, url))
+        mode = "ab" if resp.status == 206 else "wb"
+        with open(part, mode) as fh:
+            for chunk in iter(lambda: resp.read(_CHUNK), b""):
+                fh.write(chunk)
+    finally:
+        conn.close()
+
+
+def fetch(item, dest, open_url, attempts=3):
+    """
+    Make ``item["url"]`` available in ``dest`` and return its path.
+    A file already present with the expected hash is reused.
+    """
+    url, sha = item["url"], item.get("sha256", "")
+    path = os.path.join(dest, filename_of(url))
+    if os.path.exists(path) and (not sha or _sha256(path) == sha):
+        os.utime(path)  # keeps it out of prune()
+        return path
+
+    part = path + ".part"
+    for attempt in range(1, attempts + 1):
+        try:
+            if urlsplit(url).scheme == "file":
+                from urllib.request import url2pathname
+                shutil.copyfile(url2pathname(urlsplit(url).path), part)
+            else:
+                _stream_to(open_url, url, part)
+        except Exception:  # socket, HTTP or file errors
+            if attempt == attempts:
+                raise
+            continue  # the next attempt resumes the partial file
+        if not sha or _sha256(part) == sha:
+            os.replace(part, path)
+            return path
+        os.unlink(part)  # corrupt or stale partial: start over
+    raise RuntimeError("Hash mismatch for {}".format(filename_of(url)))
+
+
+def fetch_all(items, dest, open_url, workers=4, progress_cb=None):
+    """
+    Download every plan item into ``dest`` with ``workers`` threads.
+    Returns the local paths in item order; raises RuntimeError listing
+    the files that failed.
+    """
+    os.makedirs(dest, exist_ok=True)
+    total = len(items)
+    done = [0]
+
+    def one(item):
+        try:
+            path = fetch(item, dest, open_url)
+        except Exception as exc:
+            return None, "{}: {}".format(filename_of(item["url"]), exc)
+        done[0] += 1
+        if progress_cb:
+            progress_cb("Downloaded {} ({}/{})".format(
+                os.path.basename(path), done[0], total))
+        return path, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(one, items))
+    errors = [e for _, e in results if e]
+    if errors:
+        raise RuntimeError("Download failed:\n" + "\n".join(errors))
+    return [p for p, _ in results]
+
+
+def prune(dest, max_age_days):
+    """Delete cached files not used for ``max_age_days``."""
+    cutoff = time.time() - max_age_days * 86400
+    try:
+        names = os.listdir(dest)
+    except OSError:
+        return 0
+    removed = 0
+    for name in names:
+        path = os.path.join(dest, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,144 @@
+"""
+envlock.py - Environment-scoped scheduling of pip operations.
+Mutating operations queue in-process (FIFO) and then take an exclusive
+lock on a file inside the environment, so two workers or two QGIS
+instances never run pip on the same site-packages at once. Read-only
+operations take a shared lock and run concurrently with each other.
+On Windows (no shared locks in msvcrt) readers do not lock.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_POLL = 0.25
+
+
+class OperationCancelled(Exception):
+    """Raised when a queued operation is cancelled before it started."""
+
+
+class Ticket:
+    """A queued mutating operation."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, label):
+        self.id = next(self._ids)
+        self.label = label
+        self.position = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _FileLock:
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def try_acquire(self, shared=False):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if fcntl:
+                fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                            | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class EnvironmentScheduler:
+    """
+    Serializes writers through ``lock_path`` and lets readers share it.
+    ``write`` reports queue positions through ``on_wait(ticket)``.
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def pending(self):
+        """Tickets waiting to start, in order."""
+        with self._cond:
+            return list(self._queue)
+
+    def cancel_all(self):
+        with self._cond:
+            for ticket in self._queue:
+                ticket.cancel()
+            self._cond.notify_all()
+
+    @contextmanager
+    def write(self, label, on_wait=None):
+        ticket = Ticket(label)
+        lock = _FileLock(self.lock_path)
+        with self._cond:
+            self._queue.append(ticket)
+        try:
+            while True:
+                with self._cond:
+                    if ticket.cancelled:
+                        raise OperationCancelled(
+                            "'{}' cancelled while queued.".format(label))
+                    position = self._queue.index(ticket) + 1
+                    if position == 1 and lock.try_acquire():
+                        self._queue.popleft()
+                        self._cond.notify_all()
+                        break
+                    if position != ticket.position:
+                        ticket.position = position
+                        if on_wait:
+                            on_wait(ticket)
+                    self._cond.wait(_POLL)
+        except BaseException:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._cond.notify_all()
+            raise
+        try:
+            yield ticket
+        finally:
+            lock.release()
+            with self._cond:
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        lock = _FileLock(self.lock_path)
+        if fcntl:
+            while not lock.try_acquire(shared=True):
+                time.sleep(_POLL)
+        try:
+            yield
+        finally:
+            lock.release()
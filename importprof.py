@@ -0,0 +1,119 @@
+"""
+importprof.py - Import-time profiling of installed packages.
+Each top-level module is imported in its own `python -X importtime`
+subprocess of the target interpreter; results are cached per
+distribution version so re-profiling an unchanged package is free.
+"""
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_LINE_PREFIX = "import time:"
+
+
+def parse_importtime(stderr, module):
+    """
+    Self and cumulative microseconds of ``module`` plus the number of
+    modules its import pulled in, from -X importtime output.
+    """
+    count, hit = 0, None
+    for line in stderr.splitlines():
+        if not line.startswith(_LINE_PREFIX) or "|" not in line:
+            continue
+        fields = line[len(_LINE_PREFIX):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        count += 1
+        if fields[2].strip() == module and fields[2][1:2] != " ":
+            hit = (int(fields[0]), int(fields[1]))
+    if hit is None:
+        return None
+    return {"self_us": hit[0], "cumulative_us": hit[1], "modules": count}
+
+
+def profile_module(python_path, module, timeout=60, creationflags=0,
+                   cwd=None):
+    """Import ``module`` in a fresh interpreter and time it."""
+    try:
+        r = subprocess.run(
+            [python_path, "-X", "importtime", "-c",
+             "import {}".format(module)],
+            capture_output=True, text=True, timeout=timeout,
+            creationflags=creationflags, cwd=cwd)
+    except subprocess.TimeoutExpired:
+        return {"module": module, "error": "timed out"}
+    stats = parse_importtime(r.stderr, module)
+    if r.returncode == 0 and stats is None:
+        return {"module": module, "error": "already imported at start-up"}
+    if r.returncode != 0 or stats is None:
+        tail = (r.stderr.strip().splitlines() or ["import failed"])[-1]
+        return {"module": module, "error": tail}
+    stats["module"] = module
+    return stats
+
+
+class ImportProfileCache:
+    """JSON cache of profile rows keyed by python, project and version."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as fh:
+                self._data = json.load(fh)
+        except (OSError, ValueError):
+            self._data = {}
+
+    @staticmethod
+    def key(python_path, name, version):
+        return "{}|{}|{}".format(python_path, name.lower(), version)
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key, rows):
+        with self._lock:
+            self._data[key] = rows
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._data, fh)
+            os.replace(tmp, self.path)
+
+
+def profile_distributions(python_path, dists, cache, workers=None,
+                          progress_cb=None, **run_kwargs):
+    """
+    Profile every module of ``dists`` (dicts with name, version and
+    modules) in a bounded pool. Returns one row per module.
+    """
+    rows, todo = [], []
+    for d in dists:
+        key = cache.key(python_path, d["name"], d["version"])
+        hit = cache.get(key)
+        if hit is not None:
+            rows.extend(hit)
+        else:
+            todo.append((key, d))
+
+    def run(item):
+        key, d = item
+        result = []
+        for module in d["modules"]:
+            row = profile_module(python_path, module, **run_kwargs)
+            row.update(package=d["name"], version=d["version"])
+            result.append(row)
+        if not any("error" in r for r in result):
+            cache.put(key, result)
+        if progress_cb:
+            progress_cb("Profiled {} ({} module(s))".format(
+                d["name"], len(result)))
+        return result
+
+    workers = workers or max(2, min(8, (os.cpu_count() or 2) // 2))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(run, todo):
+            rows.extend(result)
+    return rows
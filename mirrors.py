@@ -0,0 +1,115 @@
+"""
+mirrors.py - Pick the fastest healthy package index among candidates.
+Each candidate gets a small HEAD request for a well-known project page;
+latency and health are cached on disk with a TTL so only stale entries
+are probed again. An index that fails during an operation is marked
+down for one TTL, so the next call fails over to the next candidate.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .netstate import Offline
+
+PROBE_PROJECT = "pip"
+
+
+class MirrorSet:
+
+    def __init__(self, path, ttl=300, timeout=3.0):
+        self.path = str(path)
+        self.ttl = ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._results = None  # url -> {"ok", "latency", "checked", ...}
+
+    def _load(self):
+        # called with the lock held
+        if self._results is None:
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    self._results = json.load(fh)
+            except (OSError, ValueError):
+                self._results = {}
+        return self._results
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._results, fh, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def results(self, urls):
+        """Cached probe results for ``urls`` (None where never probed)."""
+        with self._lock:
+            cached = self._load()
+            return {u: cached.get(u) for u in urls}
+
+    def _probe_one(self, url, fetch):
+        target = "{}/{}/".format(url.rstrip("/"), PROBE_PROJECT)
+        start = time.perf_counter()
+        try:
+            status, _, _ = fetch(target, method="HEAD",
+                                 timeout=self.timeout)
+        except Offline:
+            return None  # not probed: says nothing about this index
+        except Exception as exc:
+            return {"ok": False, "latency": None, "checked": time.time(),
+                    "error": str(exc) or type(exc).__name__}
+        latency = (time.perf_counter() - start) * 1000.0
+        # 401/403/404 mean pip would fail there too: not a usable mirror
+        ok = 200 <= status < 400
+        return {"ok": ok, "latency": round(latency, 1),
+                "checked": time.time(),
+                "error": "" if ok else "HTTP {}".format(status)}
+
+    def probe(self, urls, fetch, force=False):
+        """
+        Probe the candidates whose result is older than the TTL (all of
+        them with ``force``) in parallel; returns every result. While
+        the network is known to be down nothing is probed or cached.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._load()
+            stale = [u for u in urls if force or u not in cached
+                     or now - cached[u].get("checked", 0) > self.ttl]
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                fresh = {u: r for u, r in zip(stale, pool.map(
+                    lambda u: self._probe_one(u, fetch), stale))
+                    if r is not None}
+            with self._lock:
+                self._load().update(fresh)
+                self._save()
+        return self.results(urls)
+
+    def ranked(self, urls, fetch):
+        """
+        ``urls`` ordered fastest healthy first; indexes that are down go
+        last in their configured order, so something is always returned.
+        """
+        if len(urls) < 2:
+            return list(urls)
+        results = self.probe(urls, fetch)
+
+        def key(item):
+            pos, url = item
+            r = results.get(url) or {}
+            if r.get("ok"):
+                return (0, r.get("latency") or 0.0, pos)
+            return (1, 0.0, pos)
+        return [u for _, u in sorted(enumerate(urls), key=key)]
+
+    def mark_failed(self, url, error=""):
+        """Record that ``url`` just failed; it stays down for one TTL."""
+        with self._lock:
+            self._load()[url] = {"ok": False, "latency": None,
+                                 "checked": time.time(),
+                                 "error": error or "failed during use"}
+            self._save()
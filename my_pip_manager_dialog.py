@@ -1,10 +1,10 @@
 """
 my_pip_manager_dialog.py  -  QGIS Pip Manager
-Tabbed dialog: Packages | Install | Snapshots | Presets | Settings
+Tabbed dialog: Packages | Install | Snapshots | Presets | Cache | Settings
 PyQt5/PyQt6 compatible via compat.py.
 """
 import json
-import tempfile
+from datetime import datetime
 from pathlib import Path
 
 from .compat import (
@@ -12,13 +12,26 @@ from .compat import (
     QLineEdit, QTreeWidget, QTreeWidgetItem, QMessageBox, QComboBox,
     QWidget, QFileDialog, QTabWidget, QLabel, QProgressBar,
     QCheckBox, QGroupBox, QFormLayout, QThread, pyqtSignal, QObject,
-    QTimer,
-    Qt_SingleSel, QMsgBox_Yes, QMsgBox_No,
-    SizePolicy_Fixed, SizePolicy_Pref,
+    QTimer, QCompleter, QStringListModel, QFileSystemWatcher, QSpinBox,
+    QColor, Item_ShowIndicator, exec_dialog, Qt_Checked, Qt_Unchecked,
+    Qt_ExtendedSel, Qt_Descending, QMsgBox_Yes, QMsgBox_No,
+    SizePolicy_Fixed, SizePolicy_Pref, Completer_Unfiltered,
 )
+from . import backends
+from .envlock import OperationCancelled
+from .netstate import ONLINE, PROBING, Offline
+from .procwatch import OperationTimedOut
+from .name_index import normalize
+from .prefetch import Prefetcher
 from .qpip import QGISPipManager
 
 
+VERSION_PAGE = 25
+PREFETCH_NEIGHBOURS = 3
+MORE_VERSIONS = "More versions..."
+VULNERABLE_COLOR = "#b00020"
+
+
 # == Worker thread =============================================================
 
 class Worker(QObject):
@@ -29,7 +42,12 @@ class Worker(QObject):
     package_list = pyqtSignal(list)
     versions_list = pyqtSignal(list)
     pypi_info = pyqtSignal(dict)
+    plan_ready = pyqtSignal(dict)
+    rows_ready = pyqtSignal(list)
     progress_line = pyqtSignal(str)
+    timed_out = pyqtSignal(str)
+    cache_info = pyqtSignal(dict)
+    advisories_ready = pyqtSignal(dict)
 
     def __init__(self, manager, operation, *args):
         super().__init__()
@@ -61,12 +79,27 @@ class Worker(QObject):
                 self.package_list.emit(m.get_outdated_packages())
 
             elif op == "get_versions":
-                self.versions_list.emit(
-                    m.get_package_versions(self.args[0]))
+                try:
+                    infos = m.get_version_info(self.args[0])
+                except Offline as exc:
+                    self.status.emit(str(exc))
+                    infos = []
+                except Exception:
+                    infos = [{"version": v, "wheel": True}
+                             for v in m.get_package_versions(self.args[0])
+                             if not v.startswith("Error:")]
+                self.versions_list.emit(infos)
 
             elif op == "pypi_search":
                 self.pypi_info.emit(m.pypi_search(self.args[0]))
 
+            elif op == "update_name_index":
+                n, errors = m.update_name_index()
+                self.result.emit(
+                    "Package name index ready: {} names.".format(n)
+                    + "".join("\nNot refreshed - {}".format(e)
+                              for e in errors))
+
             elif op == "get_details":
                 self.result.emit(m.get_package_details(self.args[0]))
 
@@ -84,7 +117,8 @@ class Worker(QObject):
                     + report)
 
             elif op == "export_req":
-                ok, msg = m.export_requirements(self.args[0])
+                ok, msg = m.export_requirements(
+                    self.args[0], locked=self.args[1])
                 (self.result if ok else self.error).emit(msg)
 
             elif op == "import_req":
@@ -94,13 +128,90 @@ class Worker(QObject):
 
             elif op == "save_snapshot":
                 ok, msg = m.save_snapshot(
-                    self.args[0] if self.args else "")
+                    self.args[0] if self.args else "",
+                    locked=len(self.args) > 1 and self.args[1])
                 (self.result if ok else self.error).emit(msg)
 
             elif op == "restore_snapshot":
                 ok, msg = m.restore_snapshot(self.args[0], stream_cb=cb)
                 (self.result if ok else self.error).emit(msg)
 
+            elif op == "undo":
+                ok, msg = m.undo_last()
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "profile_imports":
+                self.status.emit("Profiling imports (isolated "
+                                 "subprocesses)...")
+                self.rows_ready.emit(m.profile_imports(
+                    self.args[0] if self.args else None, stream_cb=cb))
+
+            elif op == "resolve_presets":
+                for preset in self.args[0]:
+                    pkgs = preset.get("packages", [])
+                    try:
+                        plan = (m.cached_plan(pkgs)
+                                or m.resolve_plan(pkgs))
+                    except Exception as exc:
+                        plan = {"packages": pkgs, "error": str(exc)}
+                    self.plan_ready.emit(plan)
+
+            elif op == "install_preset":
+                ok, msg = m.install_preset(self.args[0], stream_cb=cb)
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "scan_plugins":
+                self.status.emit("Scanning QGIS plugins for missing "
+                                 "Python packages...")
+                self.rows_ready.emit(m.plugin_requirements())
+
+            elif op == "install_list":
+                ok, msg = m.install_packages_list(self.args[0], stream_cb=cb)
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "find_orphans":
+                self.status.emit("Looking for orphaned dependencies...")
+                self.rows_ready.emit(m.orphans())
+
+            elif op == "uninstall_many":
+                ok, msg = m.uninstall_packages(self.args[0], stream_cb=cb)
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "upgrade_many":
+                ok, msg = m.upgrade_packages(self.args[0], stream_cb=cb)
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "reinstall_many":
+                ok, msg = m.reinstall_packages(self.args[0], stream_cb=cb)
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "probe_mirrors":
+                self.rows_ready.emit(m.probe_mirrors())
+
+            elif op == "import_advisories":
+                self.status.emit("Indexing advisories...")
+                ok, msg = m.import_advisories(self.args[0])
+                (self.result if ok else self.error).emit(msg)
+
+            elif op == "audit":
+                self.advisories_ready.emit(m.advisories.audit(self.args[0]))
+
+            elif op == "advisory_info":
+                self.advisories_ready.emit(m.advisories.info())
+
+            elif op == "audit_snapshots":
+                self.rows_ready.emit([
+                    {"path": p, "found": sorted(m.audit_snapshot(p))}
+                    for p in self.args[0]])
+
+            elif op == "scan_cache":
+                self.cache_info.emit(m.pip_cache_info())
+
+            elif op == "prune_cache":
+                self.status.emit("Pruning pip's cache...")
+                ok, msg = m.prune_pip_cache()
+                (self.result if ok else self.error).emit(msg)
+
             elif op == "conda_install":
                 ok, msg = m.conda_install(self.args[0], stream_cb=cb)
                 (self.result if ok else self.error).emit(msg)
@@ -109,17 +220,62 @@ class Worker(QObject):
                 self.error.emit(
                     "Unknown worker operation: '{}'".format(op))
 
+        except OperationTimedOut as exc:
+            self.timed_out.emit(str(exc))
+        except (OperationCancelled, Offline) as exc:
+            self.status.emit(str(exc))
         except Exception as exc:
             self.error.emit(str(exc))
         finally:
             self.finished.emit()
 
 
+class _SortItem(QTreeWidgetItem):
+    """Tree item that sorts numeric columns by value, not text."""
+
+    def __lt__(self, other):
+        col = self.treeWidget().sortColumn() if self.treeWidget() else 0
+        a, b = self.text(col), other.text(col)
+        try:
+            return float(a or -1) < float(b or -1)
+        except ValueError:
+            return a < b
+
+
 # == Main dialog ===============================================================
 
+def create_manager(qgis_python_path, settings=None):
+    """A QGISPipManager configured from the saved pip_manager/* settings."""
+    def gs(key, default=""):
+        return (settings.value("pip_manager/{}".format(key), default)
+                if settings else default)
+
+    manager = QGISPipManager(
+        qgis_python_path,
+        proxy=gs("proxy"),
+        extra_index_url=gs("extra_index_url"),
+        index_url=gs("index_url"),
+        snapshots_dir=gs("snapshots_dir"),
+    )
+    manager.stash_max_age_days = int(gs("stash_days", 7))
+    manager.auto_rollback = str(gs("auto_rollback", True)).lower() in (
+        "true", "1")
+    manager.parallel_downloads = int(gs("parallel_downloads", 4))
+    manager.protect_core = str(gs("protect_core", True)).lower() in (
+        "true", "1")
+    manager.mirrors = gs("mirrors")
+    manager.installer = gs("installer", backends.AUTO)
+    manager.installer_path = gs("installer_path")
+    manager.pip_cache_budget_mb = int(gs("pip_cache_budget_mb", 0))
+    manager.idle_timeout = int(gs("idle_timeout", 600))
+    manager.total_timeout = int(gs("total_timeout", 3600))
+    return manager
+
+
 class PipManagerDialog(QDialog):
 
-    def __init__(self, parent=None, qgis_python_path=None, settings=None):
+    def __init__(self, parent=None, qgis_python_path=None, settings=None,
+                 manager=None):
         super().__init__(parent)
         self.setWindowTitle("QGIS Pip Manager")
         self.resize(840, 660)
@@ -127,28 +283,53 @@ class PipManagerDialog(QDialog):
         self._settings = settings
         self._proxy = self._gs("proxy", "")
         self._index_url = self._gs("index_url", "")
+        self._mirrors = self._gs("mirrors", "")
         self._extra_index = self._gs("extra_index_url", "")
         self._snapshots_dir = self._gs("snapshots_dir", "")
 
-        self.manager = QGISPipManager(
-            qgis_python_path,
-            proxy=self._proxy,
-            extra_index_url=self._extra_index,
-            index_url=self._index_url,
-            snapshots_dir=self._snapshots_dir,
-        )
+        # the plugin hands over the manager it warmed up at QGIS idle
+        self.manager = manager or create_manager(qgis_python_path, settings)
 
         self.installed_packages = []
+        self._vulnerable = {}       # normalized name -> advisories
+        self._version_infos = []
+        self._version_shown = 0
         self._active_threads = []
         self._active_workers = []
 
+        self._prefetcher = Prefetcher(self.manager.prefetch)
+
         self._search_timer = QTimer()
         self._search_timer.setSingleShot(True)
         self._search_timer.timeout.connect(self._trigger_pypi_search)
+        # local completions too: fuzzy scoring is not free per keystroke
+        self._names_timer = QTimer()
+        self._names_timer.setSingleShot(True)
+        self._names_timer.timeout.connect(self._complete_names)
+
+        # site-packages changes (ours or anyone's) patch the list in place
+        self._fs_watcher = QFileSystemWatcher(self)
+        self._fs_timer = QTimer()
+        self._fs_timer.setSingleShot(True)
+        self._fs_timer.timeout.connect(self._refresh_inventory)
+        self._fs_watcher.directoryChanged.connect(
+            lambda _path: self._fs_timer.start(600))
 
+        self._presets = []
+        self._mirror_rows = []
+        self._baseline_checked = False
         self._build_ui()
-        self._load_presets()
+        # connectivity indicator; the circuit breaker lives in netstate.py
+        self._net_state = ONLINE
+        self._net_timer = QTimer(self)
+        self._net_timer.timeout.connect(self._update_network_state)
+        self._net_timer.start(2000)
         self._populate_packages()
+        if self._mirrors:
+            self._probe_mirrors(background=True)
+        self._run_worker("update_name_index", on_result=self._log,
+                         on_error=lambda m: self._log(
+                             "Name index unavailable: {}".format(m)))
 
     # -- settings helpers ------------------------------------------------------
 
@@ -165,12 +346,22 @@ class PipManagerDialog(QDialog):
     def _build_ui(self):
         root = QVBoxLayout(self)
 
+        # Each tab is built the first time it is shown (see _ensure_tab)
         tabs = QTabWidget()
-        tabs.addTab(self._tab_packages(), "Packages")
-        tabs.addTab(self._tab_install(), "Install")
-        tabs.addTab(self._tab_snapshot(), "Snapshots")
-        tabs.addTab(self._tab_presets(), "Presets")
-        tabs.addTab(self._tab_settings(), "Settings")
+        self._lazy_tabs = {}
+        for title, build in (("Packages", self._tab_packages),
+                             ("Install", self._tab_install),
+                             ("Snapshots", self._tab_snapshot),
+                             ("Presets", self._tab_presets),
+                             ("Cache", self._tab_cache),
+                             ("Settings", self._tab_settings)):
+            page = QWidget()
+            QVBoxLayout(page).setContentsMargins(0, 0, 0, 0)
+            self._lazy_tabs[title] = (page, build)
+            tabs.addTab(page, title)
+        tabs.currentChanged.connect(
+            lambda index: self._ensure_tab(tabs.tabText(index)))
+        self._ensure_tab("Packages")
         root.addWidget(tabs)
 
         log_group = QGroupBox("Log")
@@ -189,10 +380,35 @@ class PipManagerDialog(QDialog):
         lg.addLayout(btn_row)
         root.addWidget(log_group)
 
+        prog_row = QHBoxLayout()
         self.progress = QProgressBar()
         self.progress.setRange(0, 0)
         self.progress.setVisible(False)
-        root.addWidget(self.progress)
+        prog_row.addWidget(self.progress)
+        self.cancel_btn = self._btn("Cancel", prog_row, self._cancel)
+        self.cancel_btn.setToolTip(
+            "Stop the running pip processes and drop operations still "
+            "waiting for this environment")
+        self.cancel_btn.setVisible(False)
+        self.net_btn = self._btn("Online", prog_row, self._retry_network)
+        self.net_btn.setFlat(True)
+        self.net_btn.setToolTip(
+            "Network state - click to check again now while offline")
+        root.addLayout(prog_row)
+
+    def _ensure_tab(self, title):
+        """Build tab ``title`` now unless that already happened."""
+        page, build = self._lazy_tabs.pop(title, (None, None))
+        if page is not None:
+            page.layout().addWidget(build())
+
+    def _tab_built(self, title):
+        return title not in self._lazy_tabs
+
+    def _package_name(self):
+        """Package named in the Install tab (clicking the list sets it)."""
+        self._ensure_tab("Install")
+        return self.search_field.text().strip()
 
     # -- Tab: Packages ---------------------------------------------------------
 
@@ -202,23 +418,43 @@ class PipManagerDialog(QDialog):
 
         fr = QHBoxLayout()
         self.filter_field = QLineEdit()
-        self.filter_field.setPlaceholderText("Filter installed packages...")
+        self.filter_field.setPlaceholderText(
+            "Filter installed packages - name, words from the summary or "
+            "license:GPL, author:..., keywords:...")
         self.filter_field.textChanged.connect(self._filter_list)
         fr.addWidget(self.filter_field)
-        self._btn("Refresh", fr, self._populate_packages)
+        self._btn("Refresh", fr, lambda: self._populate_packages(True))
         self._btn("Check Outdated", fr, self._check_outdated)
         self._btn("Check Conflicts", fr, self._check_conflicts)
+        self._btn("Audit", fr, self._audit)
         lay.addLayout(fr)
 
         self.pkg_tree = QTreeWidget()
-        self.pkg_tree.setHeaderLabels(["Name", "Installed Version"])
-        self.pkg_tree.setSelectionMode(Qt_SingleSel)
+        self.pkg_tree.setHeaderLabels(
+            ["Name", "Installed Version", "Managed by"])
+        self.pkg_tree.setColumnHidden(2, not self.manager.is_conda)
+        self.pkg_tree.setSelectionMode(Qt_ExtendedSel)
         self.pkg_tree.itemClicked.connect(self._pkg_clicked)
+        self.pkg_tree.currentItemChanged.connect(
+            lambda cur, _prev: (self._prefetch_around(cur),
+                                self._show_required_by(cur)))
         lay.addWidget(self.pkg_tree)
 
+        self.required_by_label = QLabel()
+        self.required_by_label.setWordWrap(True)
+        lay.addWidget(self.required_by_label)
+
         br = QHBoxLayout()
         self._btn("Show Details", br, self._show_details)
         self._btn("Uninstall", br, self._uninstall)
+        self._btn("Upgrade Selected", br, lambda: self._batch("upgrade"))
+        self._btn("Reinstall Selected", br, lambda: self._batch("reinstall"))
+        self._btn("Undo Last Change", br, self._undo_last)
+        self._btn("Profile Imports", br, self._profile_imports)
+        self._btn("Find Orphans", br, self._find_orphans)
+        self._btn("Plugin Needs", br, self._scan_plugins).setToolTip(
+            "Find Python packages your installed QGIS plugins import or "
+            "declare but this environment lacks")
         lay.addLayout(br)
         return w
 
@@ -234,6 +470,10 @@ class PipManagerDialog(QDialog):
         self.search_field.setPlaceholderText(
             "e.g. pandas, geopandas, scikit-learn ...")
         self.search_field.textChanged.connect(self._debounce_search)
+        self._name_model = QStringListModel()
+        completer = QCompleter(self._name_model, self.search_field)
+        completer.setCompletionMode(Completer_Unfiltered)
+        self.search_field.setCompleter(completer)
         sl.addWidget(self.search_field)
         self.pypi_preview = QTextEdit()
         self.pypi_preview.setReadOnly(True)
@@ -249,6 +489,7 @@ class PipManagerDialog(QDialog):
         self.version_combo.addItem("Latest")
         self.version_combo.setSizePolicy(
             SizePolicy_Fixed, SizePolicy_Pref)
+        self.version_combo.activated.connect(self._version_activated)
         ar.addWidget(self.version_combo)
         self._btn("Install / Upgrade", ar, self._install)
         self._btn("Dry-run Check", ar, self._dry_run)
@@ -263,6 +504,11 @@ class PipManagerDialog(QDialog):
                   self._import_requirements)
         self._btn("Export requirements.txt...", rl,
                   self._export_requirements)
+        self.lock_chk = QCheckBox("Export as hash lock")
+        self.lock_chk.setToolTip(
+            "Pin every file hash so re-importing skips dependency "
+            "resolution and rejects tampered downloads.")
+        rl.addWidget(self.lock_chk)
         lay.addWidget(rg)
         lay.addStretch()
         return w
@@ -278,10 +524,14 @@ class PipManagerDialog(QDialog):
             "install breaks QGIS."))
         br = QHBoxLayout()
         self._btn("Save Snapshot Now", br, self._save_snapshot)
+        self.snapshot_lock_chk = QCheckBox("Hash-locked")
+        self.snapshot_lock_chk.setToolTip(
+            "Restoring a hash-locked snapshot skips the resolver.")
+        br.addWidget(self.snapshot_lock_chk)
         lay.addLayout(br)
 
         self.snapshot_list = QTreeWidget()
-        self.snapshot_list.setHeaderLabels(["Snapshot file"])
+        self.snapshot_list.setHeaderLabels(["Snapshot file", "Advisories"])
         lay.addWidget(self.snapshot_list)
         self._refresh_snapshot_list()
 
@@ -300,10 +550,46 @@ class PipManagerDialog(QDialog):
             "One-click installation of common GIS / data-science stacks.\n"
             "Edit presets.json in the plugin folder to add your own."))
         self.preset_tree = QTreeWidget()
-        self.preset_tree.setHeaderLabels(["Preset", "Packages"])
+        self.preset_tree.setHeaderLabels(
+            ["Preset", "Packages", "Download", "Changes"])
         lay.addWidget(self.preset_tree)
         self._btn("Install Selected Preset", lay, self._install_preset)
         lay.addStretch()
+        self._load_presets()
+        return w
+
+    # -- Tab: Cache ------------------------------------------------------------
+
+    def _tab_cache(self):
+        w = QWidget()
+        lay = QVBoxLayout(w)
+        self.cache_label = QLabel("Scanning pip's cache...")
+        self.cache_label.setWordWrap(True)
+        lay.addWidget(self.cache_label)
+        self.cache_tree = QTreeWidget()
+        self.cache_tree.setHeaderLabels(
+            ["Largest wheels", "Version", "Size (MB)", "Last used", "Cache"])
+        self.cache_tree.setSortingEnabled(True)
+        lay.addWidget(self.cache_tree)
+
+        br = QHBoxLayout()
+        br.addWidget(QLabel("Size budget:"))
+        self.cache_budget_spin = QSpinBox()
+        self.cache_budget_spin.setRange(0, 1000000)
+        self.cache_budget_spin.setSingleStep(500)
+        self.cache_budget_spin.setSuffix(" MB")
+        self.cache_budget_spin.setSpecialValueText("No budget")
+        self.cache_budget_spin.setValue(self.manager.pip_cache_budget_mb)
+        self.cache_budget_spin.setToolTip(
+            "Least recently used entries beyond this size are removed "
+            "when QGIS starts and on Prune.\nWheels pinned by a snapshot "
+            "are always kept.")
+        self.cache_budget_spin.valueChanged.connect(self._set_cache_budget)
+        br.addWidget(self.cache_budget_spin)
+        self._btn("Prune to Budget", br, self._prune_cache)
+        self._btn("Rescan", br, self._scan_cache)
+        lay.addLayout(br)
+        self._scan_cache()
         return w
 
     # -- Tab: Settings ---------------------------------------------------------
@@ -323,6 +609,19 @@ class PipManagerDialog(QDialog):
             "Leave blank for default PyPI")
         form.addRow("Index URL:", self.index_url_field)
 
+        self.mirrors_field = QLineEdit(self._mirrors)
+        self.mirrors_field.setPlaceholderText(
+            "Other copies of the index URL, space separated")
+        form.addRow("Mirrors:", self.mirrors_field)
+
+        mirror_row = QHBoxLayout()
+        self.mirror_label = QLabel(
+            self._mirror_text(self._mirror_rows) or "not probed")
+        self.mirror_label.setWordWrap(True)
+        mirror_row.addWidget(self.mirror_label, 1)
+        self._btn("Probe Now", mirror_row, self._probe_mirrors)
+        form.addRow("Mirror status:", mirror_row)
+
         self.extra_index_field = QLineEdit(self._extra_index)
         self.extra_index_field.setPlaceholderText(
             "https://company.example/simple")
@@ -335,6 +634,74 @@ class PipManagerDialog(QDialog):
         self._btn("Browse...", snap_row, self._browse_snapshots_dir)
         form.addRow("Snapshots folder:", snap_row)
 
+        self.stash_days_spin = QSpinBox()
+        self.stash_days_spin.setRange(1, 365)
+        self.stash_days_spin.setValue(self.manager.stash_max_age_days)
+        self.stash_days_spin.setSuffix(" days")
+        form.addRow("Keep undo data for:", self.stash_days_spin)
+
+        self.auto_rollback_chk = QCheckBox(
+            "Roll back automatically if an installed package fails to "
+            "import")
+        self.auto_rollback_chk.setChecked(self.manager.auto_rollback)
+        form.addRow("", self.auto_rollback_chk)
+
+        self.downloads_spin = QSpinBox()
+        self.downloads_spin.setRange(0, 16)
+        self.downloads_spin.setValue(self.manager.parallel_downloads)
+        self.downloads_spin.setSpecialValueText("Off (pip downloads)")
+        self.downloads_spin.setToolTip(
+            "Files fetched at once before multi-package installs")
+        form.addRow("Parallel downloads:", self.downloads_spin)
+
+        limit_row = QHBoxLayout()
+        self.idle_timeout_spin = QSpinBox()
+        self.idle_timeout_spin.setRange(0, 240)
+        self.idle_timeout_spin.setValue(self.manager.idle_timeout // 60)
+        self.idle_timeout_spin.setSuffix(" min silent")
+        self.idle_timeout_spin.setSpecialValueText("No stall limit")
+        limit_row.addWidget(self.idle_timeout_spin)
+        self.total_timeout_spin = QSpinBox()
+        self.total_timeout_spin.setRange(0, 1440)
+        self.total_timeout_spin.setValue(self.manager.total_timeout // 60)
+        self.total_timeout_spin.setSuffix(" min in total")
+        self.total_timeout_spin.setSpecialValueText("No time limit")
+        limit_row.addWidget(self.total_timeout_spin)
+        self.idle_timeout_spin.setToolTip(
+            "Installs and downloads are stopped (and rolled back) after "
+            "printing nothing this long or running this long")
+        self.total_timeout_spin.setToolTip(self.idle_timeout_spin.toolTip())
+        form.addRow("Stop installs after:", limit_row)
+
+        inst_row = QHBoxLayout()
+        self.installer_combo = QComboBox()
+        for choice, label in ((backends.AUTO, "Auto (uv when found)"),
+                              (backends.PIP, "pip"), (backends.UV, "uv")):
+            self.installer_combo.addItem(label, choice)
+        self.installer_combo.setCurrentIndex(
+            max(0, self.installer_combo.findData(self.manager.installer)))
+        inst_row.addWidget(self.installer_combo)
+        self.installer_path_field = QLineEdit(self.manager.installer_path)
+        self.installer_path_field.setPlaceholderText(
+            "uv executable (default: from PATH)")
+        inst_row.addWidget(self.installer_path_field, 1)
+        form.addRow("Installer:", inst_row)
+
+        core_row = QHBoxLayout()
+        self.protect_core_chk = QCheckBox(
+            "Pin the packages that shipped with QGIS during installs")
+        self.protect_core_chk.setChecked(self.manager.protect_core)
+        core_row.addWidget(self.protect_core_chk, 1)
+        self._btn("Reference Manifest...", core_row, self._load_baseline)
+        form.addRow("Core protection:", core_row)
+
+        adv_row = QHBoxLayout()
+        self.advisory_label = QLabel()
+        adv_row.addWidget(self.advisory_label, 1)
+        self._btn("Import...", adv_row, self._import_advisories)
+        form.addRow("Advisory database:", adv_row)
+        self._update_advisory_label()
+
         lay.addLayout(form)
 
         self.python_path_label = QLabel(
@@ -344,11 +711,8 @@ class PipManagerDialog(QDialog):
 
         self._btn("Save Settings", lay, self._save_settings)
 
-        pip_v = ".".join(str(x) for x in self.manager.pip_ver)
-        env = ("conda env detected" if self.manager.is_conda
-               else "pip / OSGeo4W env")
-        lay.addWidget(QLabel(
-            "pip version: {}   |   {}".format(pip_v, env)))
+        self.env_label = QLabel(self._env_summary())
+        lay.addWidget(self.env_label)
         lay.addStretch()
         return w
 
@@ -366,11 +730,52 @@ class PipManagerDialog(QDialog):
 
     def _busy(self, state):
         self.progress.setVisible(state)
+        self.cancel_btn.setVisible(state)
+
+    def _cancel(self):
+        queued = len(self.manager.scheduler.pending())
+        self.manager.cancel_queued()
+        running = self.manager.cancel_running()
+        if not queued and not running:
+            self._log("Nothing to cancel.")
+            return
+        self._log("Cancelling {} running and {} queued operation(s); "
+                  "interrupted changes are rolled back...".format(
+                      running, queued))
+
+    def _update_network_state(self):
+        state, wait = self.manager.network_state()
+        if state == ONLINE:
+            text = "Online"
+        elif state == PROBING:
+            text = "Reconnecting..."
+        else:
+            text = "Offline - using cached data (next check in {} s)".format(
+                wait)
+        self.net_btn.setText(text)
+        self.net_btn.setStyleSheet(
+            "" if state == ONLINE else "color: {};".format(VULNERABLE_COLOR))
+        if (state == ONLINE) != (self._net_state == ONLINE):
+            self._log("Network back online." if state == ONLINE else
+                      "Network unreachable - working offline from cached "
+                      "data and downloaded wheels.")
+        self._net_state = state
+
+    def _retry_network(self):
+        if self.manager.network_state()[0] == ONLINE:
+            return
+        self.manager.retry_network()
+        self._net_state = ONLINE
+        self._log("Retrying the network on the next request.")
+        self._update_network_state()
 
     def _run_worker(self, operation, *args,
                     on_result=None, on_error=None,
                     on_package_list=None, on_versions=None,
-                    on_pypi_info=None, on_finished=None):
+                    on_pypi_info=None, on_plan=None, on_rows=None,
+                    on_cache_info=None, on_advisories=None,
+                    on_finished=None,
+                    background=False):
         thread = QThread(self)
         worker = Worker(self.manager, operation, *args)
         worker.moveToThread(thread)
@@ -380,6 +785,11 @@ class PipManagerDialog(QDialog):
 
         worker.status.connect(self._log)
         worker.progress_line.connect(self._log)
+        worker.timed_out.connect(lambda m: (
+            self._log("TIMED OUT: {}".format(m)),
+            None if background else QMessageBox.warning(
+                self, "Timed Out", m),
+        ))
 
         if on_error:
             worker.error.connect(on_error)
@@ -397,9 +807,18 @@ class PipManagerDialog(QDialog):
             worker.versions_list.connect(on_versions)
         if on_pypi_info:
             worker.pypi_info.connect(on_pypi_info)
+        if on_plan:
+            worker.plan_ready.connect(on_plan)
+        if on_rows:
+            worker.rows_ready.connect(on_rows)
+        if on_cache_info:
+            worker.cache_info.connect(on_cache_info)
+        if on_advisories:
+            worker.advisories_ready.connect(on_advisories)
 
         def _done():
-            self._busy(False)
+            if not background:
+                self._busy(False)
             if on_finished:
                 on_finished()
             self._active_threads = [
@@ -412,13 +831,26 @@ class PipManagerDialog(QDialog):
         thread.finished.connect(_done)
         thread.started.connect(worker.run)
 
-        self._busy(True)
+        if not background:
+            self._busy(True)
         thread.start()
 
     # -- Packages tab ----------------------------------------------------------
 
-    def _populate_packages(self):
-        self.pkg_tree.clear()
+    def _populate_packages(self, force=False):
+        if not force:
+            cached, current = self.manager.last_inventory()
+            if cached:
+                self._update_pkg_tree(cached)
+                if current:
+                    self.manager.inventory_delta()
+                    self._log("Package list unchanged on disk - "
+                              "showing cached list.")
+                    return
+                # stale but instant; the listing below replaces it
+                self._log("Showing the last package list - refreshing...")
+        else:
+            self.pkg_tree.clear()
         self._run_worker(
             "list_packages",
             on_package_list=self._update_pkg_tree,
@@ -429,56 +861,468 @@ class PipManagerDialog(QDialog):
 
     def _update_pkg_tree(self, packages):
         self.installed_packages = packages
+        self._apply_audit()
         self._filter_list(self.filter_field.text())
         if not packages:
             self._log("No packages found in this environment.")
+            return
+        watched = set(self._fs_watcher.directories())
+        new = [d for d in self.manager.site_packages() if d not in watched]
+        if new:
+            self._fs_watcher.addPaths(new)
+        self._check_baseline()
+
+    def _check_baseline(self):
+        """Once per session: note when the baseline is unreliable."""
+        if self._baseline_checked:
+            return
+        self._baseline_checked = True
+        if self.manager.baseline_needs_manifest():
+            self._log(
+                "Note: packages had already been installed when this "
+                "environment was first listed, so the record of what "
+                "shipped with QGIS may include them. Load a pip freeze "
+                "of a clean QGIS install with Settings > Reference "
+                "Manifest... to fix it.")
+
+    def _refresh_inventory(self):
+        """Patch the list with distributions added/removed on disk."""
+        if not self.installed_packages:
+            self._populate_packages(True)
+            return
+        added, removed = self.manager.inventory_delta()
+        if not (added or removed):
+            return
+        by_name = {normalize(p["name"]): p for p in self.installed_packages}
+        for r in removed:
+            by_name.pop(normalize(r["name"]), None)
+        for r in added:
+            by_name[normalize(r["name"])] = r
+        packages = sorted(by_name.values(), key=lambda x: x["name"].lower())
+        self.installed_packages = packages
+        self._apply_audit()
+        self._filter_list(self.filter_field.text())
+        self.manager.save_inventory(packages)
+        for r in removed:
+            self._log("- {} {}".format(r["name"], r["version"]))
+        for r in added:
+            self._log("+ {} {}".format(r["name"], r["version"]))
 
     def _filter_list(self, text):
-        ft = text.lower()
+        """
+        Name substring matches first, then full-text metadata matches
+        (summary, keywords, license:..., see textindex.py) by rank.
+        """
+        ft = text.strip().lower()
         self.pkg_tree.clear()
-        for p in self.installed_packages:
-            if ft and ft not in p["name"].lower():
-                continue
-            QTreeWidgetItem(
-                self.pkg_tree, [p["name"], p["version"]])
+        rows, matched = self.installed_packages, {}
+        if ft:
+            rows = [p for p in rows if ft in p["name"].lower()]
+            by_key = {normalize(p["name"]): p
+                      for p in self.installed_packages}
+            seen = {normalize(p["name"]) for p in rows}
+            for name, _, fields in self.manager.search_installed(ft):
+                key = normalize(name)
+                if key in by_key and key not in seen:
+                    seen.add(key)
+                    rows.append(by_key[key])
+                    matched[key] = fields
+        for p in rows:
+            item = QTreeWidgetItem(
+                self.pkg_tree,
+                [p["name"], p["version"], p.get("owner", "pip")])
+            fields = matched.get(normalize(p["name"]))
+            if fields:
+                item.setToolTip(0, "Matched in: {}".format(
+                    ", ".join(fields)))
+            hits = self._vulnerable.get(normalize(p["name"]))
+            if hits:
+                for col in range(2):
+                    item.setForeground(col, QColor(VULNERABLE_COLOR))
+                item.setToolTip(0, "\n".join(
+                    "{}: {}".format(a["id"], a.get("summary", ""))
+                    for a in hits))
+        if ft:
+            top = [self.pkg_tree.topLevelItem(i).text(0) for i in range(
+                min(PREFETCH_NEIGHBOURS, self.pkg_tree.topLevelItemCount()))]
+            self._prefetcher.schedule(top)
+
+    def _prefetch_around(self, item):
+        """Warm caches for the rows next to the current one."""
+        if item is None:
+            self._prefetcher.cancel()
+            return
+        names = [item.text(0)]
+        above = below = item
+        for _ in range(PREFETCH_NEIGHBOURS):
+            below = below and self.pkg_tree.itemBelow(below)
+            above = above and self.pkg_tree.itemAbove(above)
+            names += [i.text(0) for i in (below, above) if i]
+        self._prefetcher.schedule(names)
 
     def _pkg_clicked(self, item, _col):
         name = item.text(0)
+        self._ensure_tab("Install")
         self.search_field.setText(name)
+        cached = self.manager.cached_version_info(name)
+        if cached is not None:
+            self._update_versions(cached)
+            return
         self.version_combo.clear()
         self.version_combo.addItem("Fetching versions...")
         self._run_worker("get_versions", name,
                          on_versions=self._update_versions)
 
-    def _update_versions(self, versions):
+    def _update_versions(self, infos):
+        """Fill the version box lazily, one page at a time."""
+        self._version_infos = infos
+        self._version_shown = 0
         self.version_combo.clear()
         self.version_combo.addItem("Latest")
-        for v in versions:
-            self.version_combo.addItem(v)
+        self._add_version_page()
+
+    def _add_version_page(self):
+        more = self.version_combo.findText(MORE_VERSIONS)
+        if more >= 0:
+            self.version_combo.removeItem(more)
+        page = self._version_infos[
+            self._version_shown:self._version_shown + VERSION_PAGE]
+        for info in page:
+            label = info["version"]
+            if not info.get("wheel", True):
+                label += "  (source only - slow build)"
+            self.version_combo.addItem(label, info["version"])
+        self._version_shown += len(page)
+        if self._version_shown < len(self._version_infos):
+            self.version_combo.addItem(MORE_VERSIONS)
+
+    def _version_activated(self, index):
+        if self.version_combo.itemText(index) == MORE_VERSIONS:
+            self._add_version_page()
+            self.version_combo.setCurrentIndex(0)
+            self.version_combo.showPopup()
+
+    def _selected_version(self):
+        """Chosen version string, or None for "Latest"."""
+        return self.version_combo.currentData() or None
 
     def _show_details(self):
-        name = self.search_field.text().strip()
+        name = self._package_name()
         if not name:
             QMessageBox.warning(
                 self, "No package",
                 "Select or type a package name first.")
             return
+        cached = self.manager.cached_details(name)
+        if cached:
+            self._log(cached)
+            return
         self._run_worker("get_details", name, on_result=self._log)
 
+    def _selected_names(self):
+        return [i.text(0) for i in self.pkg_tree.selectedItems()]
+
     def _uninstall(self):
-        name = self.search_field.text().strip()
+        names = self._selected_names()
+        if len(names) > 1:
+            if not (self._confirm_uninstall(names)
+                    and self._confirm_conda_owned(*names)):
+                return
+            self._run_worker("uninstall_many", names,
+                             on_result=self._log,
+                             on_finished=self._refresh_inventory)
+            return
+        name = self._package_name()
         if not name:
             QMessageBox.warning(
                 self, "No package", "Select or type a package name.")
             return
+        if not self._confirm_uninstall([name]):
+            return
+        if not self._confirm_conda_owned(name):
+            return
+        self._run_worker("uninstall", name,
+                         on_result=self._log,
+                         on_finished=self._refresh_inventory)
+
+    def _batch(self, action):
+        """Upgrade or reinstall the selected rows with one pip call."""
+        names = self._selected_names()
+        if not names:
+            QMessageBox.warning(
+                self, "No package", "Select one or more packages.")
+            return
         if QMessageBox.question(
+                self, "Confirm {}".format(action.capitalize()),
+                "{} {} package(s)?\n\n{}".format(
+                    action.capitalize(), len(names), ", ".join(names)),
+                QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
+            return
+        if not self._confirm_conda_owned(*names):
+            return
+        self._run_worker("{}_many".format(action), names,
+                         on_result=self._log,
+                         on_finished=self._refresh_inventory)
+
+    def _show_required_by(self, item):
+        if item is None:
+            self.required_by_label.clear()
+            return
+        impact = self.manager.uninstall_impact(item.text(0))
+        direct = sorted((n for n, d in impact.items() if d == 1),
+                        key=str.lower)
+        if not direct:
+            self.required_by_label.setText(
+                "{} is not required by any installed package.".format(
+                    item.text(0)))
+            return
+        text = "Required by: {}".format(", ".join(direct[:8]))
+        if len(direct) > 8:
+            text += " and {} more".format(len(direct) - 8)
+        if len(impact) > len(direct):
+            text += " ({} affected in total)".format(len(impact))
+        self.required_by_label.setText(text)
+
+    def _confirm_uninstall(self, names):
+        """Ask once before uninstalling, listing what depends on ``names``."""
+        removing = {normalize(n) for n in names}
+        impact = {}
+        for name in names:
+            for dep, depth in self.manager.uninstall_impact(name).items():
+                if normalize(dep) not in removing:
+                    impact[dep] = min(depth, impact.get(dep, depth))
+        what = ("'{}'".format(names[0]) if len(names) == 1 else
+                "{} packages ({})".format(len(names), ", ".join(names)))
+        if not impact:
+            return QMessageBox.question(
                 self, "Confirm Uninstall",
-                "Uninstall '{}'?".format(name),
+                "Uninstall {}?".format(what),
+                QMsgBox_Yes | QMsgBox_No) == QMsgBox_Yes
+
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Confirm Uninstall")
+        dlg.resize(480, 360)
+        lay = QVBoxLayout(dlg)
+        label = QLabel(
+            "{} installed package(s) require {} directly or "
+            "indirectly and may stop working.\nExpand a row to see what "
+            "requires it in turn.".format(len(impact), what))
+        label.setWordWrap(True)
+        lay.addWidget(label)
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Required by", "Level"])
+
+        def add_level(parent, sources):
+            seen = set()
+            for source in sources:
+                for dep in self.manager.required_by(source):
+                    if normalize(dep) in removing or dep in seen:
+                        continue
+                    seen.add(dep)
+                    child = QTreeWidgetItem(
+                        parent, [dep, str(impact.get(dep, ""))])
+                    if self.manager.required_by(dep):
+                        child.setChildIndicatorPolicy(Item_ShowIndicator)
+
+        def expand(item):
+            if not item.childCount():
+                add_level(item, [item.text(0)])
+
+        add_level(tree, names)
+        tree.itemExpanded.connect(expand)
+        lay.addWidget(tree)
+
+        row = QHBoxLayout()
+        self._btn("Uninstall Anyway", row, dlg.accept)
+        self._btn("Cancel", row, dlg.reject)
+        lay.addLayout(row)
+        return bool(exec_dialog(dlg))
+
+    def _find_orphans(self):
+        self._run_worker("find_orphans", on_rows=self._show_orphans)
+
+    def _show_orphans(self, rows):
+        if not rows:
+            self._log("No orphaned dependencies found.")
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Orphaned dependencies")
+        dlg.resize(560, 420)
+        lay = QVBoxLayout(dlg)
+        lay.addWidget(QLabel(
+            "Nothing installed requires these packages; you did not "
+            "install them yourself\nand they did not ship with QGIS. "
+            "Round 2+ rows become orphans once earlier ones are gone."))
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Package", "Version", "Size (MB)", "Round"])
+        freed_by = {}
+        for r in rows:
+            item = _SortItem(tree, [
+                r["name"], r["version"], "{:.2f}".format(r["size"] / 1e6),
+                str(r["round"])])
+            item.setCheckState(0, Qt_Unchecked if r["doubtful"]
+                               else Qt_Checked)
+            if r["doubtful"]:
+                item.setToolTip(0, "Listed when the baseline was recorded "
+                                "after other installs - it may have "
+                                "shipped with QGIS")
+            if r["freed_by"]:
+                freed_by[r["name"]] = r["freed_by"]
+                item.setToolTip(3, "Orphaned once {} is removed".format(
+                    ", ".join(r["freed_by"])))
+        tree.setSortingEnabled(True)
+        lay.addWidget(tree)
+        total = QLabel()
+        lay.addWidget(total)
+
+        def checked():
+            return [tree.topLevelItem(i) for i in range(
+                tree.topLevelItemCount())
+                if tree.topLevelItem(i).checkState(0) == Qt_Checked]
+
+        def update_total(*_):
+            items = checked()
+            total.setText("{} selected, {:.1f} MB reclaimable".format(
+                len(items), sum(float(i.text(2)) for i in items)))
+
+        def toggle_all(state):
+            for i in range(tree.topLevelItemCount()):
+                tree.topLevelItem(i).setCheckState(0, state)
+
+        tree.itemChanged.connect(update_total)
+        update_total()
+
+        row = QHBoxLayout()
+        self._btn("Select All", row, lambda: toggle_all(Qt_Checked))
+        self._btn("Select None", row, lambda: toggle_all(Qt_Unchecked))
+        self._btn("Remove Selected", row, dlg.accept)
+        self._btn("Close", row, dlg.reject)
+        lay.addLayout(row)
+        if not exec_dialog(dlg):
+            return
+        names = [i.text(0) for i in checked()]
+        if not names:
+            return
+        still_needed = ["{} (required by {})".format(n, ", ".join(
+            u for u in freed_by[n] if u not in names))
+            for n in names
+            if any(u not in names for u in freed_by.get(n, ()))]
+        if still_needed and QMessageBox.question(
+                self, "Still Required",
+                "These are only orphans once packages you unchecked are "
+                "removed:\n\n{}\n\nRemove them anyway?".format(
+                    "\n".join(still_needed)),
                 QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
             return
-        self._run_worker("uninstall", name,
+        self._run_worker("uninstall_many", names,
+                         on_result=self._log,
+                         on_finished=self._refresh_inventory)
+
+    def _scan_plugins(self):
+        self._run_worker("scan_plugins", on_rows=self._show_plugin_needs)
+
+    def _show_plugin_needs(self, rows):
+        if not rows:
+            self._log("Every Python package your plugins need is "
+                      "installed.")
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Missing plugin dependencies")
+        dlg.resize(640, 420)
+        lay = QVBoxLayout(dlg)
+        lay.addWidget(QLabel(
+            "Packages QGIS plugins declare or import that are not "
+            "installed.\nOptional imports (inside try blocks) and names "
+            "the package index does not know are left unchecked."))
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Package", "Plugin", "Found in", "Note"])
+        for r in rows:
+            if r["source"] == "metadata":
+                why = "metadata"
+            else:
+                why = "import {}".format(r["module"])
+            notes = []
+            if r["installed"]:
+                notes.append("installed {}".format(r["installed"]))
+            if r["optional"]:
+                notes.append("optional")
+            if r.get("on_index") is False:
+                notes.append("not on the index - check the name")
+            item = QTreeWidgetItem(tree, [
+                r["requirement"], r["plugin"], why, ", ".join(notes)])
+            item.setCheckState(0, Qt_Unchecked if r["optional"] or r.get(
+                "on_index") is False else Qt_Checked)
+        tree.setSortingEnabled(True)
+        lay.addWidget(tree)
+
+        row = QHBoxLayout()
+        self._btn("Install Checked", row, dlg.accept)
+        self._btn("Close", row, dlg.reject)
+        lay.addLayout(row)
+        if not exec_dialog(dlg):
+            return
+        specs = list(dict.fromkeys(
+            tree.topLevelItem(i).text(0)
+            for i in range(tree.topLevelItemCount())
+            if tree.topLevelItem(i).checkState(0) == Qt_Checked))
+        if not specs:
+            return
+        self._log("Installing {} package(s) for plugins: {}".format(
+            len(specs), ", ".join(specs)))
+        self._run_worker("install_list", specs,
                          on_result=self._log,
-                         on_finished=self._populate_packages)
+                         on_finished=self._refresh_inventory)
+
+    def _apply_audit(self, on_done=None):
+        """
+        Match the package list against the advisory index (offline) in a
+        worker - loading the index takes a while - and repaint.
+        """
+        packages = self.installed_packages
+        if not self.manager.advisories.available():
+            self._vulnerable = {}
+            return
+
+        def done(found):
+            if packages is not self.installed_packages:
+                return  # a newer list is being audited
+            self._vulnerable = found
+            self._filter_list(self.filter_field.text())
+            if on_done:
+                on_done()
+
+        self._run_worker("audit", list(packages), on_advisories=done,
+                         background=True)
+
+    def _audit(self):
+        if not self.manager.advisories.available():
+            QMessageBox.information(
+                self, "No advisory database",
+                "Import an OSV or PyPA advisory dump in the Settings tab "
+                "first (no internet needed afterwards).")
+            return
+        self._apply_audit(self._report_audit)
+
+    def _report_audit(self):
+        if not self._vulnerable:
+            self._log("Audit: no known vulnerabilities in {} "
+                      "package(s).".format(len(self.installed_packages)))
+            return
+        versions = {normalize(p["name"]): p["version"]
+                    for p in self.installed_packages}
+        self._log("Audit: {} vulnerable package(s):".format(
+            len(self._vulnerable)))
+        for name, hits in sorted(self._vulnerable.items()):
+            for a in hits:
+                self._log("  {} {}  {}  fixed in: {}  {}".format(
+                    name, versions.get(name, "?"), a["id"],
+                    ", ".join(a.get("fixed", [])) or "-",
+                    a.get("summary", "")))
+        QMessageBox.warning(
+            self, "Audit",
+            "{} installed package(s) have known vulnerabilities; they are "
+            "shown in red. See the log for details.".format(
+                len(self._vulnerable)))
 
     def _check_outdated(self):
         self._run_worker("get_outdated",
@@ -494,25 +1338,82 @@ class PipManagerDialog(QDialog):
                 p["name"], p["version"],
                 p.get("latest_version", "?")))
 
+    def _undo_last(self):
+        if QMessageBox.question(
+                self, "Confirm Undo",
+                "Put back the packages as they were before the last "
+                "install / uninstall?",
+                QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
+            return
+        self._run_worker("undo", on_result=self._log,
+                         on_finished=self._refresh_inventory)
+
+    def _profile_imports(self):
+        items = self.pkg_tree.selectedItems()
+        names = [i.text(0) for i in items] or None
+        if names is None and QMessageBox.question(
+                self, "Profile all packages",
+                "No package selected. Profile the import time of every "
+                "installed package?\nThis imports each one in a separate "
+                "Python process.",
+                QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
+            return
+        self._run_worker("profile_imports", names,
+                         on_rows=self._show_import_profile)
+
+    def _show_import_profile(self, rows):
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Import times")
+        dlg.resize(640, 420)
+        lay = QVBoxLayout(dlg)
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Package", "Module", "Self (ms)",
+                              "Cumulative (ms)", "Modules loaded"])
+        for r in rows:
+            if "error" in r:
+                _SortItem(tree, [r["package"], r["module"],
+                                 "", "", r["error"]])
+                continue
+            _SortItem(tree, [
+                r["package"], r["module"],
+                "{:.1f}".format(r["self_us"] / 1000.0),
+                "{:.1f}".format(r["cumulative_us"] / 1000.0),
+                str(r["modules"])])
+        tree.setSortingEnabled(True)
+        tree.sortItems(3, Qt_Descending)
+        lay.addWidget(tree)
+        self._btn("Close", lay, dlg.accept)
+        dlg.show()
+
     def _check_conflicts(self):
         self._run_worker("check_conflicts", on_result=self._log)
 
     # -- Install tab -----------------------------------------------------------
 
     def _debounce_search(self, text):
+        self._names_timer.start(150)
         if len(text.strip()) >= 2:
             self._search_timer.start(450)
 
+    def _complete_names(self):
+        self._name_model.setStringList(
+            self.manager.search_names(self.search_field.text()))
+
     def _trigger_pypi_search(self):
-        query = self.search_field.text().strip()
+        query = self._package_name()
         if query:
             self._run_worker("pypi_search", query,
                              on_pypi_info=self._show_pypi_info)
 
     def _show_pypi_info(self, info):
         if "error" in info:
-            self.pypi_preview.setPlainText(
-                "Not found on PyPI: {}".format(info["error"]))
+            text = (info["error"] if info.get("offline") else
+                    "Not found on PyPI: {}".format(info["error"]))
+            similar = self.manager.search_names(
+                self.search_field.text(), limit=5)
+            if similar:
+                text += "\nDid you mean: {}".format(", ".join(similar))
+            self.pypi_preview.setPlainText(text)
             return
         self.pypi_preview.setPlainText(
             "{}  {}\n{}\nAuthor: {}   Requires Python: {}".format(
@@ -524,28 +1425,42 @@ class PipManagerDialog(QDialog):
                          on_versions=self._update_versions)
 
     def _install(self):
-        name = self.search_field.text().strip()
+        name = self._package_name()
         if not name:
             QMessageBox.warning(self, "No package",
                                 "Enter a package name.")
             return
-        ver_text = self.version_combo.currentText()
-        ver = (None if ver_text in ("Latest", "Fetching versions...", "")
-               else ver_text)
+        ver = self._selected_version()
 
         if self.conda_chk.isVisible() and self.conda_chk.isChecked():
             self._run_worker("conda_install", name,
                              on_result=self._post_install,
-                             on_finished=self._populate_packages)
+                             on_finished=self._refresh_inventory)
+            return
+        if not self._confirm_conda_owned(name):
             return
 
         self._run_worker("install", name, ver,
                          on_result=self._post_install,
-                         on_finished=self._populate_packages)
+                         on_finished=self._refresh_inventory)
+
+    def _confirm_conda_owned(self, *names):
+        """Ask before pip touches packages conda manages."""
+        if not self.manager.is_conda:
+            return True
+        owned = [n for n in names if self.manager.conda_owned(n)]
+        if not owned:
+            return True
+        return QMessageBox.question(
+            self, "conda-managed package",
+            "'{}' is managed by conda. Changing it with pip can break "
+            "conda's GDAL/PROJ stack.\n\nContinue with pip anyway?".format(
+                "', '".join(owned)),
+            QMsgBox_Yes | QMsgBox_No) == QMsgBox_Yes
 
     def _post_install(self, msg):
         self._log(msg)
-        name = self.search_field.text().strip()
+        name = self._package_name()
         ok, im_msg = QGISPipManager.try_import(name)
         self._log(im_msg)
         if not ok:
@@ -555,14 +1470,12 @@ class PipManagerDialog(QDialog):
                     msg, im_msg))
 
     def _dry_run(self):
-        name = self.search_field.text().strip()
+        name = self._package_name()
         if not name:
             QMessageBox.warning(self, "No package",
                                 "Enter a package name.")
             return
-        ver_text = self.version_combo.currentText()
-        ver = (None if ver_text in ("Latest", "Fetching versions...", "")
-               else ver_text)
+        ver = self._selected_version()
         self._run_worker("dry_run", name, ver, on_result=self._log)
 
     def _import_requirements(self):
@@ -572,7 +1485,7 @@ class PipManagerDialog(QDialog):
             return
         self._run_worker("import_req", path,
                          on_result=self._log,
-                         on_finished=self._populate_packages)
+                         on_finished=self._refresh_inventory)
 
     def _export_requirements(self):
         path, _ = QFileDialog.getSaveFileName(
@@ -580,18 +1493,38 @@ class PipManagerDialog(QDialog):
             "Text files (*.txt)")
         if not path:
             return
-        self._run_worker("export_req", path, on_result=self._log)
+        self._run_worker("export_req", path, self.lock_chk.isChecked(),
+                         on_result=self._log)
 
     # -- Snapshots tab ---------------------------------------------------------
 
     def _refresh_snapshot_list(self):
+        if not self._tab_built("Snapshots"):
+            return  # filled when the tab is first shown
         self.snapshot_list.clear()
-        for p in self.manager.list_snapshots():
-            QTreeWidgetItem(self.snapshot_list, [p])
+        paths = self.manager.list_snapshots()
+        items = {p: QTreeWidgetItem(self.snapshot_list, [p, ""])
+                 for p in paths}
+        if not paths or not self.manager.advisories.available():
+            return
+
+        def show(rows):
+            for row in rows:
+                item, found = items[row["path"]], row["found"]
+                try:
+                    item.setText(1, str(len(found)) if found else "none")
+                except RuntimeError:
+                    return  # the list was refreshed meanwhile
+                if found:
+                    item.setForeground(1, QColor(VULNERABLE_COLOR))
+                    item.setToolTip(1, ", ".join(found))
+
+        self._run_worker("audit_snapshots", paths, on_rows=show,
+                         background=True)
 
     def _save_snapshot(self):
         self._run_worker(
-            "save_snapshot", "",
+            "save_snapshot", "", self.snapshot_lock_chk.isChecked(),
             on_result=lambda m: (self._log(m),
                                  self._refresh_snapshot_list()))
 
@@ -609,7 +1542,7 @@ class PipManagerDialog(QDialog):
             return
         self._run_worker("restore_snapshot", path,
                          on_result=self._log,
-                         on_finished=self._populate_packages)
+                         on_finished=self._refresh_inventory)
 
     def _delete_snapshot(self):
         items = self.snapshot_list.selectedItems()
@@ -619,6 +1552,45 @@ class PipManagerDialog(QDialog):
         self._log(msg)
         self._refresh_snapshot_list()
 
+    # -- Cache tab -------------------------------------------------------------
+
+    def _scan_cache(self):
+        self._run_worker("scan_cache", on_cache_info=self._show_cache_info,
+                         background=True)
+
+    def _show_cache_info(self, info):
+        kinds = ", ".join(
+            "{} {:.1f} MB in {} entries".format(kind, k["size"] / 1e6,
+                                                k["count"])
+            for kind, k in sorted(info["kinds"].items()))
+        self.cache_label.setText(
+            "pip cache: {}\nTotal {:.1f} MB ({}); budget: {}".format(
+                info["dir"] or "disabled", info["size"] / 1e6,
+                kinds or "empty",
+                "{} MB".format(info["budget"] // 1000000)
+                if info["budget"] else "none"))
+        self.cache_tree.clear()
+        for wheel in info["wheels"]:
+            item = _SortItem(self.cache_tree, [
+                wheel["name"], wheel["version"],
+                "{:.1f}".format(wheel["size"] / 1e6),
+                datetime.fromtimestamp(wheel["used"]).strftime("%Y-%m-%d"),
+                wheel["kind"] + (" (kept)" if wheel["kept"] else "")])
+            if wheel["kept"]:
+                item.setToolTip(4, "Pinned by a snapshot - never pruned")
+        self.cache_tree.sortItems(2, Qt_Descending)
+
+    def _set_cache_budget(self, value):
+        self.manager.pip_cache_budget_mb = value
+        self._ss("pip_cache_budget_mb", value)
+
+    def _prune_cache(self):
+        if not self.manager.pip_cache_budget_mb:
+            self._log("Set a size budget for pip's cache first.")
+            return
+        self._run_worker("prune_cache", on_result=self._log,
+                         on_finished=self._scan_cache)
+
     # -- Presets tab -----------------------------------------------------------
 
     def _load_presets(self):
@@ -636,7 +1608,36 @@ class PipManagerDialog(QDialog):
             QTreeWidgetItem(self.preset_tree, [
                 p.get("name", ""),
                 ", ".join(p.get("packages", [])),
+                "resolving...", "",
             ])
+        if self._presets:
+            self._run_worker("resolve_presets", self._presets,
+                             on_plan=self._show_plan,
+                             on_error=lambda m: self._log(
+                                 "Preset pre-resolution failed: " + m),
+                             background=True)
+
+    def _show_plan(self, plan):
+        for idx, preset in enumerate(self._presets):
+            if preset.get("packages", []) != plan.get("packages"):
+                continue
+            item = self.preset_tree.topLevelItem(idx)
+            if "error" in plan:
+                item.setText(2, "-")
+                item.setText(3, "not resolved")
+                item.setToolTip(3, plan["error"])
+                continue
+            items = plan.get("items", [])
+            sizes = [i["size"] for i in items if i.get("size")]
+            item.setText(2, "{:.1f} MB".format(sum(sizes) / 1e6)
+                         if sizes else "0 MB")
+            changes = ["{} {} -> {}".format(
+                i["name"], i["installed"], i["version"]) if i["installed"]
+                else "+ {} {}".format(i["name"], i["version"])
+                for i in items]
+            item.setText(3, "{} change(s)".format(len(changes))
+                         if changes else "up to date")
+            item.setToolTip(3, "\n".join(changes))
 
     def _install_preset(self):
         items = self.preset_tree.selectedItems()
@@ -653,35 +1654,135 @@ class PipManagerDialog(QDialog):
                     preset["name"], "\n".join(pkgs)),
                 QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
             return
-        tmp = tempfile.NamedTemporaryFile(
-            mode="w", suffix=".txt", delete=False, encoding="utf-8")
-        tmp.write("\n".join(pkgs))
-        tmp.close()
-        self._run_worker("import_req", tmp.name,
+        self._run_worker("install_preset", pkgs,
                          on_result=self._log,
-                         on_finished=self._populate_packages)
+                         on_finished=self._refresh_inventory)
 
     # -- Settings tab ----------------------------------------------------------
 
+    def _update_advisory_label(self):
+        if not self.manager.advisories.available():
+            self.advisory_label.setText("none imported")
+            return
+        self.advisory_label.setText("loading...")
+        self._run_worker("advisory_info",
+                         on_advisories=self._show_advisory_info,
+                         background=True)
+
+    def _show_advisory_info(self, info):
+        if not info:
+            self.advisory_label.setText("none imported")
+            return
+        self.advisory_label.setText(
+            "{} advisories, {} projects ({}, {})".format(
+                info["advisories"], info["projects"], info["source"],
+                datetime.fromtimestamp(info["imported"]).strftime(
+                    "%Y-%m-%d")))
+
+    def _probe_mirrors(self, background=False):
+        if self._tab_built("Settings"):
+            self.mirror_label.setText("probing...")
+        self._run_worker("probe_mirrors", on_rows=self._show_mirrors,
+                         background=background)
+
+    @staticmethod
+    def _mirror_text(rows):
+        lines = []
+        for r in rows:
+            if r.get("ok"):
+                state = "{:.0f} ms".format(r.get("latency") or 0)
+            elif "checked" not in r:
+                state = "not checked (offline)"
+            else:
+                state = "down ({})".format(r.get("error") or "?")
+            lines.append("{}  {}".format(r["url"], state))
+        return "\n".join(lines)
+
+    def _show_mirrors(self, rows):
+        self._mirror_rows = rows
+        if self._tab_built("Settings"):
+            self.mirror_label.setText(self._mirror_text(rows))
+        if rows and len(rows) > 1:
+            self._log("Using index {}".format(rows[0]["url"]))
+
+    def _load_baseline(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Reference manifest (pip freeze of a clean QGIS)", "",
+            "Requirements (*.txt);;All files (*)")
+        if not path:
+            return
+        ok, msg = self.manager.load_baseline(path)
+        self._log(msg)
+        if ok:
+            self._log("{} core package(s) are protected.".format(
+                len(self.manager.protected_core())))
+
+    def _import_advisories(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import advisory database", "",
+            "OSV dumps (*.zip *.json);;All files (*)")
+        if not path:
+            return
+
+        def done(msg):
+            self._log(msg)
+            self._update_advisory_label()
+            self._apply_audit()
+            self._filter_list(self.filter_field.text())
+            self._refresh_snapshot_list()
+
+        self._run_worker("import_advisories", path, on_result=done)
+
     def _browse_snapshots_dir(self):
         d = QFileDialog.getExistingDirectory(
             self, "Select snapshots folder")
         if d:
             self.snapshots_dir_field.setText(d)
 
+    def _env_summary(self):
+        pip_v = ".".join(str(x) for x in self.manager.pip_ver)
+        env = ("conda env detected" if self.manager.is_conda
+               else "pip / OSGeo4W env")
+        backend = self.manager.backend()
+        return "pip version: {}   |   {}   |   installer: {}".format(
+            pip_v, env, backend.version() or backend.name)
+
     def _save_settings(self):
         self._proxy = self.proxy_field.text().strip()
         self._index_url = self.index_url_field.text().strip()
+        self._mirrors = self.mirrors_field.text().strip()
         self._extra_index = self.extra_index_field.text().strip()
         snaps = self.snapshots_dir_field.text().strip()
 
         self._ss("proxy", self._proxy)
         self._ss("index_url", self._index_url)
+        self._ss("mirrors", self._mirrors)
         self._ss("extra_index_url", self._extra_index)
         self._ss("snapshots_dir", snaps)
+        self._ss("stash_days", self.stash_days_spin.value())
+        self._ss("auto_rollback", self.auto_rollback_chk.isChecked())
+        self.manager.stash_max_age_days = self.stash_days_spin.value()
+        self.manager.auto_rollback = self.auto_rollback_chk.isChecked()
+        self._ss("parallel_downloads", self.downloads_spin.value())
+        self._ss("protect_core", self.protect_core_chk.isChecked())
+        self.manager.protect_core = self.protect_core_chk.isChecked()
+        self.manager.parallel_downloads = self.downloads_spin.value()
+        self.manager.idle_timeout = self.idle_timeout_spin.value() * 60
+        self.manager.total_timeout = self.total_timeout_spin.value() * 60
+        self._ss("idle_timeout", self.manager.idle_timeout)
+        self._ss("total_timeout", self.manager.total_timeout)
+        self.manager.installer = self.installer_combo.currentData()
+        self.manager.installer_path = self.installer_path_field.text().strip()
+        self._ss("installer", self.manager.installer)
+        self._ss("installer_path", self.manager.installer_path)
+        if (self.manager.installer == backends.UV
+                and self.manager.backend().name != backends.UV):
+            self._log("uv was not found or does not run - using pip.")
+        self.env_label.setText(self._env_summary())
 
         self.manager.proxy = self._proxy
         self.manager.index_url = self._index_url
+        self.manager.mirrors = self._mirrors
         self.manager.extra_index_url = self._extra_index
         if snaps:
             self.manager.snapshots_dir = Path(snaps)
@@ -706,7 +1807,19 @@ class PipManagerDialog(QDialog):
             QMessageBox.critical(self, "Error", str(exc))
 
     def closeEvent(self, event):
+        if self.manager.supervisor.busy() and QMessageBox.question(
+                self, "Operation Running",
+                "pip is still running. Stop it (changes are rolled back) "
+                "and close?",
+                QMsgBox_Yes | QMsgBox_No) != QMsgBox_Yes:
+            event.ignore()
+            return
+        self._net_timer.stop()
+        self._prefetcher.stop()
+        # stop pip process trees rather than leave them orphaned
+        self.manager.cancel_queued()
+        self.manager.cancel_running()
         for t in self._active_threads:
             t.quit()
-            t.wait(2000)
+            t.wait(10000)
         super().closeEvent(event)
@@ -8,11 +8,12 @@ import subprocess
 import sys
 import sysconfig
 import tempfile
+import threading
 from pathlib import Path
 
 from qgis.core import QgsSettings
-from .compat import QAction, QIcon, QMessageBox, QInputDialog
-from .my_pip_manager_dialog import PipManagerDialog
+from .compat import QAction, QIcon, QMessageBox, QInputDialog, QTimer
+from .my_pip_manager_dialog import PipManagerDialog, create_manager
 
 if platform.system() == "Windows":
     SUBPROCESS_FLAGS = 0x08000000
@@ -26,6 +27,7 @@ class MyPipManagerPlugin:
         self.iface = iface
         self.dlg = None
         self.action = None
+        self.manager = None
         self.settings = QgsSettings()
         self.python_path = self._detect_python()
 
@@ -39,6 +41,19 @@ class MyPipManagerPlugin:
         self.action.triggered.connect(self.run)
         self.iface.addPluginToMenu("Pip Manager", self.action)
         self.iface.addToolBarIcon(self.action)
+        # a zero timer fires once the event loop idles, i.e. after start-up
+        QTimer.singleShot(0, self._warm_up)
+
+    def _warm_up(self):
+        """Create the manager and warm its caches off the GUI thread."""
+        if self.manager or not self.python_path:
+            return
+        try:
+            self.manager = create_manager(self.python_path, self.settings)
+        except (ValueError, OSError):
+            return
+        threading.Thread(target=self.manager.warm, daemon=True,
+                         name="pip-manager-warm-up").start()
 
     def unload(self):
         if self.action:
@@ -46,6 +61,10 @@ class MyPipManagerPlugin:
             self.iface.removeToolBarIcon(self.action)
         if self.dlg:
             self.dlg.close()
+        if self.manager:
+            # no pip process may outlive the plugin (e.g. the warm-up)
+            self.manager.cancel_queued()
+            self.manager.cancel_running()
 
     # -- Run -------------------------------------------------------------------
 
@@ -64,12 +83,17 @@ class MyPipManagerPlugin:
             self.dlg.activateWindow()
             return
 
+        if self.manager and (Path(self.manager.qgis_python_path)
+                             != Path(self.python_path)):
+            self.manager = None
         try:
             self.dlg = PipManagerDialog(
                 parent=self.iface.mainWindow(),
                 qgis_python_path=self.python_path,
                 settings=self.settings,
+                manager=self.manager,
             )
+            self.manager = self.dlg.manager
             self.dlg.show()
         except PermissionError as exc:
             QMessageBox.critical(
@@ -0,0 +1,204 @@
+"""
+name_index.py - Local searchable index of project names for PyPI search.
+Names come from an index's simple listing (PEP 691 JSON or PEP 503 HTML),
+are stored as one gzip file per index and refreshed with conditional
+requests. Prefix lookups use a sorted key array, typo-tolerant lookups
+a trigram index that ``prepare`` builds - seconds for all of PyPI, so a
+worker thread does it after loading or refreshing.
+"""
+import bisect
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from array import array
+from pathlib import Path
+
+SIMPLE_JSON = "application/vnd.pypi.simple.v1+json"
+_HTML_NAME = re.compile(r"<a[^>]*>([^<]+)</a>", re.IGNORECASE)
+_POSTING_CAP = 20000  # trigrams shared by more names carry no signal
+_MIN_SIMILARITY = 0.25
+
+
+def normalize(name):
+    """PEP 503 normalized project name."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _trigrams(key):
+    padded = "^" + key + "$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _parse_listing(content_type, body):
+    text = body.decode("utf-8", "replace")
+    if SIMPLE_JSON in (content_type or ""):
+        return [p["name"] for p in json.loads(text).get("projects", [])]
+    return [m.strip().rstrip("/") for m in _HTML_NAME.findall(text)]
+
+
+class NameIndex:
+    """
+    Union of the project names of one or more package indexes.
+    ``search`` is safe to call from the GUI thread while ``refresh``
+    runs in a worker: new data is built aside and swapped in.
+    """
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self._sources = {}   # url -> {"header": {...}, "names": [...]}
+        self._names = []     # display names, sorted by key
+        self._keys = []      # normalized names, sorted
+        self._grams = None   # trigram -> array of positions in _keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    # -- storage ---------------------------------------------------------------
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return self.folder / "names_{}.txt.gz".format(digest)
+
+    def load(self):
+        """Read every stored source once; later calls are no-ops."""
+        if self._sources:
+            return
+        for f in sorted(self.folder.glob("names_*.txt.gz")):
+            try:
+                with gzip.open(str(f), "rt", encoding="utf-8") as fh:
+                    header = json.loads(fh.readline())
+                    names = fh.read().splitlines()
+            except (OSError, ValueError):
+                continue
+            self._sources[header.get("url", str(f))] = {
+                "header": header, "names": names}
+        self._rebuild()
+
+    def _save(self, url, header, names):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(url).with_suffix(".tmp")
+        with gzip.open(str(tmp), "wt", encoding="utf-8") as fh:
+            fh.write(json.dumps(header) + "\n")
+            fh.write("\n".join(names))
+        tmp.replace(self._path(url))
+
+    # -- refresh ---------------------------------------------------------------
+
+    def refresh(self, index_url, fetch, max_age=86400):
+        """
+        Bring one index up to date. ``fetch`` has the signature of
+        ``qpip._fetch_url``. A fresh source is skipped, an unchanged one
+        costs a single 304 round trip. Returns True if names changed.
+        """
+        url = index_url.rstrip("/") + "/"
+        source = self._sources.get(url)
+        header = dict(source["header"]) if source else {"url": url}
+        if source and time.time() - header.get("checked", 0) < max_age:
+            return False
+
+        req = {"Accept": "{}, text/html;q=0.1".format(SIMPLE_JSON)}
+        if header.get("etag"):
+            req["If-None-Match"] = header["etag"]
+        if header.get("last_modified"):
+            req["If-Modified-Since"] = header["last_modified"]
+        status, resp_headers, body = fetch(url, headers=req, timeout=60)
+
+        header["checked"] = time.time()
+        if status == 304 and source:
+            self._save(url, header, source["names"])
+            source["header"] = header
+            return False
+        if status != 200:
+            raise RuntimeError("HTTP {} for {}".format(status, url))
+
+        names = sorted(set(_parse_listing(
+            resp_headers.get("content-type"), body)), key=normalize)
+        header["etag"] = resp_headers.get("etag", "")
+        header["last_modified"] = resp_headers.get("last-modified", "")
+        self._save(url, header, names)
+        self._sources[url] = {"header": header, "names": names}
+        self._rebuild()
+        return True
+
+    def _rebuild(self):
+        merged = {}
+        for source in self._sources.values():
+            for name in source["names"]:
+                merged.setdefault(normalize(name), name)
+        keys = sorted(merged)
+        with self._lock:
+            self._keys = keys
+            self._names = [merged[k] for k in keys]
+            self._grams = None
+
+    def prepare(self):
+        """Build the trigram index for typo-tolerant search (slow)."""
+        with self._lock:
+            if self._grams is not None:
+                return self._grams
+            keys = self._keys
+        grams = {}
+        for pos, key in enumerate(keys):
+            for g in _trigrams(key):
+                posting = grams.get(g)
+                if posting is None:
+                    posting = grams[g] = array("I")
+                posting.append(pos)
+        with self._lock:
+            if self._keys is keys:
+                self._grams = grams
+        return grams
+
+    # -- search ----------------------------------------------------------------
+
+    def search(self, query, limit=20):
+        """
+        Exact and prefix matches first, then trigram (typo tolerant)
+        matches ranked by similarity once ``prepare`` has run. Returns
+        display names.
+        """
+        key = normalize(query.strip())
+        if not key:
+            return []
+        keys, names = self._keys, self._names
+        if not keys:
+            return []
+
+        found = []
+        lo = bisect.bisect_left(keys, key)
+        hi = lo
+        while hi < len(keys) and keys[hi].startswith(key):
+            hi += 1
+            if hi - lo >= limit:
+                break
+        found.extend(range(lo, hi))
+        if len(found) >= limit or len(key) < 3:
+            return [names[i] for i in found]
+
+        seen = set(found)
+        grams = self._grams  # never built here: search runs on the GUI
+        if grams is None or self._keys is not keys:
+            return [names[i] for i in found]
+        qgrams = _trigrams(key)
+        counts = {}
+        postings = [grams[g] for g in qgrams if g in grams]
+        useful = [p for p in postings if len(p) <= _POSTING_CAP] or postings
+        for posting in useful:
+            for pos in posting:
+                counts[pos] = counts.get(pos, 0) + 1
+
+        floor = max(1, len(useful) // 3)
+        scored = []
+        for pos, common in counts.items():
+            if common < floor or pos in seen:
+                continue
+            score = common / float(len(qgrams) + len(keys[pos]) - common)
+            if score >= _MIN_SIMILARITY:
+                scored.append((score, pos))
+        scored.sort(key=lambda t: (-t[0], len(keys[t[1]])))
+        found.extend(pos for _, pos in scored[:limit - len(found)])
+        return [names[i] for i in found]
@@ -0,0 +1,108 @@
+"""
+netstate.py - Shared connectivity state with a circuit breaker.
+After a few consecutive network failures the breaker opens: network
+calls raise ``Offline`` at once instead of waiting for timeouts, and
+callers fall back to cached data. A background thread probes every
+``cooldown`` seconds (half-open) and closes the breaker on success.
+Failures of direct connections do not count while pip goes through a
+proxy.
+"""
+import threading
+import time
+
+ONLINE = "online"
+OFFLINE = "offline"
+PROBING = "probing"
+
+
+class Offline(RuntimeError):
+    """Raised instead of touching the network while the breaker is open."""
+
+
+def is_network_error(exc):
+    """Connection-level failures (not HTTP error statuses)."""
+    from http.client import HTTPException
+    return isinstance(exc, (OSError, HTTPException)) and not isinstance(
+        exc, (FileNotFoundError, PermissionError))
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold=3, cooldown=20.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.probe = None           # callable; raises when still offline
+        self.proxied = None         # callable; True while pip uses a proxy
+        self._state = ONLINE
+        self._failures = 0
+        self._opened_at = 0.0
+        self._prober = None         # ident of the probe thread
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def is_open(self):
+        return self._state != ONLINE
+
+    def retry_in(self):
+        """Seconds until the next recovery probe (0 when online)."""
+        if self._state == ONLINE:
+            return 0
+        return max(0, int(self._opened_at + self.cooldown - time.time()))
+
+    def allow(self):
+        """Raise Offline unless a network call may go ahead."""
+        if self._state == ONLINE or threading.get_ident() == self._prober:
+            return
+        raise Offline("Offline - network calls paused, next check in "
+                      "{} s.".format(self.retry_in()))
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._state = ONLINE
+
+    def failure(self, direct=False):
+        """
+        Count a network failure. ``direct`` failures bypassed the proxy
+        pip is using, so they say nothing about pip's route and are
+        ignored while ``proxied`` is true.
+        """
+        if direct and self.proxied is not None and self.proxied():
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == ONLINE and self._failures < self.threshold:
+                return
+            self._state = OFFLINE
+            self._opened_at = time.time()
+            if self._prober is None and self.probe is not None:
+                thread = threading.Thread(
+                    target=self._probe_loop, daemon=True,
+                    name="pip-manager-netprobe")
+                thread.start()
+                self._prober = thread.ident
+
+    def reset(self):
+        """Close the breaker by hand (e.g. the user asked to retry)."""
+        self.success()
+
+    def _probe_loop(self):
+        while self._state != ONLINE:
+            time.sleep(max(0.0, self._opened_at + self.cooldown
+                           - time.time()))
+            if self._state == ONLINE:
+                break
+            self._state = PROBING
+            try:
+                self.probe()
+            except Exception:
+                with self._lock:
+                    self._state = OFFLINE
+                    self._opened_at = time.time()
+                continue
+            self.success()
+        with self._lock:
+            self._prober = None
@@ -0,0 +1,127 @@
+"""
+pep440.py - Minimal PEP 440 version ordering and specifier matching,
+plus wheel tag parsing, so the plugin never depends on `packaging`.
+"""
+import re
+
+_INF = float("inf")
+_NEG = float("-inf")
+
+_VERSION = re.compile(r"""
+    ^\s*v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)
+        [-_.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))
+        |(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_.]?dev[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+""", re.VERBOSE | re.IGNORECASE)
+
+_PRE_RANK = {"a": 0, "alpha": 0, "b": 1, "beta": 1,
+             "c": 2, "rc": 2, "pre": 2, "preview": 2}
+_SPEC = re.compile(r"^\s*(===|==|!=|~=|<=|>=|<|>)\s*(\S+)\s*$")
+
+
+def version_key(version):
+    """
+    Sort key implementing PEP 440 ordering. Unparseable (legacy)
+    versions sort below every valid one.
+    """
+    m = _VERSION.match(version)
+    if not m:
+        return (-1, (), (_NEG,), (_NEG,), (_NEG,), ())
+    release = [int(x) for x in m.group("release").split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    if m.group("pre"):
+        pre = (_PRE_RANK[m.group("pre_l").lower()],
+               int(m.group("pre_n") or 0))
+    elif m.group("dev") and not m.group("post"):
+        pre = (_NEG,)  # 1.0.dev1 sorts before 1.0a1
+    else:
+        pre = (_INF,)
+
+    if m.group("post"):
+        post = (int(m.group("post_n1") or m.group("post_n2") or 0),)
+    else:
+        post = (_NEG,)
+    dev = (int(m.group("dev_n") or 0),) if m.group("dev") else (_INF,)
+
+    local = ()
+    if m.group("local"):
+        local = tuple((1, int(p), "") if p.isdigit() else (0, 0, p.lower())
+                      for p in re.split(r"[-_.]", m.group("local")))
+    return (int(m.group("epoch") or 0), tuple(release), pre, post, dev,
+            local)
+
+
+def is_prerelease(version):
+    m = _VERSION.match(version)
+    return bool(m and (m.group("pre") or m.group("dev")))
+
+
+def _release(version):
+    m = _VERSION.match(version)
+    return [int(x) for x in m.group("release").split(".")] if m else []
+
+
+def _prefix_match(version, prefix):
+    want = _release(prefix)
+    have = _release(version)
+    have += [0] * (len(want) - len(have))
+    return have[:len(want)] == want
+
+
+def _matches(op, target, version):
+    if op == "===":
+        return version == target
+    if target.endswith(".*"):
+        hit = _prefix_match(version, target[:-2])
+        return hit if op == "==" else (not hit if op == "!=" else True)
+    key, tkey = version_key(version), version_key(target)
+    if op == "==":
+        return key == tkey
+    if op == "!=":
+        return key != tkey
+    if op == "<=":
+        return key <= tkey
+    if op == ">=":
+        return key >= tkey
+    if op == "<":
+        return key < tkey
+    if op == ">":
+        return key > tkey
+    if op == "~=":
+        parts = target.split(".")
+        return key >= tkey and _prefix_match(version, ".".join(parts[:-1]))
+    return True
+
+
+def specifier_contains(specifiers, version):
+    """
+    True if ``version`` satisfies a comma separated specifier set such
+    as a Requires-Python value. Malformed clauses are ignored.
+    """
+    for clause in (specifiers or "").split(","):
+        if not clause.strip():
+            continue
+        m = _SPEC.match(clause)
+        if m and not _matches(m.group(1), m.group(2), version):
+            return False
+    return True
+
+
+def wheel_tags(filename):
+    """Set of "interpreter-abi-platform" tags a wheel file supports."""
+    parts = filename[:-len(".whl")].split("-")
+    if len(parts) < 5:
+        return set()
+    pys, abis, plats = parts[-3], parts[-2], parts[-1]
+    return {"{}-{}-{}".format(py, abi, plat)
+            for py in pys.split(".")
+            for abi in abis.split(".")
+            for plat in plats.split(".")}
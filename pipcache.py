@@ -0,0 +1,243 @@
+"""
+pipcache.py - Size accounting and LRU pruning of pip's cache.
+pip keeps downloads in an HTTP cache (``http-v2``, before pip 23.3
+``http``) under hashed file names - one file, or a header file plus a
+``.body`` - and wheels it built from sdists under ``wheels``. A scan
+walks those trees on a thread pool and reads the project and version of
+every cached wheel from its zip directory. Results are kept per folder
+and reused while the folder's mtime is unchanged, so a rescan mostly
+costs one stat per folder. ``prune`` deletes the least recently used
+entries (access time, or modification time where the file system does
+not track access) until the cache fits a size budget, keeping wheels
+that a snapshot pins.
+"""
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .name_index import normalize
+
+# cache sub-folder -> kind shown in the dashboard
+PIP_FOLDERS = (("http-v2", "http"), ("http", "http"), ("wheels", "wheels"))
+FORMAT = 1
+_MIN_WHEEL = 1024  # smaller http entries are index pages and headers
+
+
+def wheel_identity(path):
+    """(project, version) of a cached wheel, ("", "") if not a wheel."""
+    name = os.path.basename(path)
+    if name.endswith(".whl"):
+        parts = name.split("-")
+        if len(parts) >= 5:
+            return parts[0], parts[1]
+        return "", ""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for member in zf.namelist():
+                top, _, rest = member.partition("/")
+                if top.endswith(".dist-info") and rest == "WHEEL":
+                    project, _, version = top[:-10].rpartition("-")
+                    return project, version
+    except (OSError, zipfile.BadZipFile, ValueError, EOFError):
+        pass
+    return "", ""
+
+
+def _keep_atime(path, st):
+    """Undo the access time update of our own read; it is not a use."""
+    try:
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+class CacheScan:
+    """
+    Incremental scan state: folder -> [mtime, sub-folders, files] with
+    files as [name, size, last used, mtime, project, version].
+    """
+
+    def __init__(self, state_path):
+        self.state_path = str(state_path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self._dirs = data["dirs"] if data.get("format") == FORMAT else {}
+        except (OSError, ValueError, KeyError):
+            self._dirs = {}
+
+    def _list(self, folder):
+        """(folder, sub-folders, files) read from disk unless unchanged."""
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            return folder, None
+        with self._lock:
+            known = self._dirs.get(folder)
+        if known and known[0] == mtime:
+            return folder, known
+        previous = {f[0]: f for f in known[2]} if known else {}
+        subdirs, files = [], []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    old = previous.get(entry.name)
+                    if old and old[1] == st.st_size and old[3] == st.st_mtime:
+                        project, version = old[4], old[5]
+                    elif entry.name.endswith(".whl"):
+                        project, version = wheel_identity(entry.path)
+                    elif st.st_size >= _MIN_WHEEL:
+                        project, version = wheel_identity(entry.path)
+                        _keep_atime(entry.path, st)
+                    else:
+                        project, version = "", ""
+                    files.append([entry.name, st.st_size,
+                                  max(st.st_atime, st.st_mtime),
+                                  st.st_mtime, project, version])
+        except OSError:
+            return folder, None
+        return folder, [mtime, sorted(subdirs), files]
+
+    def scan(self, roots, workers=8):
+        """
+        Entries under ``roots`` ([(folder, kind)]): dicts with "path",
+        "files", "kind", "size", "used", "project" and "version". A
+        header file and its ``.body``, or a built wheel and the files
+        next to it, form one entry.
+        """
+        kinds, fresh = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            pending = set()
+            for root, kind in roots:
+                if os.path.isdir(root):
+                    kinds[root] = kind
+                    pending.add(pool.submit(self._list, root))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder, listing = future.result()
+                    if listing is None:
+                        continue
+                    fresh[folder] = listing
+                    pending |= {pool.submit(self._list, d)
+                                for d in listing[1]}
+        with self._lock:
+            changed = fresh != self._dirs
+            self._dirs = fresh
+        if changed:
+            self.save()
+
+        entries = []
+        by_depth = sorted(kinds, key=len, reverse=True)
+        for folder, (_, _, files) in fresh.items():
+            root = next(r for r in by_depth
+                        if folder == r or folder.startswith(r + os.sep))
+            grouped = {}
+            for name, size, used, _, project, version in files:
+                if kinds[root] == "wheels":
+                    key = ""  # a built wheel and its origin.json
+                else:
+                    key = name[:-5] if name.endswith(".body") else name
+                e = grouped.setdefault(key, {
+                    "path": os.path.join(folder, key) if key else folder,
+                    "files": [],
+                    "kind": kinds[root], "size": 0, "used": 0.0,
+                    "project": "", "version": ""})
+                e["files"].append(os.path.join(folder, name))
+                e["size"] += size
+                e["used"] = max(e["used"], used)
+                if project:
+                    e["project"], e["version"] = project, version
+            entries += grouped.values()
+        return entries
+
+    def save(self):
+        with self._lock:
+            data = {"format": FORMAT, "dirs": self._dirs}
+        tmp = self.state_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+
+def is_kept(entry, keep):
+    """True if ``entry`` is a wheel of a (normalized name, version) pin."""
+    return bool(entry["project"]) and (
+        normalize(entry["project"]), entry["version"]) in keep
+
+
+def summarize(entries, keep=(), top=25):
+    """Totals per kind and the ``top`` largest wheels."""
+    kinds = {}
+    for e in entries:
+        k = kinds.setdefault(e["kind"], {"size": 0, "count": 0})
+        k["size"] += e["size"]
+        k["count"] += 1
+    wheels = sorted((e for e in entries if e["project"]),
+                    key=lambda e: -e["size"])[:top]
+    return {
+        "size": sum(k["size"] for k in kinds.values()),
+        "count": len(entries),
+        "kinds": kinds,
+        "wheels": [{"name": e["project"], "version": e["version"],
+                    "size": e["size"], "used": e["used"], "kind": e["kind"],
+                    "kept": is_kept(e, keep)} for e in wheels],
+    }
+
+
+def prune(entries, budget, keep=(), roots=()):
+    """
+    Delete least recently used entries until the total size is at most
+    ``budget`` bytes; entries pinned by ``keep`` stay. Folders emptied
+    below ``roots`` are removed. Returns (entries removed, bytes freed).
+    """
+    total = sum(e["size"] for e in entries)
+    if total <= budget:
+        return 0, 0
+    # access times may have moved since the scan was cached
+    for e in entries:
+        for path in e["files"]:
+            try:
+                st = os.stat(path)
+                e["used"] = max(e["used"], st.st_atime, st.st_mtime)
+            except OSError:
+                pass
+    removed = freed = 0
+    emptied = set()
+    for e in sorted(entries, key=lambda e: e["used"]):
+        if total <= budget:
+            break
+        if is_kept(e, keep):
+            continue
+        for path in e["files"]:
+            try:
+                os.unlink(path)
+                emptied.add(os.path.dirname(path))
+            except OSError:
+                pass
+        total -= e["size"]
+        freed += e["size"]
+        removed += 1
+    roots = [os.path.normpath(r) for r in roots]
+    for d in sorted(emptied, key=len, reverse=True):
+        while any(d.startswith(r + os.sep) for r in roots):
+            try:
+                os.rmdir(d)
+            except OSError:
+                break
+            d = os.path.dirname(d)
+    return removed, freed
+
@@ -0,0 +1,277 @@
+"""
+plugin_deps.py - Find the Python packages installed QGIS plugins need.
+Each plugin folder is checked twice: requirements it declares (a
+``requirements`` style key in metadata.txt or a requirements.txt) and
+the modules its sources import, found statically with ``ast``. Imports
+are parsed in parallel and cached by file mtime. Modules that are not
+in the standard library, not part of the plugin itself, not provided
+by QGIS and not importable from any installed distribution are mapped
+to a project name and reported as missing.
+"""
+import ast
+import configparser
+import json
+import os
+import platform
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .name_index import normalize
+from .pep440 import specifier_contains
+
+# metadata.txt keys some plugins use for their Python requirements
+METADATA_KEYS = ("requirements", "python_requirements",
+                 "python_dependencies", "pip_dependencies")
+# shipped with QGIS itself (or its core plugins), never pip-installed
+PROVIDED = {"qgis", "PyQt5", "PyQt6", "sip", "PyQt5.sip", "processing",
+            "console", "osgeo", "gdal", "ogr", "osr", "qtpy"}
+# import name -> project name where the two differ
+PROJECT_NAMES = {
+    "attr": "attrs", "Bio": "biopython", "bs4": "beautifulsoup4",
+    "cv2": "opencv-python", "Crypto": "pycryptodome",
+    "dateutil": "python-dateutil", "docx": "python-docx",
+    "dotenv": "python-dotenv", "ee": "earthengine-api",
+    "fitz": "PyMuPDF", "git": "GitPython", "jwt": "PyJWT",
+    "magic": "python-magic", "OpenGL": "PyOpenGL", "PIL": "Pillow",
+    "pkg_resources": "setuptools", "pptx": "python-pptx",
+    "serial": "pyserial", "skimage": "scikit-image",
+    "sklearn": "scikit-learn", "usb": "pyusb", "win32api": "pywin32",
+    "win32com": "pywin32", "yaml": "PyYAML", "zmq": "pyzmq",
+}
+_SKIP_DIRS = {"__pycache__", ".git", "test", "tests", "help", "i18n",
+              "docs"}
+_REQ = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?"
+                  r"\s*([^;]*)")
+
+
+def default_plugin_dirs():
+    """
+    Plugin folders of the running QGIS profile, or outside QGIS those of
+    every profile in the default settings location.
+    """
+    try:
+        from qgis.core import QgsApplication
+        return [Path(QgsApplication.qgisSettingsDirPath())
+                / "python" / "plugins"]
+    except ImportError:
+        pass
+    system = platform.system()
+    if os.environ.get("QGIS_CUSTOM_CONFIG_PATH"):
+        root = Path(os.environ["QGIS_CUSTOM_CONFIG_PATH"])
+    elif system == "Windows":
+        root = Path(os.environ.get("APPDATA", "")) / "QGIS" / "QGIS3"
+    elif system == "Darwin":
+        root = (Path.home() / "Library" / "Application Support"
+                / "QGIS" / "QGIS3")
+    else:
+        root = Path.home() / ".local" / "share" / "QGIS" / "QGIS3"
+    return sorted(p for p in root.glob("profiles/*/python/plugins")
+                  if p.is_dir())
+
+
+def stdlib_modules():
+    names = set(sys.builtin_module_names)
+    names |= set(getattr(sys, "stdlib_module_names", ()))
+    if not getattr(sys, "stdlib_module_names", None):
+        import sysconfig
+        stdlib = sysconfig.get_paths()["stdlib"]
+        try:
+            for entry in os.listdir(stdlib):
+                stem = entry[:-3] if entry.endswith(".py") else entry
+                if stem.isidentifier():
+                    names.add(stem)
+        except OSError:
+            pass
+    return names
+
+
+def parse_imports(path):
+    """
+    (required, optional) top-level module names imported by one file;
+    imports inside ``try`` blocks count as optional. Relative imports
+    are skipped.
+    """
+    try:
+        with open(path, "rb") as fh:
+            tree = ast.parse(fh.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return [], []
+    required, optional = set(), set()
+
+    def visit(node, guarded):
+        for child in ast.iter_child_nodes(node):
+            names = []
+            if isinstance(child, ast.Import):
+                names = [a.name for a in child.names]
+            elif isinstance(child, ast.ImportFrom) and not child.level:
+                names = [child.module or ""]
+            for name in names:
+                top = name.split(".")[0]
+                if top:
+                    (optional if guarded else required).add(top)
+            visit(child, guarded or isinstance(child, ast.Try))
+
+    visit(tree, False)
+    return sorted(required), sorted(optional - required)
+
+
+class ImportCache:
+    """JSON cache of parse_imports results keyed by path and mtime."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                self._data = json.load(fh)
+        except (OSError, ValueError):
+            self._data = {}
+
+    def imports(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return [], []
+        stamp = [st.st_mtime, st.st_size]
+        with self._lock:
+            hit = self._data.get(path)
+        if hit and hit[0] == stamp:
+            return hit[1], hit[2]
+        required, optional = parse_imports(path)
+        with self._lock:
+            self._data[path] = [stamp, required, optional]
+            self._dirty = True
+        return required, optional
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump(self._data, fh)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError:
+                pass
+
+
+def declared_requirements(plugin_dir):
+    """Requirement strings from metadata.txt and requirements.txt."""
+    reqs = []
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        parser.read(os.path.join(plugin_dir, "metadata.txt"),
+                    encoding="utf-8")
+    except (configparser.Error, UnicodeDecodeError):
+        pass
+    if parser.has_section("general"):
+        for key in METADATA_KEYS:
+            value = parser.get("general", key, fallback="")
+            reqs += [r.strip() for r in re.split(r"[,\n]", value)
+                     if r.strip()]
+    try:
+        with open(os.path.join(plugin_dir, "requirements.txt"),
+                  encoding="utf-8") as fh:
+            reqs += [line.split("#")[0].strip() for line in fh
+                     if line.split("#")[0].strip()
+                     and not line.lstrip().startswith("-")]
+    except OSError:
+        pass
+    return list(dict.fromkeys(reqs))
+
+
+def _plugin_files(plugin_dir):
+    """Python sources of a plugin and the module names it defines."""
+    files, local = [], set()
+    for root, dirs, names in os.walk(plugin_dir):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+        local.update(d for d in dirs if d.isidentifier())
+        for name in names:
+            if name.endswith(".py"):
+                files.append(os.path.join(root, name))
+                local.add(name[:-3])
+            elif name.endswith((".pyd", ".so")):
+                local.add(name.split(".")[0])
+    return files, local
+
+
+def plugin_name(plugin_dir):
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        parser.read(os.path.join(plugin_dir, "metadata.txt"),
+                    encoding="utf-8")
+        return parser.get("general", "name",
+                          fallback=os.path.basename(plugin_dir))
+    except (configparser.Error, UnicodeDecodeError):
+        return os.path.basename(plugin_dir)
+
+
+def scan(plugin_dirs, installed, module_owners, cache, workers=8):
+    """
+    Missing requirements of every plugin under ``plugin_dirs``.
+
+    ``installed`` maps normalized project names to installed versions,
+    ``module_owners`` top-level module names to the project providing
+    them. Returns one row per missing requirement:
+    {"plugin", "requirement", "module", "source" ("metadata" or
+    "import"), "optional", "installed"}.
+    """
+    plugins = []
+    for base in plugin_dirs:
+        try:
+            plugins += sorted(os.path.join(str(base), d)
+                              for d in os.listdir(str(base))
+                              if os.path.isdir(os.path.join(str(base), d)))
+        except OSError:
+            continue
+    sources = {p: _plugin_files(p) for p in plugins}
+    files = [f for fs, _ in sources.values() for f in fs]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        parsed = dict(zip(files, pool.map(cache.imports, files)))
+    cache.save()
+
+    # plugin folders are importable as packages from one another
+    skip = stdlib_modules() | PROVIDED | {
+        os.path.basename(p) for p in plugins}
+    rows = []
+    for plugin in plugins:
+        name = plugin_name(plugin)
+        seen = set()
+        for req in declared_requirements(plugin):
+            m = _REQ.match(req)
+            if not m:
+                continue
+            key = normalize(m.group(1))
+            seen.add(key)
+            have = installed.get(key)
+            if have and specifier_contains(m.group(2).strip(), have):
+                continue
+            rows.append({"plugin": name, "requirement": req,
+                         "module": "", "source": "metadata",
+                         "optional": False, "installed": have or ""})
+        files, local = sources[plugin]
+        required, optional = set(), set()
+        for f in files:
+            req, opt = parsed[f]
+            required.update(req)
+            optional.update(opt)
+        for module in sorted(required | optional):
+            if (module in skip or module in local
+                    or module in module_owners):
+                continue
+            project = PROJECT_NAMES.get(module, module)
+            key = normalize(project)
+            if key in seen or key in installed:
+                continue
+            seen.add(key)
+            rows.append({"plugin": name, "requirement": project,
+                         "module": module, "source": "import",
+                         "optional": module not in required,
+                         "installed": ""})
+    return rows
@@ -0,0 +1,75 @@
+"""
+prefetch.py - Bounded, cancellable background prefetching.
+The dialog schedules the rows the user is likely to open next; each new
+schedule replaces the previous one, so work for rows the user moved away
+from is dropped before it starts.
+"""
+import threading
+from collections import deque
+
+
+class Prefetcher:
+    """
+    Run ``fetch(name)`` for scheduled names on a couple of daemon
+    threads. ``budget`` caps how many names one schedule may queue.
+    """
+
+    def __init__(self, fetch, budget=8, workers=2):
+        self._fetch = fetch
+        self.budget = budget
+        self._queue = deque()
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._running = 0
+        self._workers = workers
+        self._stopped = False
+
+    def schedule(self, names):
+        """Replace pending work with ``names`` (first ones first)."""
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+            seen = set()
+            for name in names:
+                if name and name not in seen:
+                    seen.add(name)
+                    self._queue.append((self._generation, name))
+                if len(self._queue) >= self.budget:
+                    break
+            self._ensure_threads()
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def _ensure_threads(self):
+        # called with the lock held
+        while self._running < self._workers:
+            self._running += 1
+            threading.Thread(target=self._loop, daemon=True,
+                             name="pip-manager-prefetch").start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    if not self._cond.wait(timeout=30) and not self._queue:
+                        break  # idle threads exit; schedule() respawns
+                if self._stopped or not self._queue:
+                    self._running -= 1
+                    return
+                generation, name = self._queue.popleft()
+                if generation != self._generation:
+                    continue
+            try:
+                self._fetch(name)
+            except Exception:
+                pass
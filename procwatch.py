@@ -0,0 +1,198 @@
+"""
+procwatch.py - Supervised subprocesses.
+Each pip (uv, conda) process runs in a process group of its own and is
+watched for two limits: ``idle`` seconds without a line of output and
+``total`` seconds overall. When a limit is hit, or ``cancel_all`` is
+called from another thread, the whole process tree is stopped (SIGTERM
+to the group, SIGKILL after a grace period; ``taskkill /T`` on Windows)
+and the call raises OperationTimedOut or OperationCancelled instead of
+returning a result.
+"""
+import os
+import platform
+import queue
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+from .envlock import OperationCancelled
+
+WINDOWS = platform.system() == "Windows"
+if WINDOWS:
+    # CREATE_NO_WINDOW | CREATE_NEW_PROCESS_GROUP
+    SUBPROCESS_FLAGS = 0x08000000 | 0x00000200
+else:
+    SUBPROCESS_FLAGS = 0
+
+_GRACE = 3.0    # seconds between terminate and kill
+_TICK = 0.25
+_DRAIN = 2.0    # wait for pipes held open by orphans after the exit
+
+
+class OperationTimedOut(OperationCancelled):
+    """Raised when a process exceeded its idle or total time limit."""
+
+
+def _describe(cmd):
+    words = [os.path.basename(str(cmd[0]))] + [str(c) for c in cmd[1:4]]
+    text = " ".join(words) + (" ..." if len(cmd) > 4 else "")
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+def kill_tree(proc, grace=_GRACE):
+    """Stop ``proc`` and everything it started."""
+    if WINDOWS:
+        if proc.poll() is None:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True, creationflags=0x08000000)
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except OSError:
+        return  # the group is gone already
+    try:
+        proc.wait(grace)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)  # children ignoring SIGTERM
+    except OSError:
+        pass
+    proc.wait()
+
+
+def _pump(stream, tag, lines):
+    try:
+        for line in stream:
+            lines.put((tag, line))
+    except (OSError, ValueError):
+        pass
+    lines.put((tag, None))
+
+
+class _Scope:
+    cancelled = False
+
+
+class Supervisor:
+    """Runs and tracks the processes of one manager."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._live = {}       # Popen -> None, or "cancelled"
+        self._scopes = set()
+        self._local = threading.local()
+
+    def busy(self):
+        """True while a supervised process is running."""
+        return bool(self._live)
+
+    @contextmanager
+    def operation(self):
+        """
+        Group the processes of one multi-step operation: after
+        ``cancel_all`` none of its later steps start either.
+        """
+        if getattr(self._local, "scope", None) is not None:
+            yield
+            return
+        scope = self._local.scope = _Scope()
+        with self._lock:
+            self._scopes.add(scope)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._scopes.discard(scope)
+            self._local.scope = None
+
+    def cancel_all(self):
+        """
+        Stop every running process; returns how many there were. The
+        threads running them do the killing, so this never blocks.
+        """
+        with self._lock:
+            for proc in self._live:
+                self._live[proc] = "cancelled"
+            for scope in self._scopes:
+                scope.cancelled = True
+            return len(self._live)
+
+    def run(self, cmd, cwd=None, stream_cb=None, idle=0, total=0):
+        """
+        Run ``cmd`` like subprocess.run and return (rc, out, err). With
+        ``stream_cb`` stderr is merged into out and every line is passed
+        on as it arrives. ``idle``/``total`` are limits in seconds (0 is
+        no limit).
+        """
+        scope = getattr(self._local, "scope", None)
+        if scope is not None and scope.cancelled:
+            raise OperationCancelled("Cancelled before {}.".format(
+                _describe(cmd)))
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if stream_cb else subprocess.PIPE,
+            text=True, creationflags=SUBPROCESS_FLAGS, cwd=cwd,
+            start_new_session=not WINDOWS)
+        with self._lock:
+            self._live[proc] = None
+        lines = queue.Queue()
+        streams = [("out", proc.stdout)]
+        if not stream_cb:
+            streams.append(("err", proc.stderr))
+        for tag, stream in streams:
+            threading.Thread(target=_pump, args=(stream, tag, lines),
+                             daemon=True).start()
+        out, err = [], []
+        start = last = time.monotonic()
+        exited, reason, open_streams = None, None, len(streams)
+        try:
+            while open_streams:
+                try:
+                    tag, line = lines.get(timeout=_TICK)
+                except queue.Empty:
+                    pass
+                else:
+                    if line is None:
+                        open_streams -= 1
+                        continue
+                    last = time.monotonic()
+                    (out if tag == "out" else err).append(line)
+                    if stream_cb:
+                        stream_cb(line.rstrip())
+                now = time.monotonic()
+                reason = self._live.get(proc)
+                if reason is None and idle and now - last > idle:
+                    reason = "idle"
+                elif reason is None and total and now - start > total:
+                    reason = "total"
+                if exited is None and proc.poll() is not None:
+                    exited = now
+                if reason or (exited and now - exited > _DRAIN):
+                    break  # pipes still held open by orphaned children
+            if reason or open_streams:
+                kill_tree(proc)
+            proc.wait()
+        except BaseException:
+            kill_tree(proc)  # e.g. KeyboardInterrupt in the CLI
+            raise
+        finally:
+            with self._lock:
+                self._live.pop(proc, None)
+        output = "".join(out + err)
+        if reason == "cancelled":
+            exc = OperationCancelled("Cancelled: {}".format(_describe(cmd)))
+        elif reason == "idle":
+            exc = OperationTimedOut(
+                "Timed out: {} printed nothing for {} s and was "
+                "stopped.".format(_describe(cmd), int(idle)))
+        elif reason == "total":
+            exc = OperationTimedOut(
+                "Timed out: {} was still running after {} s and was "
+                "stopped.".format(_describe(cmd), int(total)))
+        else:
+            return proc.returncode, "".join(out), "".join(err)
+        exc.output = output
+        raise exc
@@ -2,22 +2,85 @@
 qpip.py - Core pip backend for QGIS Pip Manager
 Compatible with OSGeo4W, conda, and standalone Python on Windows/Linux/macOS.
 """
+import base64
+import gzip
+import hashlib
 import json
 import os
 import platform
 import re
-import ssl
+import shutil
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from http.client import HTTPSConnection
 from pathlib import Path
+from urllib.parse import unquote, urljoin, urlsplit
+
+from . import backends, distinfo, downloader, pipcache, plugin_deps, stash
+from .advisories import AdvisoryIndex, build_index
+from .conda_meta import find_prefix, list_conda_packages, merge_inventory
+from .envlock import EnvironmentScheduler, OperationCancelled
+from .importprof import ImportProfileCache, profile_distributions
+from .mirrors import MirrorSet
+from .name_index import NameIndex, normalize
+from .netstate import CircuitBreaker, Offline, is_network_error
+from .pep440 import (
+    is_prerelease, specifier_contains, version_key, wheel_tags,
+)
+from .procwatch import Supervisor
+from .textindex import MetadataIndex
 
 if platform.system() == "Windows":
     SUBPROCESS_FLAGS = 0x08000000  # CREATE_NO_WINDOW
 else:
     SUBPROCESS_FLAGS = 0
 
+USER_AGENT = "QGIS-Pip-Manager/0.1.0"
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+SIMPLE_JSON = "application/vnd.pypi.simple.v1+json"
+LOCK_MARKER = "# qgis-pip-manager: complete-lock"
+_PIN = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)==([^\s;#]+)$")
+_HTML_FILE = re.compile(
+    r'<a\s+([^>]*)>([^<]+)</a>', re.IGNORECASE)
+_HTML_ATTR = re.compile(r'([\w-]+)="([^"]*)"')
+_TAGS_PROBE = (
+    "from pip._vendor.packaging.tags import sys_tags\n"
+    "print('\\n'.join(str(t) for t in sys_tags()))"
+)
+_SPEC_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_UNPROTECTED = {"pip", "setuptools", "wheel"}
+_NET_ERROR = re.compile(
+    r"Could not fetch URL|NewConnectionError|ConnectTimeoutError|"
+    r"Max retries exceeded|Read timed out|Connection refused|"
+    r"Temporary failure in name resolution|Name or service not known|"
+    r"No route to host|Network is unreachable|"
+    r"error sending request for url|dns error")
+_INDEX_COMMANDS = ("install", "download", "index", "wheel")
+# (idle, total) seconds for quick pip subcommands, 0 = no limit; most
+# print only when done. The rest (install, download, wheel, conda) use
+# the manager's idle/total timeouts.
+_QUICK_LIMITS = {"list": (0, 300), "freeze": (0, 300), "show": (0, 300),
+                 "check": (0, 300), "index": (0, 180),
+                 "uninstall": (180, 900), "-c": (0, 300),
+                 "--outdated": (0, 900)}
+_SITE_PROBE = (
+    "import json, site, sys, sysconfig\n"
+    "paths = sysconfig.get_paths()\n"
+    "dirs = [paths['purelib'], paths['platlib']]\n"
+    "dirs += getattr(site, 'getsitepackages', lambda: [])()\n"
+    "if site.ENABLE_USER_SITE:\n"
+    "    dirs.append(site.getusersitepackages())\n"
+    "print(json.dumps({'dirs': dirs, 'version': list(sys.version_info[:3])}))"
+)
+
+# Shared by every manager: once the network is known to be down, index
+# requests fail at once and pip runs against the local wheel cache.
+NETWORK = CircuitBreaker()
+
 
 def _safe_cwd():
     """Return a writable directory so subprocesses never inherit QGIS cwd."""
@@ -27,17 +90,13 @@ def _safe_cwd():
             or str(Path.home()))
 
 
-def _is_conda_env(python_path):
-    return (Path(python_path).parent.parent / "conda-meta").exists()
-
-
 def _pip_version(python_path):
     try:
         r = subprocess.run(
             [python_path, "-m", "pip", "--version"],
             capture_output=True, text=True,
             creationflags=SUBPROCESS_FLAGS,
-            cwd=_safe_cwd(),
+            cwd=_safe_cwd(), timeout=60,
         )
         m = re.search(r"pip (\d+)\.(\d+)(?:\.(\d+))?", r.stdout)
         if m:
@@ -49,12 +108,21 @@ def _pip_version(python_path):
 
 def _fetch_json(host, path, timeout=8):
     """Fetch JSON from an HTTPS endpoint using http.client (Bandit-safe)."""
+    import ssl
+    from http.client import HTTPSConnection
+    NETWORK.allow()
     ctx = ssl.create_default_context()
     conn = HTTPSConnection(host, timeout=timeout, context=ctx)
     try:
-        conn.request("GET", path,
-                     headers={"User-Agent": "QGIS-Pip-Manager/0.1.0"})
-        resp = conn.getresponse()
+        try:
+            conn.request("GET", path,
+                         headers={"User-Agent": USER_AGENT})
+            resp = conn.getresponse()
+        except Exception as exc:
+            if is_network_error(exc):
+                NETWORK.failure(direct=True)
+            raise
+        NETWORK.success()
         if resp.status != 200:
             raise RuntimeError("HTTP {}: {}".format(resp.status,
                                                       resp.reason))
@@ -63,6 +131,210 @@ def _fetch_json(host, path, timeout=8):
         conn.close()
 
 
+def _open_url(url, headers=None, timeout=8, method="GET", redirects=3):
+    """
+    Open any http(s) URL using http.client and return (conn, resp)
+    with the body unread; the caller closes ``conn``.
+    Follows a few redirects and turns ``user:password@host``
+    credentials into a Basic auth header. Raises netstate.Offline while
+    the network is known to be down.
+    """
+    # Network modules load on first use to keep cli.py start-up fast.
+    import ssl
+    from http.client import HTTPConnection, HTTPSConnection
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        conn = HTTPSConnection(parts.hostname, parts.port, timeout=timeout,
+                               context=ssl.create_default_context())
+    elif parts.scheme == "http":
+        conn = HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    else:
+        raise ValueError("Unsupported URL: '{}'".format(url))
+    NETWORK.allow()
+
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    hdrs = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+    if parts.username:
+        token = "{}:{}".format(parts.username, parts.password or "")
+        hdrs["Authorization"] = "Basic " + base64.b64encode(
+            token.encode("utf-8")).decode("ascii")
+    hdrs.update(headers or {})
+
+    try:
+        conn.request(method, path, headers=hdrs)
+        resp = conn.getresponse()
+    except Exception as exc:
+        conn.close()
+        if is_network_error(exc):
+            NETWORK.failure(direct=True)
+        raise
+    NETWORK.success()
+    location = resp.getheader("location")
+    if resp.status in (301, 302, 303, 307, 308) and location and redirects:
+        conn.close()
+        return _open_url(urljoin(url, location), headers, timeout,
+                         method, redirects - 1)
+    return conn, resp
+
+
+def _fetch_url(url, headers=None, timeout=8, method="GET", redirects=3):
+    """
+    Fetch any http(s) URL (see _open_url) and decode gzip bodies.
+    Returns (status, headers, body) with lower-cased header names.
+    """
+    conn, resp = _open_url(url, headers, timeout, method, redirects)
+    try:
+        body = resp.read()
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+    finally:
+        conn.close()
+    if resp_headers.get("content-encoding") == "gzip":
+        body = gzip.decompress(body)
+    return resp.status, resp_headers, body
+
+
+def _probe_proxy(proxy, url, timeout=3):
+    """
+    HEAD ``url`` through an HTTP proxy given the way pip takes it,
+    ``[scheme://][user:password@]host:port``. Raises when unreachable.
+    """
+    import ssl
+    from http.client import HTTPConnection, HTTPSConnection
+    p = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    target = urlsplit(url)
+    hdrs = {"User-Agent": USER_AGENT}
+    proxy_hdrs = {}
+    if p.username:
+        token = "{}:{}".format(unquote(p.username), unquote(p.password or ""))
+        proxy_hdrs["Proxy-Authorization"] = "Basic " + base64.b64encode(
+            token.encode("utf-8")).decode("ascii")
+    if target.scheme == "https":
+        # the tunnel is opened with CONNECT, then TLS to the index
+        conn = HTTPSConnection(p.hostname, p.port or 80, timeout=timeout,
+                               context=ssl.create_default_context())
+        conn.set_tunnel(target.hostname, target.port or 443,
+                        headers=proxy_hdrs)
+        path = target.path or "/"
+    else:
+        conn = HTTPConnection(p.hostname, p.port or 80, timeout=timeout)
+        path = url
+        hdrs.update(proxy_hdrs)
+    try:
+        conn.request("HEAD", path, headers=hdrs)
+        resp = conn.getresponse()
+        if resp.status >= 500 or resp.status == 407:
+            raise OSError("HTTP {} via proxy".format(resp.status))
+    finally:
+        conn.close()
+
+
+def _conda_state_path(snapshot_path):
+    """conda-meta state saved alongside a snapshot file."""
+    return snapshot_path.with_suffix(".conda.json")
+
+
+def _parse_simple_html(body, base_url):
+    """PEP 503 project page -> PEP 691 style file dicts."""
+    files = []
+    for attrs, filename in _HTML_FILE.findall(body.decode("utf-8", "replace")):
+        attr = dict(_HTML_ATTR.findall(attrs))
+        href = attr.get("href", "")
+        url, _, fragment = href.partition("#")
+        hashes = dict([fragment.split("=", 1)]) if "=" in fragment else {}
+        files.append({
+            "filename": filename.strip(),
+            "url": urljoin(base_url, url),
+            "hashes": hashes,
+            "requires-python": attr.get(
+                "data-requires-python", "").replace("&gt;", ">").replace(
+                "&lt;", "<"),
+            "yanked": "data-yanked" in attrs,
+        })
+    return files
+
+
+def _file_version(filename, project):
+    """Version part of a wheel or sdist file name, or None."""
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+    for ext in (".tar.gz", ".zip", ".tar.bz2", ".tgz"):
+        if filename.endswith(ext):
+            stem = filename[:-len(ext)]
+            head = stem[:len(project)]
+            if normalize(head) == normalize(project) and \
+                    stem[len(project):len(project) + 1] == "-":
+                return stem[len(project) + 1:]
+    return None
+
+
+def _spec_names(lines):
+    """Project names mentioned in requirement specs / file lines."""
+    names = []
+    for line in lines:
+        if line.startswith((" ", "\t", "-", "#")):
+            continue
+        m = _SPEC_NAME.match(line)
+        if m:
+            names.append(m.group(1))
+    return names
+
+
+def _snapshot_pins(path):
+    """name/version dicts for the pinned lines of a requirements file."""
+    pins = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            m = _PIN.match(line.strip().rstrip("\\").strip())
+            if m:
+                pins.append({"name": m.group(1), "version": m.group(2)})
+    return pins
+
+
+def _installed_names(pip_output):
+    """
+    Normalized names from pip's "Successfully installed" line, or from
+    uv's " + name==version" (" ~ " when reinstalled) lines.
+    """
+    names = set()
+    for line in pip_output.splitlines():
+        if line.startswith("Successfully installed "):
+            names |= {normalize(token.rsplit("-", 1)[0])
+                      for token in line.split()[2:]}
+        elif line[:3] in (" + ", " ~ ") and "==" in line:
+            names.add(normalize(line[3:].split("==")[0]))
+    return names
+
+
+def _uninstalled_names(pip_output):
+    """The same for uninstalls ("Successfully uninstalled" / " - ")."""
+    names = {normalize(m) for m in re.findall(
+        r"Successfully uninstalled (\S+?)-\d", pip_output)}
+    names |= {normalize(m) for m in re.findall(
+        r"^ - ([^=\s]+)==", pip_output, re.MULTILINE)}
+    return names
+
+
+def _batch_report(names, done, rc, output):
+    """Per-package result lines for one pip call over ``names``."""
+    lines = ["{} {}".format(
+        "OK  " if normalize(n) in done else
+        "SKIP" if rc == 0 else "FAIL", n) for n in names]
+    if rc != 0:
+        lines.append(output.strip())
+    return "\n".join(lines)
+
+
+def _data_dir(name):
+    """Per-user plugin data folder, next to the default snapshots."""
+    appdata = os.environ.get("APPDATA") or os.environ.get("HOME", "")
+    if appdata:
+        return Path(appdata) / "QGIS" / name
+    return Path(__file__).parent / name
+
+
 class QGISPipManager:
 
     def __init__(self, qgis_python_path, proxy="", extra_index_url="",
@@ -81,18 +353,13 @@ class QGISPipManager:
         self.proxy = proxy.strip()
         self.extra_index_url = extra_index_url.strip()
         self.index_url = index_url.strip()
+        self.mirrors = ""  # extra candidates for index_url, space separated
 
         # Snapshots directory
         if snapshots_dir:
             self.snapshots_dir = Path(snapshots_dir)
         else:
-            appdata = os.environ.get("APPDATA") or os.environ.get("HOME", "")
-            if appdata:
-                self.snapshots_dir = (
-                    Path(appdata) / "QGIS" / "pip_manager_snapshots")
-            else:
-                self.snapshots_dir = (
-                    Path(__file__).parent / "pip_manager_snapshots")
+            self.snapshots_dir = _data_dir("pip_manager_snapshots")
         try:
             self.snapshots_dir.mkdir(parents=True, exist_ok=True)
         except PermissionError:
@@ -100,62 +367,797 @@ class QGISPipManager:
                 Path(tempfile.gettempdir()) / "pip_manager_snapshots")
             self.snapshots_dir.mkdir(parents=True, exist_ok=True)
 
-        self.is_conda = _is_conda_env(self.qgis_python_path)
-        self.pip_ver = _pip_version(self.qgis_python_path)
+        # Cache directory (name index, plans, inventories ...)
+        self.cache_dir = _data_dir("pip_manager_cache")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except PermissionError:
+            self.cache_dir = (
+                Path(tempfile.gettempdir()) / "pip_manager_cache")
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.name_index = NameIndex(self.cache_dir / "name_index")
+        self.mirror_set = MirrorSet(self.cache_dir / "mirrors.json")
+        self.advisories = AdvisoryIndex(self.cache_dir / "advisories.json.gz")
+
+        self._site_info = None
+        self._tags = None
+        self._versions_cache = {}   # name -> (time, version infos)
+        self._details_cache = {}    # name -> pip show text
+        self._installed = None
+        self._graph = None
+        self._text_index = None
+        self._local = threading.local()
+        self._scheduler = None
+
+        # Undo stashes (see stash.py)
+        self.stash_enabled = True
+        self.auto_rollback = True
+        self.stash_max_age_days = 7
+        self.last_stash = None
+
+        # Subprocess watchdog (see procwatch.py); limits of long
+        # operations in seconds, 0 disables one
+        self.supervisor = Supervisor()
+        self.idle_timeout = 600
+        self.total_timeout = 3600
+
+        # Pin what shipped with QGIS on every install (see protected_core)
+        self.protect_core = True
+
+        # Installer backend (see backends.py): "auto", "pip" or "uv"
+        self.installer = backends.AUTO
+        self.installer_path = ""
+        self._backend = None
+
+        # Plan downloads (see downloader.py); 0 lets pip download
+        self.parallel_downloads = 4
+        self.wheel_cache_days = 30
+
+        # pip's own cache (see pipcache.py); 0 = no size budget
+        self.pip_cache_budget_mb = 0
+        self._pip_cache = None
+        self._cache_scan = None
+        self.conda_prefix = find_prefix(self.qgis_python_path)
+        self.is_conda = bool(self.conda_prefix)
+        self._pip_ver = None
+        NETWORK.probe = self._network_probe
+        NETWORK.proxied = self._uses_proxy
+
+    @property
+    def pip_ver(self):
+        """pip version of the target interpreter, probed on first use."""
+        if self._pip_ver is None:
+            self._pip_ver = _pip_version(self.qgis_python_path)
+        return self._pip_ver
 
     # -- helpers ---------------------------------------------------------------
 
+    def backend(self):
+        """The installer backend for the current settings (cached)."""
+        key = (self.installer, self.installer_path)
+        if self._backend is None or self._backend[0] != key:
+            self._backend = (key, backends.select(*key))
+        return self._backend[1]
+
+    def _installer(self, pip_cmd):
+        """``pip_cmd`` as run by the active backend."""
+        return self.backend().command(pip_cmd)
+
     def _pip_args(self, *extra):
+        return self._installer(self._pip_argv(*extra))
+
+    def _pip_argv(self, *extra):
+        """
+        pip command with the proxy and, for commands that talk to an
+        index, the index options. While offline (see netstate.py) those
+        become ``--no-index`` plus the local wheel cache.
+        """
         cmd = [self.qgis_python_path, "-m", "pip"] + list(extra)
         if self.proxy:
             cmd += ["--proxy", self.proxy]
-        if self.index_url:
-            cmd += ["--index-url", self.index_url]
+        if not (extra and extra[0] in _INDEX_COMMANDS
+                or "--outdated" in extra):
+            return cmd  # freeze, show, check ... reject index options
+        if NETWORK.is_open():
+            cmd.append("--no-index")
+            wheels = self.cache_dir / "wheels"
+            if wheels.is_dir():
+                cmd += ["--find-links", str(wheels)]
+            return cmd
+        index = self.index_url
+        if self.mirrors.split():
+            # fail fast; _run moves on to the next mirror instead
+            index = self.ranked_indexes()[0]
+            cmd += ["--retries", "1"]
+        if index:
+            cmd += ["--index-url", index]
         if self.extra_index_url:
             cmd += ["--extra-index-url", self.extra_index_url]
         return cmd
 
+    def mirror_candidates(self):
+        """The main index followed by the configured mirrors."""
+        urls = []
+        for url in [self.index_url or DEFAULT_INDEX_URL] + \
+                self.mirrors.split():
+            if url not in urls:
+                urls.append(url)
+        return urls
+
+    def ranked_indexes(self):
+        """
+        Mirror candidates, fastest healthy first (see mirrors.py). The
+        probes use a direct connection, so with a proxy the configured
+        order is kept.
+        """
+        urls = self.mirror_candidates()
+        if self.proxy or NETWORK.is_open():
+            return urls
+        return self.mirror_set.ranked(urls, _fetch_url)
+
+    def probe_mirrors(self):
+        """Probe every candidate now; rows in ranked order."""
+        urls = self.mirror_candidates()
+        results = self.mirror_set.probe(urls, _fetch_url, force=True)
+        return [dict(results[u] or {}, url=u)
+                for u in self.mirror_set.ranked(urls, _fetch_url)]
+
+    def _failover(self, cmd, output):
+        """
+        After a pip network failure: mark the index in ``cmd`` down and
+        return the command for the next healthy mirror, or None.
+        """
+        if "--index-url" not in cmd or not self.mirrors.split():
+            return None
+        pos = cmd.index("--index-url") + 1
+        failed = cmd[pos]
+        errors = _NET_ERROR.findall(output)
+        self.mirror_set.mark_failed(failed, errors[-1] if errors else "")
+        status = self.mirror_set.results(self.mirror_candidates())
+        for url in self.ranked_indexes():
+            if url != failed and (status.get(url) or {}).get("ok"):
+                return cmd[:pos] + [url] + cmd[pos + 1:]
+        return None
+
+    def _uses_proxy(self):
+        return bool(self.proxy)
+
+    def _network_probe(self):
+        """
+        Recovery check for the circuit breaker: HEAD the main index, by
+        way of the proxy when pip uses one.
+        """
+        url = "{}/pip/".format(self.mirror_candidates()[0].rstrip("/"))
+        if self.proxy:
+            _probe_proxy(self.proxy, url)
+        else:
+            _fetch_url(url, method="HEAD", timeout=3)
+
+    def network_state(self):
+        """(state, seconds until the next recovery check); see netstate."""
+        return NETWORK.state, NETWORK.retry_in()
+
+    def retry_network(self):
+        NETWORK.reset()
+
+    def _pip_local(self, *extra):
+        """pip command without index options (uninstall rejects them)."""
+        return self._installer(
+            [self.qgis_python_path, "-m", "pip"] + list(extra))
+
+    def _index_key(self):
+        return "{}|{}|{}".format(self.index_url, self.extra_index_url,
+                                 "core" if self.protect_core else "")
+
+    def protected_core(self):
+        """
+        {normalized name: installed version} of the baseline packages
+        (what shipped with QGIS) that every install is constrained to.
+        Empty when protection is off.
+        """
+        if not self.protect_core:
+            return {}
+        baseline = set(self.baseline()) - _UNPROTECTED
+        if self._read_env_file("baseline_origin", None) is None:
+            # inferred before user installs were left out of it
+            baseline -= self.user_installed()
+        core = {}
+        for key, (site_dir, entry) in distinfo.entries_by_name(
+                self.site_packages()).items():
+            if key in baseline:
+                version = distinfo.read_headers(
+                    distinfo.metadata_file(site_dir, entry)).get("Version")
+                if version:
+                    core[key] = version
+        return core
+
+    def _constraint_args(self):
+        """["-c", file] pinning the protected core, or [] if none."""
+        core = self.protected_core()
+        if not core:
+            return []
+        path = self._env_file("constraints").with_suffix(".txt")
+        text = "".join("{}=={}\n".format(k, v)
+                       for k, v in sorted(core.items()))
+        try:
+            if not path.exists() or path.read_text(encoding="utf-8") != text:
+                path.write_text(text, encoding="utf-8")
+        except OSError:
+            return []
+        return ["-c", str(path)]
+
+    def _install_args(self, *extra):
+        """pip install command with the protected-core constraints."""
+        return self._installer(
+            self._pip_argv("install", *extra) + self._constraint_args())
+
+    def protected_conflicts(self, specs):
+        """
+        Messages for specs that would change a protected package: any
+        version pin other than the installed one, or an upgrade.
+        """
+        core = self.protected_core()
+        out = []
+        for spec in specs:
+            m = _SPEC_NAME.match(spec)
+            key = normalize(m.group(1)) if m else ""
+            if key not in core:
+                continue
+            pin = _PIN.match(spec.strip())
+            if pin and pin.group(2) == core[key]:
+                continue
+            out.append("'{}' shipped with QGIS and is protected at {}. "
+                       "Turn off core protection in Settings to change "
+                       "it.".format(m.group(1), core[key]))
+        return out
+
+    def _explain_failure(self, msg):
+        if self.protect_core and ("conflict" in msg.lower()
+                                  or "ResolutionImpossible" in msg):
+            msg += ("\nNote: the packages that shipped with QGIS are "
+                    "pinned to their installed versions (core protection "
+                    "in Settings); the request may need a different "
+                    "version of one of them.")
+        return msg
+
+    def _site_probe(self):
+        if self._site_info is None:
+            rc, out, _ = self._run(
+                [self.qgis_python_path, "-c", _SITE_PROBE])
+            info = json.loads(out) if rc == 0 else {"dirs": [],
+                                                    "version": []}
+            seen, dirs = set(), []
+            for d in info["dirs"]:
+                if d not in seen and Path(d).is_dir():
+                    seen.add(d)
+                    dirs.append(d)
+            info["dirs"] = dirs
+            self._site_info = info
+        return self._site_info
+
+    def site_packages(self):
+        """site-packages folders of the target interpreter (probed once)."""
+        return self._site_probe()["dirs"]
+
+    def environment_fingerprint(self):
+        return distinfo.fingerprint(self.site_packages())
+
+    @property
+    def scheduler(self):
+        """Reader/writer scheduler for this environment (see envlock.py)."""
+        if self._scheduler is None:
+            name = ".qgis-pip-manager.lock"
+            sites = self.site_packages()
+            path = Path(sites[0]) / name if sites else None
+            if path is None or not os.access(str(path.parent), os.W_OK):
+                key = hashlib.sha1(
+                    self.qgis_python_path.encode()).hexdigest()[:12]
+                path = self.cache_dir / "locks" / "{}.lock".format(key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+            self._scheduler = EnvironmentScheduler(str(path))
+        return self._scheduler
+
+    def cancel_queued(self):
+        """Cancel every mutating operation still waiting for its turn."""
+        self.scheduler.cancel_all()
+
+    def cancel_running(self):
+        """
+        Stop the running pip processes (whole process trees) and the
+        remaining steps of their operations. Returns how many processes
+        were running.
+        """
+        return self.supervisor.cancel_all()
+
+    @contextmanager
+    def _mutation(self, names, label, closure=True, stream_cb=None,
+                  stash_files=True):
+        """
+        Wrap every operation that changes the environment. The outermost
+        call of a thread waits for the environment's write lock and then
+        stashes the distributions the operation may touch. Yields True
+        for that outermost call.
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield False
+            finally:
+                self._local.depth = depth
+            return
+
+        def on_wait(ticket):
+            if stream_cb:
+                stream_cb("Queued: '{}' waits for another operation on "
+                          "this environment (position {}).".format(
+                              ticket.label, ticket.position))
+
+        with self.scheduler.write(label, on_wait), \
+                self.supervisor.operation():
+            self._local.depth = 1
+            self._details_cache.clear()
+            started, stashed = time.time(), None
+            try:
+                if stash_files and self.stash_enabled:
+                    try:
+                        stashed = self.last_stash = self._make_stash(
+                            names, label, closure)
+                    except Exception:
+                        self.last_stash = None
+                yield True
+            except OperationCancelled as exc:
+                notes = self._clean_up_interrupted(started, stashed)
+                if notes:
+                    exc.args = ("{}\n{}".format(exc, "\n".join(notes)),)
+                raise
+            finally:
+                self._local.depth = 0
+
+    def _clean_up_interrupted(self, started, stashed):
+        """
+        Undo what a cancelled or timed-out mutation left behind: roll
+        back the stash it took and drop pip's half-moved ``~name``
+        folders of stashed files. Other ``~`` folders are the only copy
+        of what pip was replacing and stay for the user to recover.
+        """
+        notes, tops = [], set()
+        if stashed and self.last_stash == stashed:
+            try:
+                tops = stash.stashed_tops(stashed)
+                notes += stash.rollback(stashed)
+            except (OSError, ValueError) as exc:
+                notes.append("rollback failed: {}".format(exc))
+            self.last_stash = None
+        for site in self.site_packages():
+            try:
+                entries = os.listdir(site)
+            except OSError:
+                continue
+            for entry in entries:
+                path = os.path.join(site, entry)
+                try:
+                    if (not entry.startswith("~")
+                            or os.path.getmtime(path) < started - 1):
+                        continue
+                except OSError:
+                    continue
+                # pip renames "numpy" to "~umpy", "~-mpy", ...
+                tail = entry.lstrip("~-_.")
+                if any(s == site and len(t) == len(entry)
+                       and t.endswith(tail) for s, t in tops):
+                    shutil.rmtree(path, ignore_errors=True)
+                    notes.append("removed leftover {}".format(entry))
+                else:
+                    notes.append("left {} in place (not stashed)".format(
+                        path))
+        self._installed = None
+        return notes
+
+    @contextmanager
+    def _reading(self):
+        """Shared lock for read-only pip calls (no-op inside a mutation)."""
+        if getattr(self._local, "depth", 0):
+            yield
+            return
+        with self.scheduler.read():
+            yield
+
+    def _run_read(self, cmd, stream_cb=None):
+        with self._reading():
+            return self._run(cmd, stream_cb)
+
+    def _stash_root(self):
+        key = hashlib.sha1(self.qgis_python_path.encode()).hexdigest()
+        return self.cache_dir / "stashes" / key[:12]
+
+    def _make_stash(self, names, label, closure=True):
+        """
+        Stash ``names`` (plan items) or, with ``closure``, their
+        dependency closure. A dependency outside it that the operation
+        replaces cannot be restored; rollback keeps its new version.
+        """
+        sites = self.site_packages()
+        root = self._stash_root()
+        root.mkdir(parents=True, exist_ok=True)
+        stash.prune(root, self.stash_max_age_days)
+        if closure:
+            keys = distinfo.dependency_closure(sites, names)
+        else:
+            keys = [normalize(n) for n in names]
+        return stash.create(root, sites, keys, label)
+
+    def verify_imports(self, names):
+        """Import the top-level modules of ``names`` in the target env."""
+        sites = self.site_packages()
+        modules = []
+        for name in names:
+            entry = distinfo.find_entry(sites, name)
+            if entry:
+                modules += distinfo.import_names(*entry)
+        if not modules:
+            return True, ""
+        rc, out, err = self._run_read([
+            self.qgis_python_path, "-c",
+            "; ".join("import {}".format(m) for m in modules)])
+        if rc == 0:
+            return True, ""
+        return False, ((err or out).strip().splitlines() or ["?"])[-1]
+
+    def _check_or_rollback(self, names, ok, msg):
+        """After the outermost mutation: roll back if imports now fail."""
+        if not ok or not self.auto_rollback or not self.last_stash:
+            return ok, msg
+        good, error = self.verify_imports(names)
+        if good:
+            return ok, msg
+        try:
+            actions = stash.rollback(self.last_stash)
+        except (OSError, ValueError) as exc:
+            actions = ["rollback failed: {}".format(exc)]
+        self.last_stash = None
+        return False, "{}\nImport check failed ({}); rolled back:\n{}".format(
+            msg, error, "\n".join(actions))
+
+    def list_stashes(self):
+        out = []
+        for folder in stash.list_stashes(self._stash_root()):
+            try:
+                manifest = stash.load(folder)
+            except (OSError, ValueError):
+                continue
+            out.append({"path": folder, "label": manifest.get("label", ""),
+                        "created": manifest.get("created", 0)})
+        return out
+
+    def undo_last(self):
+        """Roll back the most recent stashed operation."""
+        folder = self.last_stash
+        if not folder:
+            stashes = stash.list_stashes(self._stash_root())
+            folder = stashes[0] if stashes else None
+        if not folder:
+            return False, "Nothing to undo."
+        try:
+            with self._mutation([], "undo", stash_files=False):
+                actions = stash.rollback(folder)
+        except (OSError, ValueError) as exc:
+            return False, "Undo failed: {}".format(exc)
+        self.last_stash = None
+        return True, "Undo complete:\n" + "\n".join(actions)
+
     def _run(self, cmd, stream_cb=None):
-        """Run a subprocess. Inherits the parent environment."""
-        cwd = _safe_cwd()
+        """
+        Run a subprocess. Inherits the parent environment. A backend
+        command that fails, or whose executable is gone, is rerun with
+        pip. A pip call that fails on the network is retried on the next
+        healthy mirror.
+        """
+        fallback = getattr(cmd, "fallback", None)
+        try:
+            rc, out, err = self._exec(cmd, stream_cb)
+        except OSError as exc:
+            if not fallback:
+                raise
+            rc, out, err = 127, "", str(exc)
+        if rc != 0 and fallback:
+            if stream_cb:
+                stream_cb("{} {} - using pip.".format(
+                    self.backend().name,
+                    "cannot run this" if self.backend().unsupported(
+                        out + err) else "failed"))
+            cmd = fallback
+            rc, out, err = self._exec(cmd, stream_cb)
+        while rc != 0 and _NET_ERROR.search(out + err):
+            retry = self._failover(cmd, out + err)
+            if retry is None:
+                break
+            if stream_cb:
+                stream_cb("Index unreachable - retrying with {}".format(
+                    retry[retry.index("--index-url") + 1]))
+            cmd = retry
+            rc, out, err = self._exec(cmd, stream_cb)
+        if rc != 0 and _NET_ERROR.search(out + err):
+            NETWORK.failure()
+        return rc, out, err
 
-        if stream_cb:
-            proc = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, creationflags=SUBPROCESS_FLAGS, cwd=cwd)
-            lines = []
-            for line in proc.stdout:
-                lines.append(line)
-                stream_cb(line.rstrip())
-            proc.wait()
-            return proc.returncode, "".join(lines), ""
+    def _limits(self, cmd):
+        """(idle, total) timeouts in seconds for one command line."""
+        args = list(cmd)
+        if "pip" in args[:-1]:
+            sub = args[args.index("pip") + 1]
+        else:
+            sub = args[1] if len(args) > 1 else ""  # python -c, conda
+        if "--outdated" in args:
+            sub = "--outdated"
+        return _QUICK_LIMITS.get(sub, (self.idle_timeout,
+                                       self.total_timeout))
 
-        r = subprocess.run(
-            cmd, capture_output=True, text=True,
-            creationflags=SUBPROCESS_FLAGS, cwd=cwd)
-        return r.returncode, r.stdout, r.stderr
+    def _exec(self, cmd, stream_cb=None):
+        """Run under the watchdog; raises OperationCancelled on stop."""
+        idle, total = self._limits(cmd)
+        return self.supervisor.run(cmd, cwd=_safe_cwd(), stream_cb=stream_cb,
+                                   idle=idle, total=total)
 
     # -- package listing -------------------------------------------------------
 
     def get_installed_packages(self):
         """
         Query the target QGIS Python environment via subprocess.
+        In conda environments the result is merged with conda-meta and
+        every entry carries an ``owner`` ("pip" or "conda").
         Returns an empty list on any failure so the GUI never hangs.
         """
         try:
-            rc, out, err = self._run(
+            rc, out, err = self._run_read(
                 self._pip_args("list", "--format=json"))
-            if rc != 0:
-                return []
-            pkgs = json.loads(out)
-            if not pkgs:
-                return []
-            return sorted(pkgs, key=lambda x: x["name"].lower())
+            pkgs = json.loads(out) if rc == 0 else []
+        except OperationCancelled:
+            raise
         except Exception:
+            pkgs = []
+        if self.is_conda:
+            pkgs = merge_inventory(pkgs, self.get_conda_packages())
+        else:
+            pkgs = sorted(pkgs, key=lambda x: x["name"].lower())
+        if pkgs:
+            self._installed = None
+            self.inventory_delta()  # re-prime against this listing
+            self.save_inventory(pkgs)
+            if not self._env_file("baseline").exists():
+                self._record_baseline(pkgs)
+        return pkgs
+
+    def _record_baseline(self, pkgs):
+        """
+        Take the first listing as the baseline, minus what the user
+        installed. If there was any, the environment was not fresh and
+        the dependencies of those packages may not have shipped either.
+        """
+        user = self.user_installed()
+        self._write_env_file("baseline", {
+            normalize(p["name"]): p["version"] for p in pkgs
+            if normalize(p["name"]) not in user})
+        deps = set(distinfo.dependency_closure(self.site_packages(), user))
+        self._write_env_file("baseline_origin", {
+            "fresh": not user, "doubtful": sorted(deps - user)})
+
+    def _read_env_file(self, kind, default):
+        try:
+            return json.loads(
+                self._env_file(kind).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return default
+
+    def _write_env_file(self, kind, data):
+        try:
+            self._env_file(kind).write_text(
+                json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+        except OSError:
+            pass
+
+    def baseline(self):
+        """
+        {normalized name: version} of what the environment held when the
+        plugin first listed it, i.e. what shipped with QGIS.
+        """
+        return self._read_env_file("baseline", {})
+
+    def load_baseline(self, manifest_path):
+        """
+        Replace the baseline with a reference manifest: a requirements
+        file of pins, e.g. `pip freeze` of a pristine QGIS install.
+        """
+        try:
+            pins = _snapshot_pins(manifest_path)
+        except OSError as exc:
+            return False, str(exc)
+        if not pins:
+            return False, "No name==version pins in '{}'.".format(
+                manifest_path)
+        self._write_env_file("baseline", {
+            normalize(p["name"]): p["version"] for p in pins})
+        self._write_env_file("baseline_origin", {
+            "fresh": True, "manifest": str(manifest_path)})
+        return True, "Baseline set to {} package(s) from {}.".format(
+            len(pins), manifest_path)
+
+    def baseline_doubtful(self):
+        """
+        Baseline names that may not have shipped with QGIS: recorded as
+        dependencies of user-installed packages in a non-fresh
+        environment. Empty once a reference manifest was loaded.
+        """
+        origin = self._read_env_file("baseline_origin", None)
+        if origin is None:
+            # recorded before the origin was kept: judge it by today
+            user = self.user_installed()
+            if not user & set(self.baseline()):
+                return set()
+            return set(distinfo.dependency_closure(
+                self.site_packages(), user)) - user
+        return set(origin.get("doubtful", ()))
+
+    def baseline_needs_manifest(self):
+        """
+        True if the baseline was recorded after packages had been
+        installed and no reference manifest has replaced it yet.
+        """
+        origin = self._read_env_file("baseline_origin", None)
+        if origin is None:
+            return bool(self.user_installed() & set(self.baseline()))
+        return not origin.get("fresh", True)
+
+    def explicit_packages(self):
+        """Normalized names the user asked the plugin to install."""
+        return set(self._read_env_file("explicit", []))
+
+    def user_installed(self):
+        """
+        Normalized names installed on request: by the plugin or by pip
+        (REQUESTED marker), which a first listing does not count as
+        shipped with QGIS. When most distributions carry the marker the
+        packager's pip wrote it, and it says nothing about the user.
+        """
+        sites = self.site_packages()
+        requested = distinfo.requested(sites)
+        if len(requested) * 2 > len(distinfo.entries_by_name(sites)):
+            requested = set()
+        return self.explicit_packages() | requested
+
+    def _mark_explicit(self, names, requested=True):
+        keys = {normalize(n) for n in names}
+        current = self.explicit_packages()
+        updated = (current | keys) if requested else (current - keys)
+        if updated != current:
+            self._write_env_file("explicit", sorted(updated))
+
+    def _env_file(self, kind):
+        """Per-environment JSON file in the cache folder."""
+        key = hashlib.sha1(self.qgis_python_path.encode()).hexdigest()
+        return self.cache_dir / "{}_{}.json".format(kind, key[:12])
+
+    def _inventory_path(self):
+        return self._env_file("inventory")
+
+    def save_inventory(self, packages):
+        """Persist a listing with the fingerprint it was taken at."""
+        data = {"site": self._site_probe(),
+                "fingerprint": self.environment_fingerprint(),
+                "packages": packages}
+        try:
+            self._inventory_path().write_text(
+                json.dumps(data), encoding="utf-8")
+        except OSError:
+            pass
+
+    def last_inventory(self):
+        """
+        (packages, current) from the last saved listing, where current
+        is False if site-packages changed since; (None, False) without
+        one. Needs no subprocess: the site folders are stored with it.
+        """
+        try:
+            data = json.loads(
+                self._inventory_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None, False
+        site = data.get("site") or {}
+        if not site.get("dirs") or not all(
+                Path(d).is_dir() for d in site["dirs"]):
+            return None, False
+        if self._site_info is None:
+            self._site_info = site
+        return (data.get("packages") or None,
+                data.get("fingerprint") == self.environment_fingerprint())
+
+    def cached_inventory(self):
+        """The last saved listing if nothing changed on disk since."""
+        packages, current = self.last_inventory()
+        return packages if current else None
+
+    def warm(self):
+        """
+        Run the start-up probes ahead of time (pip version, site folders,
+        package listing, metadata and advisory indexes) so a dialog
+        opened later has them at hand, and keep pip's cache within its
+        budget. Meant for a background thread while the host application
+        idles.
+        """
+        self.pip_ver
+        if self.cached_inventory() is None:
+            try:
+                self.get_installed_packages()
+            except OperationCancelled:
+                return  # QGIS is closing or the plugin unloading
+        self.name_index.load()
+        self.metadata_index().refresh()
+        self.advisories.load()
+        if self.pip_cache_budget_mb:
+            self.prune_pip_cache()
+
+    def inventory_delta(self):
+        """
+        Distributions added and removed on disk since the last call
+        (or since the last full listing), read straight from metadata.
+        The first call only primes the view and returns nothing.
+        """
+        if self._installed is None:
+            self._installed = distinfo.InstalledSet(self.site_packages())
+            self._installed.refresh()
+            return [], []
+        added, removed = self._installed.refresh()
+        for r in added:
+            r["owner"] = ("conda" if self.is_conda
+                          and self.conda_owned(r["name"]) else "pip")
+        return added, removed
+
+    def requirement_graph(self):
+        """Reverse-dependency index of this environment (see distinfo)."""
+        if self._graph is None:
+            self._graph = distinfo.RequirementGraph(self.site_packages())
+        return self._graph
+
+    def required_by(self, package_name):
+        """Installed packages that directly require ``package_name``."""
+        return self.requirement_graph().required_by(package_name)
+
+    def uninstall_impact(self, package_name):
+        """
+        Packages that would lose a requirement if ``package_name`` were
+        removed: {name: depth}, 1 for direct dependents.
+        """
+        return self.requirement_graph().impact(package_name)
+
+    def metadata_index(self):
+        """Full-text index of installed metadata (see textindex)."""
+        if self._text_index is None:
+            self._text_index = MetadataIndex(self.site_packages())
+        return self._text_index
+
+    def search_installed(self, query, limit=None):
+        """
+        Installed packages matching ``query``, best first, as
+        [(name, score, [fields matched])]; supports ``license:GPL``
+        style field filters.
+        """
+        return self.metadata_index().search(query, limit)
+
+    def get_conda_packages(self, details=False):
+        """conda-owned packages of this environment, read in-process."""
+        if not self.is_conda:
             return []
+        return list_conda_packages(self.conda_prefix, details=details)
+
+    def conda_owned(self, package_name):
+        key = normalize(package_name.split("==")[0])
+        return any(normalize(r["name"]) == key
+                   for r in self.get_conda_packages())
 
     def get_outdated_packages(self):
-        rc, out, _ = self._run(
+        NETWORK.allow()
+        rc, out, _ = self._run_read(
             self._pip_args("list", "--outdated", "--format=json"))
         try:
             return json.loads(out) if rc == 0 else []
@@ -166,33 +1168,503 @@ class QGISPipManager:
 
     def install_package(self, package_name, version=None, stream_cb=None):
         spec = "{}=={}".format(package_name, version) if version else package_name
-        rc, out, err = self._run(
-            self._pip_args("install", "--upgrade", spec), stream_cb)
-        return ((True, "Installed {}.".format(spec))
-                if rc == 0 else (False, err or out))
+        names = _spec_names([spec])
+        blocked = self.protected_conflicts([spec])
+        if blocked:
+            return False, "\n".join(blocked)
+        with self._mutation(names, "install " + spec,
+                            stream_cb=stream_cb) as outermost:
+            rc, out, err = self._run(
+                self._install_args("--upgrade", spec), stream_cb)
+            ok, msg = ((True, "Installed {}.".format(spec))
+                       if rc == 0 else
+                       (False, self._explain_failure(err or out)))
+            if outermost:
+                ok, msg = self._check_or_rollback(names, ok, msg)
+                if ok:
+                    self._mark_explicit(names)
+        return ok, msg
 
     def uninstall_package(self, package_name, stream_cb=None):
-        rc, out, err = self._run(
-            self._pip_args("uninstall", "-y", package_name), stream_cb)
+        with self._mutation([package_name], "uninstall " + package_name,
+                            closure=False, stream_cb=stream_cb):
+            rc, out, err = self._run(
+                self._pip_local("uninstall", "-y", package_name), stream_cb)
+        if rc == 0:
+            self._mark_explicit([package_name], requested=False)
         return ((True, "Uninstalled {}.".format(package_name))
                 if rc == 0 else (False, err or out))
 
-    def install_packages_list(self, packages, stream_cb=None):
+    def uninstall_packages(self, package_names, stream_cb=None):
+        """Remove several distributions with a single pip invocation."""
+        names = list(package_names)
+        if not names:
+            return True, "Nothing to uninstall."
+        with self._mutation(names, "uninstall {} package(s)".format(
+                len(names)), closure=False, stream_cb=stream_cb):
+            rc, out, err = self._run(
+                self._pip_local("uninstall", "-y", *names), stream_cb)
+        removed = _uninstalled_names(out + err)
+        self._mark_explicit(removed, requested=False)
+        return rc == 0, _batch_report(names, removed, rc, err or out)
+
+    def upgrade_packages(self, package_names, stream_cb=None):
+        """Upgrade several distributions with a single pip invocation."""
+        core = self.protected_core()
+        names = [n for n in package_names if normalize(n) not in core]
+        held = [n for n in package_names if normalize(n) in core]
+        if not names:
+            return False, "All selected packages are protected QGIS core " \
+                          "packages."
+        with self._mutation(names, "upgrade {} package(s)".format(
+                len(names)), stream_cb=stream_cb) as outermost:
+            rc, out, err = self._run(
+                self._install_args("--upgrade", *names), stream_cb)
+            ok = rc == 0
+            msg = _batch_report(names, _installed_names(out + err), rc,
+                                self._explain_failure(err or out))
+            msg += "".join("\nHELD {} (protected QGIS core)".format(n)
+                           for n in held)
+            if outermost:
+                ok, msg = self._check_or_rollback(names, ok, msg)
+        return ok, msg
+
+    def reinstall_packages(self, package_names, stream_cb=None):
+        """
+        Reinstall the installed versions of several distributions in one
+        pip call (--force-reinstall --no-deps), e.g. to repair files.
+        """
+        sites = self.site_packages()
+        specs, names = [], list(package_names)
+        for name in names:
+            entry = distinfo.find_entry(sites, name)
+            version = entry and distinfo.read_headers(
+                distinfo.metadata_file(*entry)).get("Version")
+            specs.append("{}=={}".format(name, version) if version else name)
+        with self._mutation(names, "reinstall {} package(s)".format(
+                len(names)), closure=False,
+                stream_cb=stream_cb) as outermost:
+            rc, out, err = self._run(self._install_args(
+                "--force-reinstall", "--no-deps", *specs), stream_cb)
+            ok = rc == 0
+            msg = _batch_report(names, _installed_names(out + err), rc,
+                                err or out)
+            if outermost:
+                ok, msg = self._check_or_rollback(names, ok, msg)
+        return ok, msg
+
+    def orphans(self):
+        """
+        Installed distributions that nothing requires, were not asked
+        for explicitly (by the plugin or via pip's REQUESTED marker) and
+        did not ship with QGIS. Rows: name, version, size, round
+        (1 = nothing requires it now, 2+ = orphaned once earlier rounds
+        are removed), freed_by (the earlier rows that require it) and
+        doubtful (it is in a baseline that may hold user installs).
+        """
+        # requested packages are kept before peeling, so their own
+        # requirements are never offered as later-round orphans; baseline
+        # entries that may be leftovers of user installs are not kept
+        doubtful = self.baseline_doubtful()
+        keep = self.user_installed() | (set(self.baseline()) - doubtful) | {
+            "pip", "setuptools", "wheel"}
+        keep |= distinfo.requested(self.site_packages())
+        if self.is_conda:
+            keep |= {normalize(r["name"]) for r in self.get_conda_packages()}
+        rows = []
+        for name, (site_dir, entry), rnd, freed_by in \
+                self.requirement_graph().orphans(keep):
+            headers = distinfo.read_headers(
+                distinfo.metadata_file(site_dir, entry))
+            rows.append({"name": name,
+                         "version": headers.get("Version", ""),
+                         "size": distinfo.installed_size(site_dir, entry),
+                         "round": rnd, "freed_by": freed_by,
+                         "doubtful": normalize(name) in doubtful})
+        return rows
+
+    def install_packages_list(self, packages, stream_cb=None,
+                              explicit=True):
         results, all_ok = [], True
-        for spec in packages:
-            spec = spec.strip()
-            if not spec or spec.startswith("#"):
+        specs = [p.strip() for p in packages
+                 if p.strip() and not p.strip().startswith("#")]
+        plan = self._batch_plan(specs, stream_cb)
+        if plan is not None:
+            return self.install_plan(plan, stream_cb=stream_cb,
+                                     explicit=explicit)
+        names = _spec_names(specs)
+        with self._mutation(names, "install {} package(s)".format(
+                len(specs)), stream_cb=stream_cb) as outermost:
+            for spec in specs:
+                ok, msg = self.install_package(spec, stream_cb=stream_cb)
+                results.append(
+                    "{} {}: {}".format("OK" if ok else "FAIL", spec, msg))
+                if not ok:
+                    all_ok = False
+            msg = "\n".join(results)
+            if outermost:
+                all_ok, msg = self._check_or_rollback(names, all_ok, msg)
+                if all_ok and explicit:
+                    self._mark_explicit(names)
+        return all_ok, msg
+
+    def plugin_requirements(self, plugin_dirs=None):
+        """
+        Python packages installed QGIS plugins need but this environment
+        lacks (see plugin_deps); ``plugin_dirs`` defaults to the current
+        profile. Import-guessed rows get "on_index" (False when the name
+        index is loaded and does not know the project, else True/None).
+        """
+        sites = self.site_packages()
+        installed, owners = {}, {}
+        for key, (site_dir, entry) in distinfo.entries_by_name(
+                sites).items():
+            installed[key] = distinfo.read_headers(
+                distinfo.metadata_file(site_dir, entry)).get("Version", "")
+            for module in distinfo.import_names(site_dir, entry):
+                owners.setdefault(module.split(".")[0], key)
+        for site_dir in sites:
+            # loose modules without metadata still import fine
+            try:
+                owners.update((n[:-3] if n.endswith(".py") else n, "")
+                              for n in os.listdir(site_dir)
+                              if n.endswith(".py") or n.isidentifier())
+            except OSError:
                 continue
-            ok, msg = self.install_package(spec, stream_cb=stream_cb)
-            results.append(
-                "{} {}: {}".format("OK" if ok else "FAIL", spec, msg))
-            if not ok:
-                all_ok = False
-        return all_ok, "\n".join(results)
+        cache = plugin_deps.ImportCache(
+            self.cache_dir / "plugin_imports.json")
+        rows = plugin_deps.scan(
+            plugin_dirs or plugin_deps.default_plugin_dirs(),
+            installed, owners, cache)
+        self.name_index.load()
+        for row in rows:
+            if row["source"] != "import":
+                continue
+            if not len(self.name_index):
+                row["on_index"] = None
+                continue
+            hits = self.name_index.search(row["requirement"], 1)
+            row["on_index"] = bool(hits) and normalize(
+                hits[0]) == normalize(row["requirement"])
+        return rows
+
+    def _batch_plan(self, specs, stream_cb=None):
+        """
+        Resolve several specs at once so their files can be downloaded
+        in parallel; None falls back to installing them one by one.
+        """
+        if (len(specs) < 2 or not self.parallel_downloads
+                or getattr(self._local, "depth", 0)
+                or self.pip_ver < (22, 2, 0)):
+            return None
+        if stream_cb:
+            stream_cb("Resolving {} package(s)...".format(len(specs)))
+        try:
+            return self.resolve_plan(specs, upgrade=True)
+        except (RuntimeError, OSError, ValueError) as exc:
+            if stream_cb:
+                stream_cb("Resolving failed ({}); installing one by "
+                          "one.".format((str(exc).splitlines() or ["?"])[-1]))
+            return None
+
+    # -- import-time profiling -------------------------------------------------
+
+    def profile_imports(self, package_names=None, stream_cb=None):
+        """
+        Time the import of each top-level module of the given installed
+        packages (all of them when None) in isolated subprocesses.
+        Rows: package, version, module, self_us, cumulative_us, modules
+        or error. Unchanged package versions come from the cache.
+        """
+        sites = self.site_packages()
+        if package_names is None:
+            entries = distinfo.metadata_dirs(sites)
+        else:
+            entries = [e for e in (distinfo.find_entry(sites, n)
+                                   for n in package_names) if e]
+        dists = []
+        for site_dir, entry in entries:
+            record = distinfo.read_record(site_dir, entry)
+            modules = distinfo.import_names(site_dir, entry)
+            if record and modules:
+                record["modules"] = modules
+                dists.append(record)
+        cache = ImportProfileCache(str(self.cache_dir / "importtime.json"))
+        return profile_distributions(
+            self.qgis_python_path, dists, cache, progress_cb=stream_cb,
+            creationflags=SUBPROCESS_FLAGS, cwd=_safe_cwd())
+
+    # -- pre-resolved plans ----------------------------------------------------
+
+    def _plan_path(self, packages, upgrade=False):
+        key = "\n".join([self.qgis_python_path] + sorted(packages))
+        if upgrade:
+            key += "\n--upgrade"
+        return (self.cache_dir / "plans" /
+                "{}.json".format(hashlib.sha1(key.encode()).hexdigest()))
+
+    def cached_plan(self, packages):
+        """The stored plan for ``packages`` if it still fits this env."""
+        try:
+            plan = json.loads(
+                self._plan_path(packages).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if (plan.get("fingerprint") != self.environment_fingerprint()
+                or plan.get("index") != self._index_key()):
+            return None
+        return plan
+
+    def resolve_plan(self, packages, upgrade=False):
+        """
+        Resolve ``packages`` against the current environment with
+        `pip install --dry-run --report` and cache the pinned result.
+        Each item records what would change and its download size.
+        """
+        if self.pip_ver < (22, 2, 0):
+            raise RuntimeError("pip >= 22.2 is needed to pre-resolve.")
+        fingerprint = self.environment_fingerprint()
+        fd, report = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            flags = ["--upgrade"] if upgrade else []
+            rc, out, err = self._run_read(self._install_args(
+                "--dry-run", "--quiet", "--report", report,
+                *(flags + list(packages))))
+            if rc != 0:
+                raise RuntimeError(self._explain_failure((err or out).strip()))
+            data = json.loads(Path(report).read_text(encoding="utf-8"))
+        finally:
+            os.unlink(report)
+
+        installed = {normalize(p["name"]): p["version"]
+                     for p in self.get_installed_packages()}
+        items = []
+        for entry in data.get("install", []):
+            meta = entry.get("metadata", {})
+            info = entry.get("download_info", {})
+            items.append({
+                "name": meta.get("name", ""),
+                "version": meta.get("version", ""),
+                "installed": installed.get(normalize(meta.get("name", ""))),
+                "url": info.get("url", ""),
+                "sha256": info.get("archive_info", {}).get(
+                    "hashes", {}).get("sha256", ""),
+                "size": None,
+            })
+
+        def size_of(item):
+            try:
+                if item["url"].startswith("file:"):
+                    from urllib.request import url2pathname
+                    return os.path.getsize(
+                        url2pathname(urlsplit(item["url"]).path))
+                _, headers, _ = _fetch_url(item["url"], method="HEAD")
+                return int(headers.get("content-length", ""))
+            except Exception:
+                return None
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for item, size in zip(items, pool.map(size_of, items)):
+                item["size"] = size
+
+        plan = {"packages": list(packages), "fingerprint": fingerprint,
+                "index": self._index_key(), "items": items,
+                "created": datetime.now().isoformat(timespec="seconds")}
+        path = self._plan_path(packages, upgrade)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(plan, indent=1), encoding="utf-8")
+        return plan
+
+    def _download_plan(self, items, stream_cb=None):
+        """
+        Fetch every file of a plan in parallel into the wheel cache.
+        Returns the cache folder, or None when some item cannot be
+        fetched directly (sdists, VCS or local directory requirements).
+        """
+        # http.client has no proxy support here; pip handles proxies
+        if not self.parallel_downloads or self.proxy or not all(
+                downloader.downloadable(i) for i in items):
+            return None
+        dest = str(self.cache_dir / "wheels")
+        downloader.prune(dest, self.wheel_cache_days)
+        if stream_cb:
+            stream_cb("Downloading {} file(s), {} at a time...".format(
+                len(items), self.parallel_downloads))
+        downloader.fetch_all(items, dest, _open_url,
+                             workers=self.parallel_downloads,
+                             progress_cb=stream_cb)
+        return dest
+
+    def install_plan(self, plan, stream_cb=None, explicit=True):
+        """
+        Install a resolved plan exactly, without running the resolver.
+        The wheels are downloaded in parallel first, under the write lock
+        so a cache prune cannot race them, and installed with --no-index
+        from the local cache; pip installs from the index if that fails.
+        """
+        items = plan.get("items", [])
+        if not items:
+            return True, "Nothing to install - already satisfied."
+        hashed = all(i.get("sha256") for i in items)
+        lines = []
+        for i in items:
+            lines.append("{}=={}{}".format(
+                i["name"], i["version"],
+                " --hash=sha256:{}".format(i["sha256"]) if hashed else ""))
+        tmp = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".txt", delete=False, encoding="utf-8")
+        tmp.write("\n".join(lines) + "\n")
+        tmp.close()
+        names = [i["name"] for i in items]
+        try:
+            args = ["--no-deps", "-r", tmp.name]
+            if hashed:
+                args.append("--require-hashes")
+            with self._mutation(names, "install plan", closure=False,
+                                stream_cb=stream_cb) as outermost:
+                try:
+                    local = self._download_plan(items, stream_cb)
+                except RuntimeError as exc:
+                    if stream_cb:
+                        stream_cb("{} - letting pip download "
+                                  "instead.".format(exc))
+                    local = None
+                rc = None
+                if local:
+                    rc, out, err = self._run(self._pip_local(
+                        "install", *args, "--no-index", "--find-links",
+                        local, *self._constraint_args()), stream_cb)
+                    if rc != 0 and stream_cb:
+                        stream_cb("Installing from the downloaded files "
+                                  "failed - letting pip download instead.")
+                if rc != 0:
+                    rc, out, err = self._run(
+                        self._install_args(*args), stream_cb)
+                ok, msg = ((True, "Installed {} package(s) from the cached "
+                            "plan.".format(len(items)))
+                           if rc == 0 else (False, err or out))
+                if outermost:
+                    ok, msg = self._check_or_rollback(names, ok, msg)
+                if ok:
+                    self._settle_requested(
+                        _spec_names(plan.get("packages", [])), names,
+                        explicit)
+        finally:
+            os.unlink(tmp.name)
+        return ok, msg
+
+    def _settle_requested(self, requested, installed, explicit):
+        """
+        A plan installs its whole closure with -r, which makes pip mark
+        every item REQUESTED; keep the marker only on what was asked for.
+        """
+        wanted = {normalize(n) for n in requested}
+        sites = self.site_packages()
+        for name in installed:
+            if normalize(name) in wanted:
+                continue
+            entry = distinfo.find_entry(sites, name)
+            if entry:
+                try:
+                    os.unlink(os.path.join(entry[0], entry[1], "REQUESTED"))
+                except OSError:
+                    pass
+        if explicit:
+            self._mark_explicit(wanted)
+
+    def install_preset(self, packages, stream_cb=None):
+        """Run the cached plan, re-resolving first if the env changed."""
+        if self.pip_ver < (22, 2, 0):
+            return self.install_packages_list(packages, stream_cb=stream_cb)
+        plan = self.cached_plan(packages)
+        if plan is None:
+            if stream_cb:
+                stream_cb("Environment changed - resolving preset...")
+            try:
+                plan = self.resolve_plan(packages)
+            except RuntimeError as exc:
+                return False, str(exc)
+        return self.install_plan(plan, stream_cb=stream_cb)
 
     # -- versions --------------------------------------------------------------
 
+    def supported_tags(self):
+        """Wheel tags the target interpreter accepts (empty if unknown)."""
+        if self._tags is None:
+            rc, out, _ = self._run([self.qgis_python_path, "-c", _TAGS_PROBE])
+            self._tags = set(out.split()) if rc == 0 else set()
+        return self._tags
+
+    def cached_version_info(self, package_name, max_age=600):
+        hit = self._versions_cache.get(normalize(package_name))
+        if hit and time.time() - hit[0] < max_age:
+            return hit[1]
+        return None
+
+    def cached_details(self, package_name):
+        return self._details_cache.get(normalize(package_name))
+
+    def prefetch(self, package_name):
+        """Warm the versions and details caches for one package."""
+        if self.cached_version_info(package_name) is None:
+            try:
+                self.get_version_info(package_name)
+            except Exception:
+                pass
+        if self.cached_details(package_name) is None:
+            self.get_package_details(package_name)
+
+    def get_version_info(self, package_name):
+        """
+        Installable releases from the simple API, newest first (PEP 440).
+        Keeps only versions whose Requires-Python admits the target
+        interpreter and that ship a compatible wheel or an sdist; each
+        entry is {"version", "wheel", "prerelease"} where wheel False
+        means pip would have to build from source. While offline the
+        last result is returned whatever its age.
+        """
+        try:
+            files = self.simple_project(package_name)
+        except Exception as exc:
+            hit = self._versions_cache.get(normalize(package_name))
+            if hit and (isinstance(exc, Offline) or is_network_error(exc)):
+                return hit[1]
+            raise
+        py = ".".join(str(x) for x in self._site_probe()["version"])
+        tags = self.supported_tags()
+        releases = {}
+        for f in files:
+            if f.get("yanked"):
+                continue
+            version = _file_version(f["filename"], package_name)
+            if not version:
+                continue
+            if py and not specifier_contains(
+                    f.get("requires-python") or "", py):
+                continue
+            entry = releases.setdefault(version, {"wheel": False,
+                                                  "sdist": False})
+            if f["filename"].endswith(".whl"):
+                if not tags or wheel_tags(f["filename"]) & tags:
+                    entry["wheel"] = True
+            else:
+                entry["sdist"] = True
+        keyed = sorted(((version_key(v), v, e) for v, e in releases.items()
+                        if e["wheel"] or e["sdist"]), reverse=True)
+        infos = [{"version": v, "wheel": e["wheel"],
+                  "prerelease": is_prerelease(v)}
+                 for _, v, e in keyed]
+        self._versions_cache[normalize(package_name)] = (time.time(), infos)
+        return infos
+
     def get_package_versions(self, package_name):
+        try:
+            return [i["version"] for i in self.get_version_info(package_name)]
+        except Offline:
+            raise
+        except Exception:
+            pass
         if self.pip_ver >= (22, 0, 0):
             rc, out, _ = self._run(
                 self._pip_args("index", "versions", package_name))
@@ -205,7 +1677,8 @@ class QGISPipManager:
     def _pypi_versions(self, package_name):
         try:
             data = _fetch_json("pypi.org", "/pypi/{}/json".format(package_name))
-            return sorted(data.get("releases", {}).keys(), reverse=True)[:40]
+            return sorted(data.get("releases", {}).keys(), key=version_key,
+                          reverse=True)
         except Exception as exc:
             return ["Error: {}".format(exc)]
 
@@ -224,17 +1697,80 @@ class QGISPipManager:
                 "requires_python": info.get("requires_python", ""),
                 "license": info.get("license", ""),
             }
+        except Offline as exc:
+            return {"error": str(exc), "offline": True}
         except Exception as exc:
             return {"error": str(exc)}
 
+    def index_urls(self):
+        """Ranked main index / mirrors plus any extra indexes."""
+        urls = (self.ranked_indexes() if self.mirrors.split()
+                else [self.index_url or DEFAULT_INDEX_URL])
+        urls += self.extra_index_url.split()
+        return urls
+
+    def update_name_index(self, max_age=86400):
+        """
+        Load the on-disk name index, refresh any source older than
+        ``max_age`` seconds with a conditional request and build the
+        trigram index for fuzzy search. Returns (number of names,
+        [refresh errors]); raises if no names are available at all.
+        """
+        self.name_index.load()
+        errors = []
+        # one copy of the main index's names, not one per mirror
+        for url in self.index_urls()[:1] + self.extra_index_url.split():
+            try:
+                self.name_index.refresh(url, _fetch_url, max_age=max_age)
+            except Exception as exc:
+                errors.append("{}: {}".format(url, exc))
+        if not len(self.name_index):
+            raise RuntimeError("; ".join(errors) or "The index lists no "
+                               "projects.")
+        self.name_index.prepare()
+        return len(self.name_index), errors
+
+    def search_names(self, query, limit=20):
+        return self.name_index.search(query, limit)
+
+    def simple_project(self, package_name):
+        """
+        Files of a project from the first configured index that has it,
+        as PEP 691 dicts (filename, url, hashes, requires-python, yanked).
+        """
+        last_error = None
+        for index in self.index_urls():
+            url = "{}/{}/".format(index.rstrip("/"), normalize(package_name))
+            try:
+                status, headers, body = _fetch_url(url, headers={
+                    "Accept": "{}, text/html;q=0.1".format(SIMPLE_JSON)})
+            except Offline:
+                raise
+            except Exception as exc:
+                last_error = exc
+                if self.mirrors.split() and index in self.mirror_candidates():
+                    self.mirror_set.mark_failed(index, str(exc))
+                continue
+            if status != 200:
+                last_error = RuntimeError("HTTP {} for {}".format(status, url))
+                continue
+            if SIMPLE_JSON in headers.get("content-type", ""):
+                return json.loads(body.decode("utf-8")).get("files", [])
+            return _parse_simple_html(body, url)
+        raise last_error or RuntimeError(
+            "'{}' not found on any index.".format(package_name))
+
     # -- details / conflicts ---------------------------------------------------
 
     def get_package_details(self, package_name):
-        rc, out, err = self._run(self._pip_args("show", package_name))
-        return out if rc == 0 else "Not found.\n{}".format(err)
+        rc, out, err = self._run_read(self._pip_args("show", package_name))
+        if rc == 0:
+            self._details_cache[normalize(package_name)] = out
+            return out
+        return "Not found.\n{}".format(err)
 
     def check_conflicts(self):
-        rc, out, err = self._run(self._pip_args("check"))
+        rc, out, err = self._run_read(self._pip_args("check"))
         return rc == 0, (out or err).strip() or "No conflicts detected."
 
     def dry_run_install(self, package_name, version=None):
@@ -242,35 +1778,192 @@ class QGISPipManager:
             return self.check_conflicts()
         spec = "{}=={}".format(
             package_name, version) if version else package_name
-        rc, out, err = self._run(
-            self._pip_args("install", "--dry-run", spec))
+        blocked = self.protected_conflicts([spec])
+        if blocked:
+            return False, "\n".join(blocked)
+        rc, out, err = self._run_read(
+            self._install_args("--dry-run", spec))
         return rc == 0, (out + err).strip()
 
     # -- requirements.txt ------------------------------------------------------
 
-    def export_requirements(self, file_path):
-        rc, out, err = self._run(self._pip_args("freeze"))
+    def export_requirements(self, file_path, locked=False):
+        rc, out, err = self._run_read(self._pip_args("freeze"))
         if rc != 0:
             return False, err
+        if locked:
+            ok, out = self.lock_requirements(out)
+            if not ok:
+                return False, out
         try:
             Path(file_path).write_text(out, encoding="utf-8")
             return True, "Exported to:\n{}".format(file_path)
         except OSError as exc:
             return False, str(exc)
 
-    def import_requirements(self, file_path, stream_cb=None):
+    def lock_requirements(self, freeze_text):
+        """
+        Turn `pip freeze` output into a hash lock: every pin gets the
+        sha256 of each file the index offers for that version, and the
+        header marks the set as complete so it installs with --no-deps.
+        Returns (False, reason) if any line cannot be locked.
+        """
+        pins, bad = [], []
+        for line in freeze_text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            m = _PIN.match(line)
+            if m:
+                pins.append(m.groups())
+            else:
+                bad.append(line)
+        if bad:
+            return False, "Cannot lock unpinned or local entries:\n" + \
+                "\n".join(bad)
+
+        def hashes_for(pin):
+            name, version = pin
+            try:
+                files = self.simple_project(name)
+            except Exception:
+                return pin, []
+            return pin, sorted({
+                f["hashes"]["sha256"] for f in files
+                if f.get("hashes", {}).get("sha256")
+                and _file_version(f["filename"], name) == version})
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            locked = list(pool.map(hashes_for, pins))
+        missing = ["{}=={}".format(*pin) for pin, h in locked if not h]
+        if missing:
+            return False, "No hashes found on the index for:\n" + \
+                "\n".join(missing)
+
+        lines = [LOCK_MARKER,
+                 "# generated {} - install with --no-deps "
+                 "--require-hashes".format(
+                     datetime.now().strftime("%Y-%m-%d %H:%M"))]
+        for (name, version), hashes in locked:
+            lines.append("{}=={} \\".format(name, version))
+            lines += ["    --hash=sha256:{}{}".format(
+                h, " \\" if i < len(hashes) - 1 else "")
+                for i, h in enumerate(hashes)]
+        return True, "\n".join(lines) + "\n"
+
+    @staticmethod
+    def is_lock_file(file_path):
+        try:
+            with open(file_path, encoding="utf-8") as fh:
+                return fh.readline().strip() == LOCK_MARKER
+        except OSError:
+            return False
+
+    def import_requirements(self, file_path, stream_cb=None, explicit=True):
         try:
             lines = Path(file_path).read_text(encoding="utf-8").splitlines()
         except OSError as exc:
             return False, str(exc)
-        return self.install_packages_list(lines, stream_cb=stream_cb)
+        if not self.is_lock_file(file_path):
+            return self.install_packages_list(
+                lines, stream_cb=stream_cb, explicit=explicit)
+        names = _spec_names(lines)
+        with self._mutation(names, "install lock " + Path(
+                file_path).name, closure=False,
+                stream_cb=stream_cb) as outermost:
+            requested = distinfo.requested(self.site_packages())
+            rc, out, err = self._run(self._install_args(
+                "--no-deps", "--require-hashes",
+                "-r", str(file_path)), stream_cb)
+            ok, msg = ((True, "Installed hash-locked set from {}.".format(
+                file_path)) if rc == 0 else
+                (False, self._explain_failure(err or out)))
+            if outermost:
+                ok, msg = self._check_or_rollback(names, ok, msg)
+            if ok:
+                # a lock pins the whole closure; keep the markers it had
+                self._settle_requested(requested, names, False)
+        return ok, msg
+
+    # -- pip cache -------------------------------------------------------------
+
+    def pip_cache_dir(self):
+        """pip's cache folder for the target interpreter ("" if disabled)."""
+        if self._pip_cache is None:
+            rc, out, _ = self._run(
+                [self.qgis_python_path, "-m", "pip", "cache", "dir"])
+            lines = out.strip().splitlines()
+            self._pip_cache = lines[-1].strip() if rc == 0 and lines else ""
+        return self._pip_cache
+
+    def _cache_roots(self):
+        """[(folder, kind)] of pip's cache and the plan download folder."""
+        roots = []
+        base = self.pip_cache_dir()
+        if base:
+            roots += [(os.path.join(base, sub), kind)
+                      for sub, kind in pipcache.PIP_FOLDERS]
+        roots.append((str(self.cache_dir / "wheels"), "downloads"))
+        return roots
+
+    def _scan_cache(self):
+        if self._cache_scan is None:
+            self._cache_scan = pipcache.CacheScan(
+                self.cache_dir / "pip_cache_scan.json")
+        return self._cache_scan.scan(self._cache_roots())
+
+    def snapshot_pins(self):
+        """(normalized name, version) pairs pinned by any snapshot."""
+        keep = set()
+        for path in self.list_snapshots():
+            try:
+                keep |= {(normalize(p["name"]), p["version"])
+                         for p in _snapshot_pins(path)}
+            except OSError:
+                continue
+        return keep
+
+    def pip_cache_info(self, top=25):
+        """
+        Size and entry counts of the caches, per kind ("http", "wheels",
+        "downloads"), and the ``top`` largest cached wheels.
+        """
+        info = pipcache.summarize(self._scan_cache(), self.snapshot_pins(),
+                                  top)
+        info["dir"] = self.pip_cache_dir()
+        info["budget"] = self.pip_cache_budget_mb * 1000000
+        return info
+
+    def prune_pip_cache(self, budget_mb=None):
+        """
+        Evict least recently used cache entries down to ``budget_mb``
+        (default: pip_cache_budget_mb), keeping wheels pinned by a
+        snapshot.
+        """
+        budget = self.pip_cache_budget_mb if budget_mb is None else budget_mb
+        if not budget:
+            return False, "No cache size budget set."
+        # not while pip of this environment may be reading the cache
+        with self.scheduler.write("prune pip cache"):
+            removed, freed = pipcache.prune(
+                self._scan_cache(), budget * 1000000, self.snapshot_pins(),
+                [root for root, _ in self._cache_roots()])
+        if not removed:
+            return True, "Cache already within {} MB.".format(budget)
+        return True, (
+            "Removed {} cache entries ({:.1f} MB) to fit {} MB.".format(
+                removed, freed / 1e6, budget))
 
     # -- snapshots -------------------------------------------------------------
 
-    def save_snapshot(self, label=""):
-        rc, out, err = self._run(self._pip_args("freeze"))
+    def save_snapshot(self, label="", locked=False):
+        rc, out, err = self._run_read(self._pip_args("freeze"))
         if rc != 0:
             return False, err
+        if locked:
+            ok, out = self.lock_requirements(out)
+            if not ok:
+                return False, out
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         safe = re.sub(r"[^\w\-]", "_", label)[:40]
         name = "snapshot_{}{}.txt".format(
@@ -278,6 +1971,10 @@ class QGISPipManager:
         path = self.snapshots_dir / name
         try:
             path.write_text(out, encoding="utf-8")
+            if self.is_conda:
+                _conda_state_path(path).write_text(json.dumps(
+                    self.get_conda_packages(details=True), indent=1),
+                    encoding="utf-8")
             return True, str(path)
         except OSError as exc:
             return False, str(exc)
@@ -287,16 +1984,74 @@ class QGISPipManager:
             self.snapshots_dir.glob("snapshot_*.txt"), reverse=True)]
 
     def restore_snapshot(self, snapshot_path, stream_cb=None):
-        return self.import_requirements(
-            snapshot_path, stream_cb=stream_cb)
+        ok, msg = self.import_requirements(
+            snapshot_path, stream_cb=stream_cb, explicit=False)
+        drift = self.conda_drift(snapshot_path)
+        if drift:
+            msg += "\nconda packages changed since this snapshot " \
+                   "(not restored by pip):\n" + "\n".join(drift)
+        return ok, msg
+
+    def conda_drift(self, snapshot_path):
+        """Describe conda packages that differ from a snapshot's state."""
+        state = _conda_state_path(Path(snapshot_path))
+        if not self.is_conda or not state.exists():
+            return []
+        try:
+            saved = {r["name"]: r["version"] for r in json.loads(
+                state.read_text(encoding="utf-8"))}
+        except (OSError, ValueError):
+            return []
+        now = {r["name"]: r["version"] for r in self.get_conda_packages()}
+        lines = []
+        for name in sorted(set(saved) | set(now)):
+            if saved.get(name) != now.get(name):
+                lines.append("  {}: {} -> {}".format(
+                    name, saved.get(name, "absent"),
+                    now.get(name, "absent")))
+        return lines
 
     def delete_snapshot(self, snapshot_path):
         try:
             Path(snapshot_path).unlink()
+            state = _conda_state_path(Path(snapshot_path))
+            if state.exists():
+                state.unlink()
             return True, "Snapshot deleted."
         except OSError as exc:
             return False, str(exc)
 
+    # -- vulnerability audit ---------------------------------------------------
+
+    def import_advisories(self, source):
+        """Index an OSV / PyPA advisory dump for offline audits."""
+        try:
+            count, projects = build_index(source, self.advisories.path)
+        except (OSError, ValueError) as exc:
+            return False, "Import failed: {}".format(exc)
+        if not count:
+            return False, "No PyPI advisories found in '{}'.".format(source)
+        return True, "Imported {} advisories for {} projects.".format(
+            count, projects)
+
+    def audit(self, packages=None):
+        """
+        Known advisories affecting ``packages`` (default: the installed
+        inventory) as {normalized name: [advisory, ...]}.
+        """
+        if packages is None:
+            packages = (self.cached_inventory()
+                        or self.get_installed_packages())
+        return self.advisories.audit(packages)
+
+    def audit_snapshot(self, snapshot_path):
+        """Like ``audit`` for the pins recorded in a snapshot file."""
+        try:
+            pins = _snapshot_pins(snapshot_path)
+        except OSError:
+            return {}
+        return self.advisories.audit(pins)
+
     # -- restart-free import ---------------------------------------------------
 
     @staticmethod
@@ -315,11 +2070,14 @@ class QGISPipManager:
     # -- conda -----------------------------------------------------------------
 
     def conda_install(self, package_name, stream_cb=None):
-        import shutil
         exe = shutil.which("mamba") or shutil.which("conda")
         if not exe:
             return False, "conda/mamba not found on PATH."
-        rc, out, err = self._run(
-            [exe, "install", "-y", package_name], stream_cb)
+        cmd = [exe, "install", "-y", package_name]
+        if self.conda_prefix:
+            cmd += ["--prefix", self.conda_prefix]
+        with self._mutation([package_name], "conda install " + package_name,
+                            stream_cb=stream_cb, stash_files=False):
+            rc, out, err = self._run(cmd, stream_cb)
         return ((True, "conda: installed {}.".format(package_name))
                 if rc == 0 else (False, err or out))
@@ -0,0 +1,229 @@
+"""
+stash.py - Fast, local undo for a single install / uninstall.
+Before an operation the files of every distribution it may touch (from
+their RECORD) are hard-linked into a stash folder, together with the
+list of metadata folders present at that moment. Rolling back deletes
+distributions that appeared since and links the stashed files back, so
+no download and no pip run is needed.
+pip unlinks files before writing new ones, so hard links keep the old
+content intact; copies are used where linking is not possible.
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from . import distinfo
+
+MANIFEST = "manifest.json"
+
+
+def _link_or_copy(src, dst, link=True):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def _unchanged(path, stored):
+    """True if ``path`` still is the stashed file (a link or a copy)."""
+    try:
+        a, b = os.stat(path), os.stat(stored)
+    except OSError:
+        return False
+    return a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns
+
+
+def _dist_files(site_dir, entry):
+    """Absolute paths owned by a distribution, including its metadata."""
+    files = set()
+    for rel in distinfo.record_paths(site_dir, entry):
+        files.add(os.path.normpath(os.path.join(site_dir, rel)))
+    meta = os.path.join(site_dir, entry)
+    if os.path.isdir(meta):
+        for name in os.listdir(meta):
+            files.add(os.path.join(meta, name))
+    elif os.path.isfile(meta):
+        files.add(meta)
+    return sorted(f for f in files if os.path.isfile(f))
+
+
+def can_link(root, site_dirs):
+    """
+    True if files of ``site_dirs`` can be hard-linked into ``root``,
+    found by linking one of them: a shared device is not enough where
+    the file system or fs.protected_hardlinks refuses links.
+    """
+    trial = os.path.join(str(root), ".link-test")
+    for site_dir, entry in distinfo.metadata_dirs(site_dirs):
+        src = os.path.join(site_dir, entry, "METADATA")
+        if not os.path.isfile(src):
+            continue
+        try:
+            if os.path.lexists(trial):
+                os.unlink(trial)
+            os.link(src, trial)
+        except OSError:
+            return False
+        try:
+            os.unlink(trial)
+        except OSError:
+            pass
+        return True
+    return False
+
+
+def create(root, site_dirs, names=None, label=""):
+    """
+    Stash the installed distributions ``names`` (None: all of them) and
+    return the stash folder. Names that are not installed only get
+    recorded as absent.
+    """
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    folder = os.path.join(str(root), stamp)
+    os.makedirs(os.path.join(folder, "files"))
+    link = can_link(root, site_dirs)
+    index = distinfo.entries_by_name(site_dirs)
+    if names is None:
+        names = sorted(index)
+    dists, n = [], 0
+    for key in names:
+        if key not in index:
+            continue
+        site_dir, entry = index[key]
+        files = {}
+        for path in _dist_files(site_dir, entry):
+            stored = os.path.join("files", str(n))
+            _link_or_copy(path, os.path.join(folder, stored), link)
+            files[path] = stored
+            n += 1
+        dists.append({"name": key, "site_dir": site_dir, "entry": entry,
+                      "files": files})
+    manifest = {
+        "label": label,
+        "created": time.time(),
+        "site_dirs": list(site_dirs),
+        "before": [list(e) for e in distinfo.metadata_dirs(site_dirs)],
+        "dists": dists,
+    }
+    with open(os.path.join(folder, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+    return folder
+
+
+def load(folder):
+    with open(os.path.join(folder, MANIFEST), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def stashed_tops(folder):
+    """(site_dir, top-level name) of every file stashed in ``folder``."""
+    tops = set()
+    for dist in load(folder)["dists"]:
+        for path in dist["files"]:
+            rel = os.path.relpath(path, dist["site_dir"])
+            tops.add((dist["site_dir"], rel.split(os.sep)[0]))
+    return tops
+
+
+def rollback(folder):
+    """
+    Put the environment back to the state recorded in ``folder``.
+    Files that are unchanged (same size and mtime) are left alone.
+    Returns a list of human-readable actions, including what could not
+    be restored (e.g. files locked by a running process); the stash is
+    removed only when everything was restored.
+    """
+    manifest = load(folder)
+    site_dirs = manifest["site_dirs"]
+    before = {tuple(e) for e in manifest["before"]}
+    stashed = {d["name"] for d in manifest["dists"]}
+    # projects installed before but not stashed: their new version is
+    # the only copy left, so it must not be deleted
+    unsaved = {distinfo.dist_key(e) for _, e in before} - stashed
+    actions, failed = [], []
+
+    emptied = set()
+    for site_dir, entry in distinfo.metadata_dirs(site_dirs):
+        if (site_dir, entry) in before:
+            continue
+        if distinfo.dist_key(entry) in unsaved:
+            actions.append("kept {} (the version it replaced was not "
+                           "stashed)".format(entry))
+            continue
+        left = []
+        for path in _dist_files(site_dir, entry):
+            try:
+                os.unlink(path)
+                emptied.add(os.path.dirname(path))
+            except OSError as exc:
+                left.append("could not remove {}: {}".format(path, exc))
+        shutil.rmtree(os.path.join(site_dir, entry), ignore_errors=True)
+        failed += left
+        actions.append("{} {}".format(
+            "partly removed" if left else "removed", entry))
+
+    link = can_link(folder, site_dirs)
+    for dist in manifest["dists"]:
+        for path, stored in dist["files"].items():
+            stored = os.path.join(folder, stored)
+            if _unchanged(path, stored):
+                continue
+            try:
+                if os.path.lexists(path):
+                    os.unlink(path)
+                _link_or_copy(stored, path, link)
+            except OSError as exc:
+                failed.append("could not restore {}: {}".format(path, exc))
+
+    # drop package folders left empty by removed distributions
+    for d in sorted(emptied, key=len, reverse=True):
+        while any(d.startswith(s + os.sep) for s in site_dirs):
+            try:
+                os.rmdir(d)
+            except OSError:
+                break
+            d = os.path.dirname(d)
+
+    now = set(distinfo.metadata_dirs(site_dirs))
+    for dist in manifest["dists"]:
+        state = ("restored" if (dist["site_dir"], dist["entry"]) in now
+                 else "missing")
+        actions.append("{} {}".format(state, dist["entry"]))
+
+    if failed:
+        actions += failed
+        actions.append("kept the stash in {} to retry".format(folder))
+    else:
+        shutil.rmtree(folder, ignore_errors=True)
+    return actions
+
+
+def list_stashes(root):
+    """Stash folders, newest first."""
+    try:
+        names = sorted(os.listdir(str(root)), reverse=True)
+    except OSError:
+        return []
+    return [os.path.join(str(root), n) for n in names
+            if os.path.isfile(os.path.join(str(root), n, MANIFEST))]
+
+
+def prune(root, max_age_days):
+    """Delete stashes older than ``max_age_days``; returns how many."""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for folder in list_stashes(root):
+        try:
+            created = load(folder).get("created", 0)
+        except (OSError, ValueError):
+            created = 0
+        if created < cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,64 @@
+"""
+The plugin folder is the package; load it under a fixed name so tests
+can import its modules (``from pip_manager import mirrors``) the way
+``python -m <plugin folder>`` does. Nothing here imports Qt.
+"""
+import http.server
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "pip_manager"
+
+if PACKAGE not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(ROOT, "__init__.py"),
+        submodule_search_locations=[ROOT])
+    sys.modules[PACKAGE] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules[PACKAGE])
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers with the server's ``routes`` (path -> (status, headers))
+    after ``delay`` seconds.
+    """
+
+    def do_HEAD(self):
+        self.server.hits.append(self.path)
+        time.sleep(self.server.delay)
+        status, headers = self.server.routes.get(self.path, (404, {}))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    """Start stand-in index servers: ``start(routes, delay)``."""
+    servers = []
+
+    def start(routes=None, delay=0.0):
+        srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        srv.routes, srv.hits, srv.delay = dict(routes or {}), [], delay
+        threading.Thread(target=srv.serve_forever, args=(0.05,),
+                         daemon=True).start()
+        servers.append(srv)
+        return "http://127.0.0.1:{}".format(srv.server_port), srv
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,123 @@
+import json
+import os
+import stat
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from pip_manager import backends
+from pip_manager.qpip import QGISPipManager
+
+# answers --version like uv; records every other argv and exits with
+# $UV_STUB_RC after printing $UV_STUB_OUT
+STUB = """#!{python}
+import json, os, sys
+if sys.argv[1:] == ["--version"]:
+    print(os.environ.get("UV_STUB_VERSION", "uv 0.9.0"))
+    sys.exit(0)
+with open({log!r}, "a") as fh:
+    fh.write(json.dumps(sys.argv[1:]) + "\\n")
+print(os.environ.get("UV_STUB_OUT", "[]"))
+sys.exit(int(os.environ.get("UV_STUB_RC", "0")))
+"""
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="the stub is a #! script")
+
+
+@pytest.fixture
+def uv_stub(tmp_path):
+    log = tmp_path / "uv_calls.jsonl"
+    exe = tmp_path / "uv"
+    exe.write_text(STUB.format(python=sys.executable, log=str(log)))
+    exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+
+    def calls():
+        if not log.exists():
+            return []
+        return [json.loads(line) for line in log.read_text().splitlines()]
+
+    return SimpleNamespace(path=str(exe), calls=calls)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch, uv_stub):
+    monkeypatch.delenv("APPDATA", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    m = QGISPipManager(sys.executable)
+    m.installer = backends.UV
+    m.installer_path = uv_stub.path
+    return m
+
+
+@pytest.mark.parametrize("pip_args, uv_args", [
+    (["install", "-U", "--force-reinstall", "-y", "--retries", "1", "six"],
+     ["install", "-U", "--reinstall", "six"]),
+    (["uninstall", "-y", "six", "idna"], ["uninstall", "six", "idna"]),
+    (["install", "--no-deps", "-r", "req.txt", "-c", "core.txt"],
+     ["install", "--no-deps", "-r", "req.txt", "-c", "core.txt"]),
+    (["list", "--outdated", "--format", "json"],
+     ["list", "--outdated", "--format", "json"]),
+    (["install", "--dry-run", "--report", "out.json", "six"], None),
+    (["install", "--proxy", "http://proxy:3128", "six"], None),
+    (["download", "six"], None),
+])
+def test_translate(pip_args, uv_args):
+    assert backends.UvBackend("uv").translate(pip_args) == uv_args
+
+
+def test_command_targets_the_interpreter_and_keeps_pip_fallback():
+    pip_cmd = ["/env/python", "-m", "pip", "uninstall", "-y", "six"]
+    cmd = backends.UvBackend("/bin/uv").command(pip_cmd)
+    assert list(cmd) == ["/bin/uv", "pip", "uninstall", "--python",
+                         "/env/python", "six"]
+    assert cmd.fallback == pip_cmd
+    report = pip_cmd[:3] + ["install", "--report", "r.json", "six"]
+    assert backends.UvBackend("/bin/uv").command(report) == report
+
+
+def test_select(uv_stub, tmp_path, monkeypatch):
+    assert isinstance(backends.select(backends.UV, uv_stub.path),
+                      backends.UvBackend)
+    assert isinstance(backends.select(backends.PIP, uv_stub.path),
+                      backends.PipBackend)
+    missing = str(tmp_path / "no-such-uv")
+    assert isinstance(backends.select(backends.UV, missing),
+                      backends.PipBackend)
+    monkeypatch.setenv("UV_STUB_VERSION", "something else 1.0")
+    assert isinstance(backends.select(backends.UV, uv_stub.path),
+                      backends.PipBackend)
+
+
+def test_runs_translated_argv_through_uv(manager, uv_stub):
+    rc, out, _ = manager._run(manager._pip_args("list", "--format=json"))
+    assert rc == 0 and json.loads(out) == []
+    assert uv_stub.calls() == [
+        ["pip", "list", "--python", sys.executable, "--format=json"]]
+
+
+@pytest.mark.parametrize("output", [
+    "error: unexpected argument '--frobnicate' found",  # refused
+    "error: resolution failed",                         # any failure
+])
+def test_falls_back_to_pip_when_uv_fails(manager, uv_stub, monkeypatch,
+                                        output):
+    monkeypatch.setenv("UV_STUB_RC", "2")
+    monkeypatch.setenv("UV_STUB_OUT", output)
+    lines = []
+    rc, out, _ = manager._run(manager._pip_args("list", "--format=json"),
+                              lines.append)
+    assert len(uv_stub.calls()) == 1
+    assert rc == 0
+    assert any(p["name"].lower() == "pip" for p in json.loads(
+        out[out.index("["):]))
+    assert any("using pip" in line for line in lines)
+
+
+def test_falls_back_to_pip_when_uv_is_gone(manager, uv_stub):
+    cmd = manager._pip_args("list", "--format=json")
+    os.remove(uv_stub.path)
+    rc, out, _ = manager._run(cmd)
+    assert rc == 0
+    assert any(p["name"].lower() == "pip" for p in json.loads(out))
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from pip_manager import qpip
+from pip_manager.mirrors import PROBE_PROJECT, MirrorSet
+from pip_manager.netstate import Offline
+
+PROBE = "/{}/".format(PROBE_PROJECT)
+
+
+def _fetch(url, **kwargs):
+    # no redirects: the status the mirror itself answers with
+    return qpip._fetch_url(url, redirects=0, **kwargs)
+
+
+@pytest.fixture
+def mirror_set(tmp_path):
+    return MirrorSet(tmp_path / "mirrors.json", ttl=300, timeout=2.0)
+
+
+@pytest.mark.parametrize("status, ok", [
+    (200, True), (204, True), (301, True), (304, True),
+    (401, False), (403, False), (404, False), (500, False), (503, False),
+])
+def test_only_2xx_3xx_is_healthy(local_server, mirror_set, status, ok):
+    url, _ = local_server({PROBE: (status, {"Location": "/elsewhere/"})})
+    result = mirror_set.probe([url], _fetch)[url]
+    assert result["ok"] is ok
+    assert result["error"] == ("" if ok else "HTTP {}".format(status))
+
+
+def test_unreachable_index_is_down(mirror_set):
+    url = "http://127.0.0.1:1"
+    result = mirror_set.probe([url], _fetch)[url]
+    assert not result["ok"] and result["latency"] is None
+
+
+def test_ranked_fastest_healthy_first(local_server, mirror_set):
+    down, _ = local_server({PROBE: (403, {})})
+    slow, _ = local_server({PROBE: (200, {})}, delay=0.3)
+    fast, _ = local_server({PROBE: (200, {})})
+    assert mirror_set.ranked([down, slow, fast], _fetch) == [
+        fast, slow, down]
+
+
+def test_all_down_keeps_configured_order(local_server, mirror_set):
+    a, _ = local_server({PROBE: (404, {})})
+    b, _ = local_server({PROBE: (500, {})})
+    assert mirror_set.ranked([b, a], _fetch) == [b, a]
+
+
+def test_results_are_cached_for_the_ttl(local_server, mirror_set):
+    a, srv_a = local_server({PROBE: (200, {})})
+    b, srv_b = local_server({PROBE: (200, {})})
+    mirror_set.ranked([a, b], _fetch)
+    mirror_set.ranked([a, b], _fetch)
+    assert len(srv_a.hits) == len(srv_b.hits) == 1
+    mirror_set.probe([a, b], _fetch, force=True)
+    assert len(srv_a.hits) == 2
+
+
+def test_failed_mirror_goes_last(local_server, mirror_set):
+    a, _ = local_server({PROBE: (200, {})})
+    b, _ = local_server({PROBE: (200, {})}, delay=0.1)
+    assert mirror_set.ranked([a, b], _fetch)[0] == a
+    mirror_set.mark_failed(a, "Connection refused")
+    assert mirror_set.ranked([a, b], _fetch) == [b, a]
+
+
+def test_offline_probe_is_not_cached(tmp_path, mirror_set):
+    def offline(url, **kwargs):
+        raise Offline("network calls paused")
+
+    url = "http://127.0.0.1:1"
+    assert mirror_set.probe([url], offline, force=True) == {url: None}
+    saved = tmp_path / "mirrors.json"
+    assert not saved.exists() or url not in json.loads(saved.read_text())
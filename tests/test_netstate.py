@@ -0,0 +1,68 @@
+import time
+import urllib.request
+
+import pytest
+
+from pip_manager.netstate import (
+    OFFLINE, ONLINE, PROBING, CircuitBreaker, Offline,
+)
+
+
+def _wait_for(predicate, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    breaker.failure()
+    breaker.failure()
+    breaker.allow()
+    assert breaker.state == ONLINE
+    breaker.failure()
+    assert breaker.state == OFFLINE
+    with pytest.raises(Offline):
+        breaker.allow()
+
+
+def test_success_resets_the_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == ONLINE
+
+
+def test_half_open_probe_closes_once_the_index_answers(local_server):
+    url, srv = local_server({"/pip/": (503, {})})
+    breaker = CircuitBreaker(threshold=1, cooldown=0.1)
+    seen = []
+
+    def probe():
+        seen.append(breaker.state)
+        breaker.allow()  # the probe thread may go through
+        with urllib.request.urlopen(url + "/pip/", timeout=2) as resp:
+            return resp.status
+
+    breaker.probe = probe
+    breaker.failure()
+    assert breaker.state in (OFFLINE, PROBING)
+    assert _wait_for(lambda: len(srv.hits) >= 2)
+    assert breaker.state != ONLINE  # 503s keep it open
+    srv.routes["/pip/"] = (200, {})
+    assert _wait_for(lambda: breaker.state == ONLINE)
+    assert set(seen) == {PROBING}
+    breaker.allow()
+
+
+def test_direct_failures_ignored_behind_a_proxy():
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.proxied = lambda: True
+    breaker.failure(direct=True)
+    assert breaker.state == ONLINE
+    breaker.failure()
+    assert breaker.state == OFFLINE
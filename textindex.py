@@ -0,0 +1,204 @@
+"""
+textindex.py - Full-text search over installed distribution metadata.
+The METADATA headers of every installed distribution (name, summary,
+keywords, classifiers, license, author) and its entry point names go
+into a small in-memory inverted index. As with distinfo.RequirementGraph,
+``refresh`` only reads the metadata of entries that appeared since the
+last call, so it can run before every query. Queries are ranked
+multi-term prefix lookups; ``field:value`` terms (``license:GPL``,
+``author:"Sean Gillies"``) are filters every result has to pass.
+"""
+import bisect
+import math
+import os
+import re
+import threading
+
+from .distinfo import metadata_dirs, metadata_file
+from .name_index import normalize
+
+# field -> weight of a match in that field
+FIELDS = {"name": 4.0, "keywords": 2.5, "summary": 2.0, "entry": 1.5,
+          "classifier": 1.0, "license": 1.0, "author": 1.0}
+ALIASES = {"keyword": "keywords", "classifiers": "classifier",
+           "topic": "classifier", "script": "entry", "entrypoint": "entry",
+           "maintainer": "author"}
+_HEADERS = {"Name": "name", "Summary": "summary", "Keywords": "keywords",
+            "Classifier": "classifier", "License": "license",
+            "License-Expression": "license", "Author": "author",
+            "Author-email": "author", "Maintainer": "author",
+            "Maintainer-email": "author"}
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY = re.compile(r'(?:([A-Za-z-]+):)?(?:"([^"]*)"|(\S+))')
+_STOP = frozenset(
+    "a an and are as at by did do does for from how i in is it of on or "
+    "that the this to was we what which with".split())
+_PREFIX_WEIGHT = 0.6  # a prefix hit counts less than a whole token
+
+
+def tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _read_fields(site_dir, entry):
+    """{field: [token, ...]} plus the display name of one distribution."""
+    fields = {f: [] for f in FIELDS}
+    name = ""
+    try:
+        with open(metadata_file(site_dir, entry), encoding="utf-8",
+                  errors="replace") as fh:
+            for line in fh:
+                if not line.strip():
+                    break  # the long description follows
+                key, sep, value = line.partition(":")
+                field = _HEADERS.get(key) if sep and key[:1].strip() else None
+                if field is None:
+                    continue  # continuation lines (full license texts)
+                value = value.strip()[:200]
+                if field == "name" and not name:
+                    name = value
+                fields[field] += tokens(value)
+                if field == "classifier" and value.startswith("License ::"):
+                    fields["license"] += tokens(value[len("License ::"):])
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(site_dir, entry, "entry_points.txt"),
+                  encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                ep, sep, _ = line.partition("=")
+                if sep:
+                    fields["entry"] += tokens(ep)
+    except OSError:
+        pass
+    return name or entry.split("-")[0], fields
+
+
+class MetadataIndex:
+    """Inverted index token -> {distribution key: count}, per field."""
+
+    def __init__(self, site_dirs):
+        self.site_dirs = list(site_dirs)
+        self._entries = {}   # (site_dir, entry) -> (key, name, fields)
+        self._names = {}     # key -> display name
+        self._postings = {f: {} for f in FIELDS}
+        self._vocab = {}     # field -> sorted tokens, rebuilt on demand
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _add(self, loc):
+        name, fields = _read_fields(*loc)
+        key = normalize(name)
+        self._entries[loc] = (key, name, fields)
+        self._names[key] = name
+        for field, toks in fields.items():
+            postings = self._postings[field]
+            for tok in toks:
+                docs = postings.get(tok)
+                if docs is None:
+                    docs = postings[tok] = {}
+                    self._vocab.pop(field, None)
+                docs[key] = docs.get(key, 0) + 1
+
+    def _remove(self, loc):
+        key, _, fields = self._entries.pop(loc)
+        self._names.pop(key, None)
+        for field, toks in fields.items():
+            postings = self._postings[field]
+            for tok in set(toks):
+                docs = postings.get(tok, {})
+                docs.pop(key, None)
+                if not docs and tok in postings:
+                    del postings[tok]
+                    self._vocab.pop(field, None)
+
+    def refresh(self):
+        """Index entries that appeared and drop the ones that went away."""
+        with self._lock:
+            current = set(metadata_dirs(self.site_dirs))
+            if current == set(self._entries):
+                return
+            for gone in set(self._entries) - current:
+                self._remove(gone)
+            for new in sorted(current - set(self._entries)):
+                self._add(new)
+
+    def _matches(self, field, tok):
+        """{key: weighted count} for tokens of ``field`` starting with tok."""
+        vocab = self._vocab.get(field)
+        if vocab is None:
+            vocab = self._vocab[field] = sorted(self._postings[field])
+        out = {}
+        i = bisect.bisect_left(vocab, tok)
+        while i < len(vocab) and vocab[i].startswith(tok):
+            weight = 1.0 if vocab[i] == tok else _PREFIX_WEIGHT
+            for key, n in self._postings[field][vocab[i]].items():
+                out[key] = max(out.get(key, 0.0), weight * (1 + math.log(n)))
+            i += 1
+        return out
+
+    def _term(self, tok, fields):
+        """{key: (score, {fields hit})} for one query token."""
+        total = len(self._names) or 1
+        hits = {}
+        for field in fields:
+            found = self._matches(field, tok)
+            if not found:
+                continue
+            idf = math.log(1.0 + total / float(len(found)))
+            for key, tf in found.items():
+                score, where = hits.get(key, (0.0, set()))
+                where.add(field)
+                hits[key] = (score + FIELDS[field] * idf * tf, where)
+        return hits
+
+    @staticmethod
+    def parse(query):
+        """(free tokens, [(field, tokens)]) of a query string."""
+        free, filters = [], []
+        for field, quoted, word in _QUERY.findall(query):
+            text = quoted or word
+            field = ALIASES.get(field.lower(), field.lower())
+            if field in FIELDS:
+                toks = tokens(text)
+                if toks:
+                    filters.append((field, toks))
+            else:
+                free += tokens("{} {}".format(field, text))
+        meaningful = [t for t in free if t not in _STOP]
+        return (meaningful or free), filters
+
+    def search(self, query, limit=None):
+        """
+        Ranked [(name, score, [fields matched])]. Every filter has to
+        match; documents matching more of the free terms rank first.
+        """
+        free, filters = self.parse(query)
+        if not free and not filters:
+            return []
+        self.refresh()
+        with self._lock:
+            scores, where, allowed = {}, {}, None
+            for field, toks in filters:
+                for tok in toks:
+                    hits = self._term(tok, [field])
+                    keys = set(hits)
+                    allowed = keys if allowed is None else allowed & keys
+                    for key, (score, fields) in hits.items():
+                        scores[key] = scores.get(key, 0.0) + score
+                        where.setdefault(key, set()).update(fields)
+            matched = {}
+            for tok in dict.fromkeys(free):
+                for key, (score, fields) in self._term(tok, FIELDS).items():
+                    matched[key] = matched.get(key, 0) + 1
+                    scores[key] = scores.get(key, 0.0) + score
+                    where.setdefault(key, set()).update(fields)
+            keys = set(matched) if free else set(allowed or ())
+            if allowed is not None:
+                keys &= allowed
+            ranked = sorted(keys, key=lambda k: (
+                -matched.get(k, 0), -scores[k], k))
+            return [(self._names[k], round(scores[k], 3), sorted(where[k]))
+                    for k in ranked[:limit]]